@@ -109,7 +109,8 @@ User=$USER
 Group=$USER
 WorkingDirectory=/var/www/fuyou_scheduling
 Environment=PATH=/var/www/fuyou_scheduling/venv/bin
-ExecStart=/var/www/fuyou_scheduling/venv/bin/python run.py
+Environment="FUYOU_BIND=0.0.0.0:5000"
+ExecStart=/var/www/fuyou_scheduling/venv/bin/gunicorn -c gunicorn.conf.py wsgi:app
 Restart=always
 RestartSec=10
 
@@ -1,7 +1,10 @@
 from flask import Flask, redirect, url_for
-from os import path
+from os import path, environ
+import logging
 from flask_login import LoginManager
 
+logger = logging.getLogger(__name__)
+
 def create_app():
     app = Flask(__name__)
 
@@ -9,19 +12,114 @@ def create_app():
     # 配置
     app.config['SECRET_KEY'] = 'fuyou-scheduling-secret-key-2024'
 
-    # 数据库配置 - 使用SQLite
+    # 数据库配置 - 使用SQLite（可通过环境变量 FUYOU_DATABASE_URI 指定其他数据库，例如性能测试用的临时库）
     basedir = path.abspath(path.dirname(__file__))
-    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path.join(basedir, "..", "instance", "fuyou.db")}'
+    app.config['SQLALCHEMY_DATABASE_URI'] = environ.get(
+        'FUYOU_DATABASE_URI', f'sqlite:///{path.join(basedir, "..", "instance", "fuyou.db")}')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
     # 文件上传配置
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
     app.config['UPLOAD_FOLDER'] = path.join(basedir, "static", "uploads", "avatars")
+    app.config['AVATAR_ORPHAN_MAX_AGE'] = 24  # 小时，上传后超过该时间仍未被医生使用的头像会被清理
+
+    # 密码哈希策略（werkzeug格式：算法及成本参数），修改后用户下次登录时自动升级
+    # 例如 'scrypt:32768:8:1'（默认）、'scrypt:16384:8:1' 或 'pbkdf2:sha256:260000'
+    app.config['PASSWORD_HASH_METHOD'] = 'scrypt:32768:8:1'
+
+    # 诊断功能（/debug/* 调试页面），默认关闭；开启后仅超级管理员可访问
+    app.config['ENABLE_DIAGNOSTICS'] = False
+    app.config['DIAGNOSTICS_MAX_ROWS'] = 200
+    app.config['DIAGNOSTICS_LOG_SAMPLE_RATE'] = 0.0  # 请求诊断日志采样比例，0为不记录
+
+    # 用户缓存配置（秒），设为0关闭缓存
+    app.config['USER_CACHE_TTL'] = 60
+
+    # 排班班次模板编译结果的缓存时间（秒），本进程修改模板时立即生效
+    app.config['SLOT_TEMPLATE_CACHE_TTL'] = 60
+
+    # 节假日缓存时间（秒），本进程修改节假日时立即生效，其他worker最迟在该时间后生效
+    app.config['HOLIDAY_CACHE_TTL'] = 60
+
+    # 生成排班时沿用上月规则的轮转周期（周，1-4），新月份每天沿用该周期前同一星期的医生分配
+    app.config['SCHEDULE_ROTATION_WEEKS'] = 4
+
+    # 最后登录时间批量写入配置
+    app.config['LAST_LOGIN_BATCH_SIZE'] = 20
+    app.config['LAST_LOGIN_FLUSH_INTERVAL'] = 30  # 秒
+
+    # SQL查询统计（每个请求的语句数、数据库耗时，输出到 Server-Timing 响应头和 /debug/queries），默认关闭
+    app.config['ENABLE_QUERY_STATS'] = False
+    app.config['QUERY_STATS_HISTORY'] = 100  # 保留最近的请求数
+    app.config['QUERY_STATS_WARNING'] = 20   # 单个请求超过该语句数时在统计面板中标红
+
+    # 运行时指标（Prometheus文本格式，/metrics），默认关闭
+    # 多进程部署时各worker通过 METRICS_DIR 共享指标，为空时使用 instance/metrics
+    app.config['ENABLE_METRICS'] = False
+    app.config['METRICS_DIR'] = environ.get('FUYOU_METRICS_DIR', '')
+    app.config['METRICS_FLUSH_INTERVAL'] = 5  # 秒
+    app.config['METRICS_ALLOWED_IPS'] = ['127.0.0.1', '::1']  # 允许抓取 /metrics 的地址
+    # 抓取令牌（请求头 Authorization: Bearer <令牌>）；未设置时只接受直接来自上述地址、未经代理转发的请求
+    app.config['METRICS_TOKEN'] = environ.get('FUYOU_METRICS_TOKEN', '')
+
+    # 按需性能分析，默认关闭：超级管理员访问页面时加 ?_profile=1 记录该请求的cProfile结果，
+    # 在 /debug/profiles 查看（与其他调试页面一样需要同时开启 ENABLE_DIAGNOSTICS）
+    app.config['ENABLE_PROFILER'] = False
+    app.config['PROFILES_DIR'] = ''          # 为空时使用 instance/profiles
+    app.config['PROFILER_MAX_FILES'] = 50    # 最多保留的分析结果数
+
+    # 字体子集（由 scripts/utils/subset_fonts.py 生成到项目根目录的 static/fonts，与 font-setup.css 一起由nginx提供），
+    # 存在时页面优先加载子集分片
+    app.config['FONT_SUBSET_CSS'] = path.exists(path.join(basedir, "..", "static", "fonts", "font-subset.css"))
+
+    # 日志配置：级别可用环境变量 FUYOU_LOG_LEVEL 覆盖（生产环境设为 WARNING 可关闭调试和启动信息）
+    # LOG_LEVELS 单独设置某个模块的级别；LOG_FORMAT 为 'json' 时每行输出一条JSON；LOG_FILE 为空时输出到stderr
+    app.config['LOG_LEVEL'] = environ.get('FUYOU_LOG_LEVEL', 'INFO')
+    app.config['LOG_LEVELS'] = {
+        'app.diagnostics': 'INFO',
+    }
+    app.config['LOG_FORMAT'] = environ.get('FUYOU_LOG_FORMAT', 'text')
+    app.config['LOG_FILE'] = environ.get('FUYOU_LOG_FILE', '')
+
+    # 初始化日志（最先初始化，后续启动过程的输出都经过日志队列）
+    from app.log_config import log_config
+    log_config.init_app(app)
 
     # 初始化数据库
     from app.extensions import db
     db.init_app(app)
 
+    # 医生/用户搜索索引随提交同步更新
+    from app.search_index import register_search_index_events
+    register_search_index_events(db)
+
+    # 节假日缓存时间
+    from app.holiday_utils.holidays import holiday_helper
+    holiday_helper.init_app(app)
+
+    # 排班班次模板变化时清理编译缓存
+    from app.slot_templates import slot_templates
+    slot_templates.init_app(app)
+
+    # 初始化最后登录时间写缓冲
+    from app.login_buffer import last_login_buffer
+    last_login_buffer.init_app(app)
+
+    # 初始化SQL查询统计
+    from app.query_stats import query_stats
+    query_stats.init_app(app)
+
+    # 初始化运行时指标
+    from app.metrics import metrics
+    from app.utils import get_avatar_queue_depth
+    metrics.init_app(app)
+    metrics.register_gauge('fuyou_avatar_queue_depth', get_avatar_queue_depth)
+    metrics.register_gauge('fuyou_last_login_pending', lambda: len(last_login_buffer.pending))
+
+    # 初始化按需性能分析
+    from app.profiler import profiler
+    profiler.init_app(app)
+
     # 初始化登录管理器
     login_manager = LoginManager()
     login_manager.init_app(app)
@@ -31,13 +129,17 @@ def create_app():
 
     @login_manager.user_loader
     def load_user(user_id):
-        from app.models import User
-        return User.query.get(int(user_id))
+        from app.user_cache import user_cache
+        return user_cache.load_user(int(user_id))
 
     # 注册蓝图
     from app.routes import main
     app.register_blueprint(main, url_prefix='/')
 
+    # 注册排班操作蓝图（生成、分配医生、上传和下载模板），排班主页仍由main.schedules处理
+    from app.schedule_routes import schedule_bp
+    app.register_blueprint(schedule_bp, url_prefix='/schedules')
+
     # 注册认证蓝图
     from app.auth_routes import auth
     app.register_blueprint(auth, url_prefix='/auth')
@@ -49,18 +151,17 @@ def create_app():
 
     # 注册调试路由
     try:
-        from flask import render_template_string
-        from flask_login import login_required, current_user
+        from flask import render_template_string, flash
+        from flask_login import current_user
         from app.models import User
+        from app.user_cache import user_cache
+        from app.utils import diagnostics_required
 
         @app.route('/debug/users')
-        @login_required
+        @diagnostics_required
         def debug_users():
-            """调试用户列表页面"""
-            print("DEBUG: Accessing debug user list page")
-            print(f"   Current user: {current_user.username}")
-
-            users = User.query.all()
+            """调试用户列表页面（最多显示 DIAGNOSTICS_MAX_ROWS 个用户）"""
+            users = User.query.order_by(User.id).limit(app.config['DIAGNOSTICS_MAX_ROWS']).all()
             users_info = []
             for user in users:
                 users_info.append({
@@ -70,7 +171,6 @@ def create_app():
                     'is_super_admin': user.is_super_admin,
                     'can_be_promoted': not user.is_admin and not user.is_super_admin
                 })
-                print(f"   User {user.username}: is_admin={user.is_admin}, is_super_admin={user.is_super_admin}")
 
             return render_template_string('''
 <!DOCTYPE html>
@@ -145,14 +245,12 @@ def create_app():
             ''', users_info=users_info)
 
         @app.route('/debug/toggle_admin/<int:user_id>', methods=['POST'])
-        @login_required
+        @diagnostics_required
         def debug_toggle_admin(user_id):
             """调试版本的切换管理员权限"""
-            print(f"\\nDEBUG: debug_toggle_admin called - user_id: {user_id}")
-
             user = User.query.get_or_404(user_id)
-            print(f"   Target user: {user.username}")
-            print(f"   Before toggle: is_admin={user.is_admin}")
+            logger.debug('debug_toggle_admin', extra={'fields': {
+                'user_id': user_id, 'username': user.username, 'is_admin': user.is_admin}})
 
             if user.id == current_user.id:
                 flash('不能修改自己的管理员权限', 'error')
@@ -166,53 +264,90 @@ def create_app():
                 user.is_admin = not user.is_admin
                 from app.extensions import db
                 db.session.commit()
+                user_cache.invalidate(user.id)
 
-                print(f"   Toggle successful: is_admin={user.is_admin}")
+                logger.info('调试页面切换管理员权限', extra={'fields': {
+                    'operator': current_user.username, 'username': user.username, 'is_admin': user.is_admin}})
                 status = "Admin" if user.is_admin else "Regular User"
                 flash(f'Debug success! Set {user.username} as {status}', 'success')
 
             except Exception as e:
                 from app.extensions import db
                 db.session.rollback()
-                print(f"   Error: {e}")
+                logger.error(f'调试页面切换管理员权限失败: {e}', extra={'fields': {'user_id': user_id}})
                 flash(f'Operation failed: {str(e)}', 'error')
 
             return redirect('/debug/users')
 
-        print("调试路由已成功注册")
+        logger.debug("调试路由已成功注册")
 
     except Exception as e:
-        print(f"调试路由注册失败: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"调试路由注册失败: {e}")
 
     # 创建数据库表
     with app.app_context():
         # 智能检测数据库结构并更新
         smart_database_update()
 
-        # 输出当前医生表数据
+        # 输出当前医生表数据（明细只在DEBUG级别查询和输出）
         from app.models import Doctor
-        doctors = Doctor.query.all()
-
-        print("\n" + "="*50)
-        print("Fuyou Scheduling System - Current Data Status")
-        print("="*50)
-        print(f"Total doctors: {len(doctors)}")
-
-        if doctors:
-            print("\nDoctor details:")
-            for i, doctor in enumerate(doctors, 1):
-                print(f"\n{i}. {doctor.name} ({doctor.gender})")
-                print(f"   Specialties: {doctor.get_specialties_display()}")
-                print(f"   Annual leave: {doctor.annual_leave_days - doctor.used_leave_days}/{doctor.annual_leave_days} days")
-                print(f"   Avatar: {'Yes' if doctor.avatar else 'No'}")
-        else:
-            print("\nNo doctor data available")
-        print("="*50 + "\n")
+        logger.info(f"Total doctors: {Doctor.query.count()}")
+
+        if logger.isEnabledFor(logging.DEBUG):
+            for i, doctor in enumerate(Doctor.query.all(), 1):
+                logger.debug(f"{i}. {doctor.name} ({doctor.gender})", extra={'fields': {
+                    'specialties': doctor.get_specialties_display(),
+                    'annual_leave': f"{doctor.annual_leave_days - doctor.used_leave_days}/{doctor.annual_leave_days}",
+                    'avatar': bool(doctor.avatar),
+                }})
 
     return app
 
+def warm_caches():
+    """预热进程内缓存（需要在应用上下文中调用）
+
+    gunicorn preload时在主进程中调用，fork出的worker直接共享已加载的数据（写时复制），
+    不必在每个worker的第一个请求中各自查询数据库。
+    """
+    from datetime import date
+    from app.holiday_utils.holidays import holiday_helper
+    from app.search_index import search_index
+    from app.slot_templates import slot_templates
+
+    year = date.today().year
+    for y in (year - 1, year, year + 1):
+        holiday_helper.get_holidays(y)
+
+    # 医生和用户名单（搜索索引）
+    search_index.warm()
+
+    # 排班班次模板
+    slot_templates.get_plan()
+
+    logger.info("进程内缓存预热完成", extra={'fields': {'holiday_years': [year - 1, year, year + 1]}})
+
+def backfill_doctor_specialties():
+    """根据doctors.specialties的JSON数据填充doctor_specialties关联表（可重复执行）"""
+    import json
+    from app.extensions import db
+    from app.models import doctor_specialties
+    from app.utils import insert_ignore
+
+    with db.engine.connect() as conn:
+        specialty_ids = dict(conn.execute(db.text("SELECT name, id FROM specialties")).fetchall())
+        rows = []
+        for doctor_id, specialties in conn.execute(db.text("SELECT id, specialties FROM doctors WHERE specialties IS NOT NULL")):
+            try:
+                names = json.loads(specialties)
+            except (TypeError, ValueError):
+                continue
+            rows.extend({'doctor_id': doctor_id, 'specialty_id': specialty_ids[name]}
+                        for name in set(names) if name in specialty_ids)
+
+        inserted = insert_ignore(doctor_specialties, rows, ['doctor_id', 'specialty_id'], connection=conn)
+        conn.commit()
+        logger.info(f"Backfilled {inserted} doctor specialty links")
+
 def smart_database_update():
     """智能检测并更新数据库结构"""
     import sqlalchemy as sa
@@ -224,46 +359,45 @@ def smart_database_update():
         inspector = db.inspect(db.engine)
         existing_tables = inspector.get_table_names()
 
-        print("Checking database structure...")
-        print(f"   Existing tables: {existing_tables}")
+        logger.debug("Checking database structure...", extra={'fields': {'tables': existing_tables}})
 
         # 检查doctors表的字段
         if 'doctors' in existing_tables:
             columns = [column['name'] for column in inspector.get_columns('doctors')]
-            print(f"   doctors table columns: {columns}")
+            logger.debug("doctors table columns", extra={'fields': {'columns': columns}})
 
             # 检查并添加缺失的字段
             need_column_update = False
             if 'title' not in columns:
-                print("+ Need to add title field")
+                logger.debug("+ Need to add title field")
                 need_column_update = True
 
             if 'status' not in columns:
-                print("+ Need to add status field")
+                logger.debug("+ Need to add status field")
                 need_column_update = True
 
             if 'sequence' not in columns:
-                print("+ Need to add sequence field")
+                logger.debug("+ Need to add sequence field")
                 need_column_update = True
 
             # 总是检查并更新现有记录的NULL值
             need_value_update = 'title' not in columns or 'status' not in columns
 
             if need_column_update or need_value_update:
-                print("Updating doctors table fields...")
+                logger.info("Updating doctors table fields...")
                 # 使用SQLite的ALTER TABLE命令添加字段
                 with db.engine.connect() as conn:
                     if 'title' not in columns:
                         conn.execute(db.text("ALTER TABLE doctors ADD COLUMN title VARCHAR(20) DEFAULT '打字员'"))
-                        print("title field added")
+                        logger.info("title field added")
 
                     if 'status' not in columns:
                         conn.execute(db.text("ALTER TABLE doctors ADD COLUMN status VARCHAR(10) DEFAULT '在职'"))
-                        print("status field added")
+                        logger.info("status field added")
 
                     if 'sequence' not in columns:
                         conn.execute(db.text("ALTER TABLE doctors ADD COLUMN sequence INTEGER DEFAULT 999"))
-                        print("sequence field added")
+                        logger.info("sequence field added")
 
                     # 总是更新现有记录的NULL值，确保数据完整性
                     result = conn.execute(db.text("""
@@ -273,16 +407,37 @@ def smart_database_update():
                             sequence = COALESCE(sequence, 999)
                     """))
                     if result.rowcount > 0:
-                        print(f"Updated {result.rowcount} doctor records with title, status and sequence")
+                        logger.info(f"Updated {result.rowcount} doctor records with title, status and sequence")
                     else:
-                        print("All doctor records already have title and status set")
+                        logger.info("All doctor records already have title and status set")
 
                     conn.commit()
 
+            # 已休天数改为 手工录入基数 + 本年公休记录天数，基数取现有已休天数扣除本年公休记录天数
+            if 'leave_days_baseline' not in columns:
+                from datetime import date
+                from app.models import LeavePeriod
+
+                with db.engine.connect() as conn:
+                    conn.execute(db.text("ALTER TABLE doctors ADD COLUMN leave_days_baseline INTEGER DEFAULT 0"))
+                    conn.execute(db.text("UPDATE doctors SET leave_days_baseline = COALESCE(used_leave_days, 0)"))
+                    conn.commit()
+
+                if 'leave_periods' in existing_tables:
+                    used = dict(db.session.execute(db.text("SELECT id, COALESCE(used_leave_days, 0) FROM doctors")).fetchall())
+                    for doctor_id, days in LeavePeriod.annual_days_by_doctor(date.today().year).items():
+                        baseline = max(used.get(doctor_id, 0) - days, 0)
+                        db.session.execute(
+                            db.text("UPDATE doctors SET leave_days_baseline = :baseline, used_leave_days = :used WHERE id = :id"),
+                            {'baseline': baseline, 'used': baseline + days, 'id': doctor_id}
+                        )
+                    db.session.commit()
+                logger.info("leave_days_baseline field added")
+
         # 检查schedules表的字段
         if 'schedules' in existing_tables:
             columns = [column['name'] for column in inspector.get_columns('schedules')]
-            print(f"   schedules table columns: {columns}")
+            logger.debug("schedules table columns", extra={'fields': {'columns': columns}})
 
             # 检查是否需要重构schedules表（因为新的模型结构与旧版本差异很大）
             old_columns = ['specialty_id', 'shift_type_id']
@@ -291,11 +446,11 @@ def smart_database_update():
             need_rebuild = any(col in columns for col in old_columns) or not all(col in columns for col in new_columns)
 
             if need_rebuild:
-                print("Rebuilding schedules table for new scheduling system...")
+                logger.info("Rebuilding schedules table for new scheduling system...")
                 with db.engine.connect() as conn:
                     # 备份现有数据（如果有的话）
                     existing_schedules = conn.execute(db.text("SELECT COUNT(*) FROM schedules")).scalar()
-                    print(f"   Existing schedule records: {existing_schedules}")
+                    logger.info(f"Existing schedule records: {existing_schedules}")
 
                     # 重建表结构
                     conn.execute(db.text("DROP TABLE IF EXISTS schedules"))
@@ -319,44 +474,44 @@ def smart_database_update():
                     conn.execute(db.text("CREATE INDEX ix_schedules_date ON schedules (date)"))
                     conn.execute(db.text("CREATE INDEX ix_schedules_doctor_id ON schedules (doctor_id)"))
 
-                    print("schedules table rebuilt with new format")
+                    logger.info("schedules table rebuilt with new format")
                     conn.commit()
 
         # 检查users表的字段
         if 'users' in existing_tables:
             columns = [column['name'] for column in inspector.get_columns('users')]
-            print(f"   users table columns: {columns}")
+            logger.debug("users table columns", extra={'fields': {'columns': columns}})
 
             # 检查并添加缺失的字段
             need_column_update = False
             if 'is_super_admin' not in columns:
-                print("+ Need to add is_super_admin field")
+                logger.debug("+ Need to add is_super_admin field")
                 need_column_update = True
 
             if 'associated_doctor_id' not in columns:
-                print("+ Need to add associated_doctor_id field")
+                logger.debug("+ Need to add associated_doctor_id field")
                 need_column_update = True
 
             # 检查是否需要删除email字段
             if 'email' in columns:
-                print("- Need to remove email field")
+                logger.debug("- Need to remove email field")
                 need_column_update = True
 
             if need_column_update:
-                print("Updating users table fields...")
+                logger.info("Updating users table fields...")
                 # 使用SQLite的ALTER TABLE命令添加字段
                 with db.engine.connect() as conn:
                     if 'is_super_admin' not in columns:
                         conn.execute(db.text("ALTER TABLE users ADD COLUMN is_super_admin BOOLEAN DEFAULT 0"))
-                        print("is_super_admin field added")
+                        logger.info("is_super_admin field added")
 
                     if 'associated_doctor_id' not in columns:
                         conn.execute(db.text("ALTER TABLE users ADD COLUMN associated_doctor_id INTEGER"))
-                        print("associated_doctor_id field added")
+                        logger.info("associated_doctor_id field added")
 
                     # 删除email字段需要重建表（SQLite不支持直接删除列）
                     if 'email' in columns:
-                        print("Rebuilding users table to remove email field...")
+                        logger.info("Rebuilding users table to remove email field...")
                         conn.execute(db.text("""
                             CREATE TABLE users_new (
                                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -385,7 +540,7 @@ def smart_database_update():
                         """))
 
                         migrated_rows = result.rowcount
-                        print(f"Migrated {migrated_rows} user records")
+                        logger.info(f"Migrated {migrated_rows} user records")
 
                         # 替换表
                         conn.execute(db.text("DROP TABLE users"))
@@ -394,17 +549,29 @@ def smart_database_update():
                         # 重建索引
                         conn.execute(db.text("CREATE UNIQUE INDEX ix_users_username ON users (username)"))
 
-                        print("email field removed")
+                        logger.info("email field removed")
 
                     conn.commit()
 
         # 创建所有表（如果不存在）
         db.create_all()
-        print("Ensured all tables exist")
+        logger.debug("Ensured all tables exist")
+
+        # 新建擅长方向关联表时，从doctors.specialties的JSON数据回填
+        if 'doctor_specialties' not in existing_tables and 'doctors' in existing_tables:
+            backfill_doctor_specialties()
+
+        # create_all不会给已存在的表添加索引，单独补建列表排序索引
+        with db.engine.connect() as conn:
+            # 旧版索引各列均为升序，与列表的排序方向不一致，替换为带方向的索引
+            conn.execute(db.text("DROP INDEX IF EXISTS ix_doctors_list_order"))
+            conn.execute(db.text("CREATE INDEX IF NOT EXISTS ix_doctors_list_order_desc ON doctors (sequence, created_at DESC, id DESC)"))
+            conn.execute(db.text("CREATE INDEX IF NOT EXISTS ix_users_list_order ON users (created_at, id)"))
+            conn.commit()
 
         # 检查新表是否被创建
         new_tables = []
-        required_tables = ['users', 'doctors', 'specialties', 'shift_types', 'schedules', 'work_hours', 'work_scores', 'holidays']
+        required_tables = ['users', 'doctors', 'specialties', 'doctor_specialties', 'shift_types', 'schedules', 'work_hours', 'work_scores', 'holidays', 'leave_periods', 'leave_reset_logs', 'slot_templates']
 
         for table in required_tables:
             if table not in existing_tables:
@@ -412,17 +579,17 @@ def smart_database_update():
 
         # 如果有新表，初始化基础数据
         if new_tables:
-            print(f"New tables detected: {new_tables}")
+            logger.info(f"New tables detected: {new_tables}")
             # 初始化基础数据
             from app import init_data
-            init_data.init_all_data()
-            print("Basic data initialization completed")
+            init_data.init_all_data(new_tables)
+            logger.info("Basic data initialization completed")
         else:
-            print("Database structure is up to date, keeping existing data")
+            logger.debug("Database structure is up to date, keeping existing data")
             # 检查并补充基础数据（如果需要）
             from app import init_data
-            init_data.init_all_data()
-            print("Basic data check completed")
+            init_data.init_all_data(new_tables)
+            logger.debug("Basic data check completed")
 
         # 检查并更新超级管理员
         from app.models import User
@@ -434,16 +601,16 @@ def smart_database_update():
             first_admin = admin_users[0]
             first_admin.is_super_admin = True
             db.session.commit()
-            print(f"Promoted user {first_admin.username} to super administrator")
+            logger.info(f"Promoted user {first_admin.username} to super administrator")
         elif admin_users and super_admin_users:
-            print(f"Current super administrators: {[u.username for u in super_admin_users]}")
+            logger.debug(f"Current super administrators: {[u.username for u in super_admin_users]}")
 
     except Exception as e:
-        print(f"Database update failed: {e}")
-        print("Attempting to recreate database...")
+        logger.error(f"Database update failed: {e}")
+        logger.warning("Attempting to recreate database...")
         # 如果智能更新失败，回退到重建数据库
         db.drop_all()
         db.create_all()
         from app import init_data
         init_data.init_all_data()
-        print("Database has been recreated, original data cleared")
\ No newline at end of file
+        logger.warning("Database has been recreated, original data cleared")
\ No newline at end of file
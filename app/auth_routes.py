@@ -33,6 +33,10 @@ def login():
 
         if user and user.check_password(password):
             if user.is_active:
+                # 哈希策略变更后，登录时透明升级密码哈希
+                if user.rehash_password_if_needed(password):
+                    db.session.commit()
+
                 login_user(user, remember=remember)
                 user.update_last_login()
 
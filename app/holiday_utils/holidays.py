@@ -2,13 +2,37 @@
 中国法定节假日处理工具
 支持预定义节假日
 """
+import calendar
 import json
+import logging
+import time
 from datetime import datetime, date, timedelta
-from typing import Dict, Set, Optional
+from typing import Dict, List, Set, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 日期类型（month_calendar 返回值）
+DAY_TYPE_WEEKDAY = 'weekday'   # 普通工作日（周一至周五）
+DAY_TYPE_WEEKEND = 'weekend'   # 普通周末
+DAY_TYPE_HOLIDAY = 'holiday'   # 法定节假日（数据库中类型为 holiday）
+DAY_TYPE_WORKDAY = 'workday'   # 调休工作日（数据库中类型为 workday）
+
+DEFAULT_CACHE_TTL = 60  # 秒，多进程部署时其他进程修改节假日后最长的生效延迟
 
 class ChinaHolidays:
-    def __init__(self):
+    def __init__(self, ttl: int = DEFAULT_CACHE_TTL):
         self.holiday_cache = {}  # 缓存节假日数据
+        self.cached_at = {}      # 年份 -> 读取数据库的时间
+        self.ttl = ttl
+
+    def init_app(self, app):
+        """绑定应用：读取缓存时间（本进程修改节假日时由 clear_cache 立即清理）"""
+        self.ttl = app.config.get('HOLIDAY_CACHE_TTL', self.ttl)
+
+    def _is_fresh(self, year: int) -> bool:
+        cached_at = self.cached_at.get(year)
+        return (year in self.holiday_cache and cached_at is not None
+                and time.monotonic() - cached_at < self.ttl)
 
     def get_holidays(self, year: int) -> Dict[str, Dict[str, str]]:
         """
@@ -19,14 +43,19 @@ class ChinaHolidays:
             Dict[str, Dict[str, str]]: 日期字符串 -> 节假日信息字典
             例如: {"2025-01-01": {"name": "元旦", "type": "holiday"}, "2025-05-01": {"name": "劳动节", "type": "holiday"}}
         """
-        if year in self.holiday_cache:
+        from app.metrics import metrics
+
+        fresh = self._is_fresh(year)
+        metrics.cache_access('holiday', fresh)
+        if fresh:
             return self.holiday_cache[year]
 
         # 生产环境：只从数据库获取节假日
         holidays = self._get_database_holidays(year)
 
-        # 缓存结果
+        # 缓存结果（超过 ttl 秒后重新读取，其他worker修改的节假日和调休随之生效）
         self.holiday_cache[year] = holidays
+        self.cached_at[year] = time.monotonic()
         return holidays
 
     def get_all_holidays(self, year: int) -> Dict[str, Dict[str, str]]:
@@ -85,7 +114,7 @@ class ChinaHolidays:
             return self._get_holiday_from_ripedb(year)
 
         except Exception as e:
-            print(f"API查询节假日失败: {e}")
+            logger.error(f"API查询节假日失败: {e}")
             return None
 
     def _get_database_holidays(self, year: int) -> Dict[str, Dict[str, str]]:
@@ -111,7 +140,7 @@ class ChinaHolidays:
             return holidays
 
         except Exception as e:
-            print(f"从数据库获取节假日失败: {e}")
+            logger.error(f"从数据库获取节假日失败: {e}")
             return {}
 
     def _get_holiday_from_ripedb(self, year: int) -> Optional[Dict[str, Dict[str, str]]]:
@@ -150,7 +179,7 @@ class ChinaHolidays:
             return None
 
         except Exception as e:
-            print(f"获取节假日数据失败: {e}")
+            logger.error(f"获取节假日数据失败: {e}")
             return None
 
     def is_holiday(self, date_str: str) -> bool:
@@ -216,7 +245,7 @@ class ChinaHolidays:
             return True, f"成功添加{added_count}天节假日"
 
         except Exception as e:
-            print(f"添加自定义节假日失败: {e}")
+            logger.error(f"添加自定义节假日失败: {e}")
             return False, f"添加失败: {str(e)}"
 
     def remove_custom_holiday(self, date_str: str):
@@ -236,7 +265,7 @@ class ChinaHolidays:
             return False
 
         except Exception as e:
-            print(f"删除自定义节假日失败: {e}")
+            logger.error(f"删除自定义节假日失败: {e}")
             return False
 
     def clear_cache(self, year: int = None):
@@ -247,12 +276,14 @@ class ChinaHolidays:
             year (int, optional): 要清理的年份，如果不指定则清理所有年份
         """
         if year:
+            self.cached_at.pop(year, None)
             if year in self.holiday_cache:
                 del self.holiday_cache[year]
-                print(f"已清理 {year} 年的节假日缓存")
+                logger.debug(f"已清理 {year} 年的节假日缓存")
         else:
             self.holiday_cache.clear()
-            print("已清理所有年份的节假日缓存")
+            self.cached_at.clear()
+            logger.debug("已清理所有年份的节假日缓存")
 
     def is_holiday(self, date_str: str) -> bool:
         """
@@ -288,9 +319,35 @@ class ChinaHolidays:
             return weekday >= 5  # 5=周六, 6=周日
 
         except Exception as e:
-            print(f"判断节假日失败: {e}")
+            logger.error(f"判断节假日失败: {e}")
             return False
 
+    def month_calendar(self, year: int, month: int) -> List[Tuple[date, str]]:
+        """
+        获取指定月份每一天的日期类型，判断规则与 is_holiday 一致
+        整月只读取一次节假日缓存，不按天查询数据库
+
+        Returns:
+            List[Tuple[date, str]]: [(日期, 日期类型)]，日期类型为 DAY_TYPE_* 之一
+        """
+        holidays = self.get_holidays(year)
+        first_day = date(year, month, 1)
+        result = []
+        for offset in range(calendar.monthrange(year, month)[1]):
+            day = first_day + timedelta(days=offset)
+            holiday_info = holidays.get(day.strftime("%Y-%m-%d"))
+            holiday_type = holiday_info.get('type') if holiday_info else None
+            if holiday_type == 'holiday':
+                day_type = DAY_TYPE_HOLIDAY
+            elif holiday_type == 'workday':
+                day_type = DAY_TYPE_WORKDAY
+            elif day.weekday() >= 5:
+                day_type = DAY_TYPE_WEEKEND
+            else:
+                day_type = DAY_TYPE_WEEKDAY
+            result.append((day, day_type))
+        return result
+
     def is_workday(self, date_str: str) -> bool:
         """
         判断指定日期是否为工作日（周一到周五 + 调休）
@@ -1,6 +1,10 @@
+import logging
 from datetime import time
-from app.models import Specialty, ShiftType, User
+from app.models import Specialty, ShiftType, SlotTemplate, User
 from app.extensions import db
+from app.utils import insert_ignore
+
+logger = logging.getLogger(__name__)
 
 def init_specialties():
     """初始化擅长方向数据"""
@@ -27,17 +31,11 @@ def init_specialties():
         }
     ]
 
-    existing_specialties = [spec.name for spec in Specialty.query.all()]
-    new_count = 0
-
-    for spec_data in required_specialties:
-        if spec_data['name'] not in existing_specialties:
-            spec = Specialty(**spec_data)
-            db.session.add(spec)
-            new_count += 1
+    # 按名称去重批量插入，已存在的擅长方向保持不变
+    new_count = insert_ignore(Specialty, required_specialties, ['name'])
 
     db.session.commit()
-    print(f"擅长方向数据完成，新增 {new_count} 项")
+    logger.info(f"擅长方向数据完成，新增 {new_count} 项")
 
 def init_shift_types():
     """初始化班次类型数据"""
@@ -108,17 +106,35 @@ def init_shift_types():
         }
     ]
 
-    existing_shift_types = [shift.name for shift in ShiftType.query.all()]
-    new_count = 0
+    # 按名称去重批量插入，已存在的班次类型保持不变
+    new_count = insert_ignore(ShiftType, required_shift_types, ['name'])
+
+    db.session.commit()
+    logger.info(f"班次类型数据完成，新增 {new_count} 项")
+
+def init_slot_templates():
+    """初始化排班班次模板（工作日和调休工作日：门诊白班、急诊夜班各1人）"""
+    shift_type_ids = dict(db.session.query(ShiftType.name, ShiftType.id))
+    default_templates = [
+        {'department': '门诊', 'shift': '白班', 'time_range': '08:00-16:00', 'sequence': 10},
+        {'department': '急诊', 'shift': '夜班', 'time_range': '16:00-24:00', 'sequence': 20},
+    ]
 
-    for shift_data in required_shift_types:
-        if shift_data['name'] not in existing_shift_types:
-            shift = ShiftType(**shift_data)
-            db.session.add(shift)
-            new_count += 1
+    for template in default_templates:
+        if template['shift'] not in shift_type_ids:
+            logger.warning(f"班次类型 {template['shift']} 不存在，跳过模板 {template['department']}")
+            continue
+        db.session.add(SlotTemplate(
+            department=template['department'],
+            shift_type_id=shift_type_ids[template['shift']],
+            headcount=1,
+            day_types='weekday,workday',
+            time_range=template['time_range'],
+            sequence=template['sequence']
+        ))
 
     db.session.commit()
-    print(f"班次类型数据完成，新增 {new_count} 项")
+    logger.info("排班班次模板初始化完成")
 
 def init_admin_user():
     """初始化管理员用户"""
@@ -126,7 +142,7 @@ def init_admin_user():
         # 检查是否已有管理员用户
         admin_user = User.query.filter_by(username='admin').first()
         if admin_user:
-            print("管理员用户已存在，跳过初始化")
+            logger.debug("管理员用户已存在，跳过初始化")
             return
 
         # 创建默认管理员用户
@@ -140,32 +156,42 @@ def init_admin_user():
 
         db.session.add(admin)
         db.session.commit()
-        print("默认管理员用户创建成功!")
-        print("  用户名: admin")
-        print("  密码: admin123")
-        print("WARNING: 请在生产环境中修改默认密码!")
+        logger.info("默认管理员用户创建成功（用户名: admin，密码: admin123）")
+        logger.warning("请在生产环境中修改默认管理员密码!")
 
     except Exception as e:
-        print(f"管理员用户初始化失败: {e}")
+        logger.error(f"管理员用户初始化失败: {e}")
         db.session.rollback()
 
-def init_all_data():
-    """初始化所有基础数据"""
+def init_all_data(new_tables=None):
+    """初始化所有基础数据
+
+    Args:
+        new_tables: 本次启动新建的表，为None时视为全部新建（首次运行或重建数据库）
+    """
     try:
         # 初始化管理员用户
         init_admin_user()
 
         # 检查是否已有数据
         if Specialty.query.first():
-            print("擅长方向数据已存在，跳过初始化")
+            logger.debug("擅长方向数据已存在，跳过初始化")
         else:
             init_specialties()
 
         if ShiftType.query.first():
-            print("班次类型数据已存在，跳过初始化")
+            logger.debug("班次类型数据已存在，跳过初始化")
         else:
             init_shift_types()
 
+        # 只在新建模板表时写入默认模板，管理员删除全部模板后重启不会恢复
+        if new_tables is not None and 'slot_templates' not in new_tables:
+            logger.debug("排班班次模板表已存在，跳过初始化")
+        elif SlotTemplate.query.first():
+            logger.debug("排班班次模板已存在，跳过初始化")
+        else:
+            init_slot_templates()
+
         # 初始化节假日数据（优先级1：基础配置）
         from scripts.data.holidays_init_data import check_holidays_data
         check_holidays_data()
@@ -178,10 +204,10 @@ def init_all_data():
         from scripts.data.users_init_data import init_users
         init_users()
 
-        print("基础数据初始化完成!")
+        logger.info("基础数据初始化完成")
 
     except Exception as e:
-        print(f"数据初始化失败: {e}")
+        logger.error(f"数据初始化失败: {e}")
         db.session.rollback()
 
 if __name__ == '__main__':
@@ -0,0 +1,139 @@
+"""
+日志配置
+应用内的日志（logger名以 app 开头，包括Flask的 app.logger）统一写入内存队列，由后台线程格式化并输出，
+请求线程不做磁盘或终端I/O；各模块的日志级别可以单独配置，生产环境可关闭调试输出
+
+附加的结构化字段通过 extra={'fields': {...}} 传入，例如:
+    logger.info('切换管理员权限', extra={'fields': {'user_id': 3, 'is_admin': True}})
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+APP_LOGGER = 'app'
+DEFAULT_LEVEL = 'INFO'
+
+
+class StructuredFormatter(logging.Formatter):
+    """输出一行文本（字段以JSON附在消息后）或一行JSON"""
+
+    def __init__(self, json_format: bool = False):
+        super().__init__()
+        self.json_format = json_format
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, 'fields', None) or {}
+        timestamp = self.formatTime(record, '%Y-%m-%d %H:%M:%S')
+        message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+
+        if self.json_format:
+            payload = {'time': timestamp, 'level': record.levelname, 'logger': record.name,
+                       'pid': record.process, 'message': message, **fields}
+            if record.exc_text:
+                payload['exception'] = record.exc_text
+            return json.dumps(payload, ensure_ascii=False, default=str)
+
+        line = f'{timestamp} {record.levelname:<7} {record.name}: {message}'
+        if fields:
+            line += ' ' + json.dumps(fields, ensure_ascii=False, default=str)
+        if record.exc_text:
+            line += '\n' + record.exc_text
+        return line
+
+
+class _AppQueueHandler(QueueHandler):
+    """写入当前进程的日志队列；gunicorn preload时在fork后的子进程中重新启动后台线程"""
+
+    def __init__(self, log_config):
+        super().__init__(log_config.queue)
+        self.log_config = log_config
+
+    def prepare(self, record):
+        """原样放入队列：默认实现会在请求线程中格式化消息和异常堆栈并清除exc_info，
+        这里保留原始参数和异常信息，全部由后台线程的 StructuredFormatter 格式化"""
+        return record
+
+    def emit(self, record):
+        if self.log_config.pid != os.getpid():
+            self.log_config.restart_after_fork()
+        super().emit(record)
+
+
+class LogConfig:
+    def __init__(self):
+        self.queue = queue.SimpleQueue()
+        self.pid = os.getpid()
+        self.handler = None
+        self.listener = None
+        self.output_handler = None
+        self._lock = threading.Lock()
+        self._atexit_registered = False
+
+    def init_app(self, app):
+        """绑定应用：按 LOG_LEVEL/LOG_LEVELS 设置级别，按 LOG_FORMAT/LOG_FILE 设置输出"""
+        app_logger = logging.getLogger(APP_LOGGER)
+        app_logger.setLevel(app.config.get('LOG_LEVEL', DEFAULT_LEVEL))
+        for name, level in app.config.get('LOG_LEVELS', {}).items():
+            logging.getLogger(name).setLevel(level)
+
+        log_file = app.config.get('LOG_FILE')
+        if log_file:
+            os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+            output_handler = logging.FileHandler(log_file, encoding='utf-8')
+        else:
+            output_handler = logging.StreamHandler(sys.stderr)
+        output_handler.setFormatter(StructuredFormatter(app.config.get('LOG_FORMAT') == 'json'))
+
+        with self._lock:
+            # 重复调用create_app时替换输出，不重复添加处理器
+            self._stop_listener()
+            if self.output_handler is not None:
+                self.output_handler.close()
+            self.output_handler = output_handler
+            self._start_listener()
+
+            if self.handler is None:
+                self.handler = _AppQueueHandler(self)
+                app_logger.addHandler(self.handler)
+                app_logger.propagate = False
+
+        if not self._atexit_registered:
+            self._atexit_registered = True
+            atexit.register(self.stop)
+
+    def _start_listener(self):
+        self.listener = QueueListener(self.queue, self.output_handler, respect_handler_level=True)
+        self.listener.start()
+
+    def _stop_listener(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def restart_after_fork(self):
+        """子进程不继承后台线程，使用新队列并重新启动（丢弃从主进程复制的未输出记录）"""
+        with self._lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.queue = queue.SimpleQueue()
+            self.handler.queue = self.queue
+            self.listener = None
+            if self.output_handler is not None:
+                self._start_listener()
+
+    def stop(self):
+        """输出队列中剩余的日志并停止后台线程（进程退出时调用）"""
+        with self._lock:
+            if self.pid == os.getpid():
+                self._stop_listener()
+
+# 创建全局实例
+log_config = LogConfig()
@@ -0,0 +1,103 @@
+"""
+最后登录时间写缓冲
+登录时只记录到内存，按批量或时间间隔合并写入数据库，避免交接班登录高峰争用SQLite写锁
+"""
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 20       # 累积多少条后立即落库
+DEFAULT_FLUSH_INTERVAL = 30   # 最早一条记录最多等待的秒数
+
+
+class LastLoginBuffer:
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE, flush_interval: int = DEFAULT_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending: Dict[int, datetime] = {}  # 用户ID -> 最后登录时间（同一用户只保留最新一次）
+        self._first_pending_at = None
+        self._lock = threading.Lock()
+        self._app = None
+
+    def init_app(self, app):
+        """绑定应用：读取配置，请求结束后检查是否需要落库，进程退出前写入剩余记录"""
+        self._app = app
+        self.batch_size = app.config.get('LAST_LOGIN_BATCH_SIZE', self.batch_size)
+        self.flush_interval = app.config.get('LAST_LOGIN_FLUSH_INTERVAL', self.flush_interval)
+
+        @app.teardown_appcontext
+        def flush_last_login(exception=None):
+            if self.is_due():
+                self.flush()
+
+        atexit.register(self.flush)
+
+    def record(self, user_id: int, login_time: datetime):
+        """记录一次登录"""
+        with self._lock:
+            if not self.pending:
+                self._first_pending_at = time.monotonic()
+            self.pending[user_id] = login_time
+
+    def is_due(self) -> bool:
+        """是否达到批量大小或等待时间"""
+        with self._lock:
+            if not self.pending:
+                return False
+            return (len(self.pending) >= self.batch_size or
+                    time.monotonic() - self._first_pending_at >= self.flush_interval)
+
+    def flush(self) -> int:
+        """
+        将缓冲的登录时间一次性写入数据库
+
+        使用独立连接和单条executemany语句，不参与当前请求的会话事务。
+        写入失败时记录会放回缓冲区，等待下次重试。
+
+        Returns:
+            int: 写入的记录数
+        """
+        with self._lock:
+            if not self.pending:
+                return 0
+            batch = self.pending
+            self.pending = {}
+            self._first_pending_at = None
+
+        try:
+            from app.extensions import db
+            from app.models import User
+
+            rows = [{'user_id': user_id, 'last_login': login_time} for user_id, login_time in batch.items()]
+            statement = (
+                User.__table__.update()
+                .where(User.__table__.c.id == db.bindparam('user_id'))
+                .values(last_login=db.bindparam('last_login'))
+            )
+            if self._app is not None:
+                with self._app.app_context():
+                    with db.engine.begin() as conn:
+                        conn.execute(statement, rows)
+            else:
+                with db.engine.begin() as conn:
+                    conn.execute(statement, rows)
+            return len(rows)
+
+        except Exception as e:
+            logger.error(f"写入最后登录时间失败: {e}")
+            with self._lock:
+                for user_id, login_time in batch.items():
+                    # 缓冲期间有更新的登录记录时保留较新的值
+                    if user_id not in self.pending:
+                        self.pending[user_id] = login_time
+                if self._first_pending_at is None:
+                    self._first_pending_at = time.monotonic()
+            return 0
+
+# 创建全局实例
+last_login_buffer = LastLoginBuffer()
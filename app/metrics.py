@@ -0,0 +1,330 @@
+"""
+运行时指标
+以Prometheus文本格式在 /metrics 输出请求耗时、SQL语句数、缓存命中、后台队列和排班生成耗时
+
+多进程部署（gunicorn多个worker）时，每个进程定期把自己的指标写入共享目录 METRICS_DIR 下的
+metrics-<pid>.json，/metrics 由任意一个worker响应，读取目录中所有进程的文件汇总后输出。
+worker退出后（包括max_requests定期重启），gunicorn主进程把它的计数并入 metrics-exited.json
+并删除它的文件，目录中的文件数不会随重启次数增长。
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Tuple
+
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_FLUSH_INTERVAL = 5  # 秒，写入共享目录的最短间隔
+EXITED_FILENAME = 'metrics-exited.json'  # 已退出进程累计的计数器和直方图
+
+# 指标定义：名称 -> (类型, 说明, 直方图分桶)
+METRICS = {
+    'fuyou_http_requests_total': ('counter', '按页面、方法和状态码统计的请求数', None),
+    'fuyou_http_request_duration_seconds': ('histogram', '按页面统计的请求耗时', DEFAULT_BUCKETS),
+    'fuyou_db_queries_total': ('counter', '执行的SQL语句数', None),
+    'fuyou_db_query_duration_seconds_total': ('counter', 'SQL语句累计耗时', None),
+    'fuyou_cache_requests_total': ('counter', '按缓存和结果（hit/miss）统计的缓存访问次数', None),
+    'fuyou_schedule_generation_seconds': ('histogram', '生成月排班耗时', (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)),
+    'fuyou_avatar_queue_depth': ('gauge', '等待后台处理的头像数', None),
+    'fuyou_last_login_pending': ('gauge', '等待写入数据库的最后登录时间记录数', None),
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels, extra: str = '') -> str:
+    parts = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _merge_snapshots(snapshots):
+    """汇总多个进程的指标
+
+    Returns:
+        tuple: (计数器, 直方图, 仪表值) 三个字典
+    """
+    counters, histograms, gauges = {}, {}, {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(tuple(label) for label in labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, entry in snapshot['histograms']:
+            key = (name, tuple(tuple(label) for label in labels))
+            total = histograms.setdefault(key, [0] * len(entry))
+            for i, value in enumerate(entry):
+                total[i] += value
+        for name, value in snapshot['gauges'].items():
+            gauges[name] = gauges.get(name, 0) + value
+    return counters, histograms, gauges
+
+
+def _read_snapshot(path):
+    """读取指标文件，不存在或内容损坏时返回None"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_snapshot(path, snapshot):
+    """写入指标文件（原子替换）"""
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f)
+    os.replace(temp_path, path)
+
+
+def merge_exited_process(directory: str, pid: int):
+    """把已退出进程的计数并入 metrics-exited.json 并删除该进程的指标文件
+
+    由gunicorn主进程在 child_exit 钩子中调用（单线程，汇总文件不会被并发写入）。
+    """
+    path = os.path.join(directory, f'metrics-{pid}.json')
+    if not os.path.exists(path):
+        return
+    snapshot = _read_snapshot(path)
+    if snapshot is not None:
+        exited_path = os.path.join(directory, EXITED_FILENAME)
+        exited = _read_snapshot(exited_path) or {'pid': None, 'counters': [], 'histograms': [], 'gauges': {}}
+        snapshot['gauges'] = {}  # 仪表值只统计存活的进程
+        counters, histograms, _ = _merge_snapshots([exited, snapshot])
+        try:
+            _write_snapshot(exited_path, {
+                'pid': None,
+                'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+                'histograms': [[name, list(labels), entry] for (name, labels), entry in histograms.items()],
+                'gauges': {},
+            })
+        except OSError as e:
+            logger.error(f"写入指标汇总文件失败: {e}")
+            return
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self.directory = None
+        self.flush_interval = DEFAULT_FLUSH_INTERVAL
+        self.counters: Dict[Tuple[str, LabelKey], float] = {}
+        self.histograms: Dict[Tuple[str, LabelKey], list] = {}  # [各分桶计数..., 总和, 次数]
+        self.gauges: Dict[str, Callable[[], float]] = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._last_dump = 0.0
+        self._listening = False
+
+    def init_app(self, app):
+        """绑定应用：ENABLE_METRICS 开启时记录请求指标，并在 METRICS_DIR 中与其他进程共享"""
+        self.enabled = app.config.get('ENABLE_METRICS', False)
+        if not self.enabled:
+            return
+
+        self.directory = app.config.get('METRICS_DIR') or os.path.join(app.instance_path, 'metrics')
+        self.flush_interval = app.config.get('METRICS_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+        os.makedirs(self.directory, exist_ok=True)
+        self._listen()
+
+        @app.before_request
+        def start_request_timer():
+            g.metrics_started = time.perf_counter()
+
+        @app.after_request
+        def record_request(response):
+            started = g.pop('metrics_started', None)
+            if started is not None:
+                endpoint = request.endpoint or 'unknown'
+                self.inc('fuyou_http_requests_total', endpoint=endpoint, method=request.method,
+                         status=response.status_code)
+                self.observe('fuyou_http_request_duration_seconds', time.perf_counter() - started,
+                             endpoint=endpoint, method=request.method)
+            return response
+
+        @app.teardown_appcontext
+        def dump_metrics(exception=None):
+            if time.monotonic() - self._last_dump >= self.flush_interval:
+                self.dump()
+
+        atexit.register(self.dump)
+
+    def _listen(self):
+        """注册SQLAlchemy游标事件（所有引擎，只注册一次）"""
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+
+        if self._listening:
+            return
+        self._listening = True
+
+        @event.listens_for(Engine, 'before_cursor_execute')
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault('metrics_start', []).append(time.perf_counter())
+
+        @event.listens_for(Engine, 'after_cursor_execute')
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            starts = conn.info.get('metrics_start')
+            if not starts:
+                return
+            elapsed = time.perf_counter() - starts.pop()
+            self.inc('fuyou_db_queries_total')
+            self.inc('fuyou_db_query_duration_seconds_total', elapsed)
+
+    def _check_fork(self):
+        """gunicorn preload时指标对象在fork前创建，子进程丢弃从主进程继承的数据"""
+        pid = os.getpid()
+        if pid != self._pid:
+            self._pid = pid
+            self.counters = {}
+            self.histograms = {}
+            self._last_dump = 0.0
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """计数器加值"""
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._check_fork()
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """直方图记录一次观测值"""
+        if not self.enabled:
+            return
+        buckets = METRICS[name][2]
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._check_fork()
+            entry = self.histograms.get(key)
+            if entry is None:
+                entry = self.histograms[key] = [0] * len(buckets) + [0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    entry[i] += 1
+                    break
+            entry[-2] += value
+            entry[-1] += 1
+
+    def cache_access(self, cache: str, hit: bool):
+        """记录一次缓存访问"""
+        self.inc('fuyou_cache_requests_total', cache=cache, result='hit' if hit else 'miss')
+
+    def register_gauge(self, name: str, func: Callable[[], float]):
+        """注册仪表值，每次输出或写入共享目录时调用func读取当前值"""
+        self.gauges[name] = func
+
+    def _snapshot(self) -> dict:
+        with self._lock:
+            self._check_fork()
+            counters = [[name, list(labels), value] for (name, labels), value in self.counters.items()]
+            histograms = [[name, list(labels), list(entry)] for (name, labels), entry in self.histograms.items()]
+        gauges = {}
+        for name, func in self.gauges.items():
+            try:
+                gauges[name] = float(func())
+            except Exception:
+                continue
+        return {'pid': os.getpid(), 'counters': counters, 'histograms': histograms, 'gauges': gauges}
+
+    def dump(self):
+        """把当前进程的指标写入共享目录（原子替换）"""
+        if not self.enabled or not self.directory:
+            return
+        self._last_dump = time.monotonic()
+        path = os.path.join(self.directory, f'metrics-{os.getpid()}.json')
+        try:
+            _write_snapshot(path, self._snapshot())
+        except OSError as e:
+            logger.error(f"写入指标文件失败: {e}")
+
+    def _load_snapshots(self):
+        """读取所有进程的指标和已退出进程的汇总，当前进程使用内存中的最新数据"""
+        snapshots = [self._snapshot()]
+        # 已退出进程的计数器保留（Prometheus按单调递增处理）
+        exited = _read_snapshot(os.path.join(self.directory, EXITED_FILENAME))
+        if exited is not None:
+            snapshots.append(exited)
+
+        own_file = f'metrics-{os.getpid()}.json'
+        for filename in os.listdir(self.directory):
+            if (not filename.startswith('metrics-') or not filename.endswith('.json')
+                    or filename in (own_file, EXITED_FILENAME)):
+                continue
+            snapshot = _read_snapshot(os.path.join(self.directory, filename))
+            if snapshot is None:
+                continue
+            # 尚未合并的已退出进程（非gunicorn部署或主进程异常）：计数器保留，仪表值只统计存活的进程
+            if not _pid_alive(snapshot.get('pid')):
+                snapshot['gauges'] = {}
+            snapshots.append(snapshot)
+        return snapshots
+
+    def render(self) -> str:
+        """汇总所有进程的指标，输出Prometheus文本格式"""
+        counters, histograms, gauges = _merge_snapshots(self._load_snapshots())
+
+        lines = []
+        for name, (metric_type, description, buckets) in METRICS.items():
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            if metric_type == 'counter':
+                for (metric_name, labels), value in sorted(counters.items()):
+                    if metric_name == name:
+                        lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+            elif metric_type == 'gauge':
+                if name in gauges:
+                    lines.append(f'{name} {_format_value(gauges[name])}')
+            else:
+                for (metric_name, labels), entry in sorted(histograms.items()):
+                    if metric_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(buckets, entry):
+                        cumulative += count
+                        bucket_labels = _format_labels(labels, 'le="%s"' % bound)
+                        lines.append(f'{name}_bucket{bucket_labels} {cumulative}')
+                    bucket_labels = _format_labels(labels, 'le="+Inf"')
+                    lines.append(f'{name}_bucket{bucket_labels} {entry[-1]}')
+                    lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(entry[-2])}')
+                    lines.append(f'{name}_count{_format_labels(labels)} {entry[-1]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _pid_alive(pid) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+# 创建全局实例
+metrics = Metrics()
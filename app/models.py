@@ -1,15 +1,45 @@
-from datetime import datetime, date
+import re
+from datetime import datetime, date, timedelta
 from calendar import monthrange
+from functools import lru_cache
 import sqlalchemy as sa
+from sqlalchemy.orm.attributes import set_committed_value
 from werkzeug.security import generate_password_hash, check_password_hash
+from flask import current_app
 from flask_login import UserMixin
 
 # 从extensions导入db实例
 from app.extensions import db
 
+# 默认密码哈希策略（与werkzeug 2.3默认值一致）
+DEFAULT_PASSWORD_HASH_METHOD = 'scrypt:32768:8:1'
+
+def get_password_hash_method():
+    """获取当前配置的密码哈希策略，格式为werkzeug哈希前缀，如 scrypt:32768:8:1 或 pbkdf2:sha256:260000"""
+    try:
+        return current_app.config.get('PASSWORD_HASH_METHOD', DEFAULT_PASSWORD_HASH_METHOD)
+    except RuntimeError:
+        return DEFAULT_PASSWORD_HASH_METHOD
+
+@lru_cache(maxsize=8)
+def get_password_hash_prefix(method):
+    """哈希策略对应的存储前缀：werkzeug会补全简写（scrypt -> scrypt:32768:8:1，pbkdf2:sha256 -> pbkdf2:sha256:600000）"""
+    return generate_password_hash('x', method=method).split('$', 1)[0]
+
+# 医生-擅长方向关联表（多对多），按擅长方向筛选医生时走索引连接查询
+doctor_specialties = db.Table(
+    'doctor_specialties',
+    db.Column('doctor_id', db.Integer, db.ForeignKey('doctors.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('specialty_id', db.Integer, db.ForeignKey('specialties.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_doctor_specialties_specialty_id', 'specialty_id', 'doctor_id')
+)
+
 class User(UserMixin, db.Model):
     """用户表"""
     __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('ix_users_list_order', 'created_at', 'id'),  # 用户列表排序/游标分页
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -28,17 +58,35 @@ class User(UserMixin, db.Model):
     associated_doctor = db.relationship('Doctor', foreign_keys=[associated_doctor_id], backref='associated_user')
 
     def set_password(self, password):
-        """设置密码"""
-        self.password_hash = generate_password_hash(password)
+        """设置密码（按当前配置的哈希策略）"""
+        self.password_hash = generate_password_hash(password, method=get_password_hash_method())
 
     def check_password(self, password):
         """验证密码"""
         return check_password_hash(self.password_hash, password)
 
+    def password_needs_rehash(self):
+        """检查密码哈希是否与当前策略不一致"""
+        return self.password_hash.split('$', 1)[0] != get_password_hash_prefix(get_password_hash_method())
+
+    def rehash_password_if_needed(self, password):
+        """验证通过后，如果哈希策略已变更则用新策略重新哈希（由调用方提交事务）
+
+        Returns:
+            bool: 是否重新哈希
+        """
+        if not self.password_needs_rehash():
+            return False
+        self.set_password(password)
+        return True
+
     def update_last_login(self):
-        """更新最后登录时间"""
-        self.last_login = datetime.utcnow()
-        db.session.commit()
+        """更新最后登录时间（写入缓冲区，由last_login_buffer批量落库）"""
+        from app.login_buffer import last_login_buffer
+        login_time = datetime.utcnow()
+        # 仅更新已加载的属性值供本次请求显示，不标记为待提交的修改
+        set_committed_value(self, 'last_login', login_time)
+        last_login_buffer.record(self.id, login_time)
 
     def get_role_name(self):
         """获取用户角色名称"""
@@ -114,14 +162,12 @@ class User(UserMixin, db.Model):
         return False
 
     def associate_with_doctor(self, doctor_id):
-        """关联医生"""
+        """关联医生（由调用方提交事务）"""
         self.associated_doctor_id = doctor_id
-        db.session.commit()
 
     def dissociate_doctor(self):
-        """取消关联医生"""
+        """取消关联医生（由调用方提交事务）"""
         self.associated_doctor_id = None
-        db.session.commit()
 
     def __repr__(self):
         return f'<User {self.username}>'
@@ -129,6 +175,10 @@ class User(UserMixin, db.Model):
 class Doctor(db.Model):
     """医生表"""
     __tablename__ = 'doctors'
+    __table_args__ = (
+        # 医生列表排序/游标分页（sequence升序、created_at和id降序，与DOCTOR_KEYSET_ORDER一致）
+        db.Index('ix_doctors_list_order_desc', 'sequence', sa.text('created_at DESC'), sa.text('id DESC')),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False)
@@ -137,7 +187,9 @@ class Doctor(db.Model):
     status = db.Column(db.String(10), default='在职')      # 在职状态: 在职/离职
     specialties = db.Column(db.Text)                     # 擅长方向，JSON格式存储多个方向
     annual_leave_days = db.Column(db.Integer, default=0)  # 每年年假天数
-    used_leave_days = db.Column(db.Integer, default=0)   # 本年已休息天数
+    used_leave_days = db.Column(db.Integer, default=0)   # 本年已休息天数（= 手工录入基数 + 本年公休记录天数）
+    # 请假记录之外手工录入的已休天数，新建时默认等于录入的已休天数
+    leave_days_baseline = db.Column(db.Integer, default=lambda context: context.get_current_parameters().get('used_leave_days') or 0)
     sequence = db.Column(db.Integer, default=999)       # 排序序号（仅超级管理员可编辑）
     avatar = db.Column(db.String(255))                   # 头像文件路径
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -146,11 +198,24 @@ class Doctor(db.Model):
     # 关联排班记录
     schedules = db.relationship('Schedule', backref='doctor', lazy=True)
 
-    def get_avatar_url(self):
-        """获取头像URL"""
+    # 擅长方向（关联表），与specialties字段由set_specialties_list同步维护
+    specialty_items = db.relationship('Specialty', secondary=doctor_specialties, lazy=True,
+                                      backref=db.backref('doctors', lazy='dynamic'))
+
+    def get_avatar_url(self, size=None):
+        """获取头像URL
+
+        Args:
+            size: 显示尺寸（像素），返回不小于该尺寸的最小缩略图，
+                  不指定时返回最大的缩略图；缩略图尚未生成时返回原头像
+        """
         if self.avatar:
             # 如果用户上传了自定义头像
-            return f'/static/uploads/avatars/{self.avatar}'
+            from app.utils import find_avatar_variant, AVATAR_SIZE
+            variant = find_avatar_variant(self.avatar, size or AVATAR_SIZE[0], current_app.config['UPLOAD_FOLDER'])
+            if variant:
+                return f'/avatars/{variant}'
+            return f'/avatars/{self.avatar}'
         else:
             # 根据性别返回默认头像
             if self.gender == '女':
@@ -158,20 +223,52 @@ class Doctor(db.Model):
             else:
                 return '/static/images/default_male_avatar.jpg'
 
+    def get_avatar_webp_url(self, size=150):
+        """获取WebP格式头像URL，没有自定义头像或尚未生成时返回None"""
+        if not self.avatar:
+            return None
+        from app.utils import find_avatar_variant
+        variant = find_avatar_variant(self.avatar, size, current_app.config['UPLOAD_FOLDER'], 'webp')
+        return f'/avatars/{variant}' if variant else None
+
     def get_specialties_list(self):
-        """获取擅长方向列表"""
-        import json
-        if not self.specialties:
-            return []
-        try:
-            return json.loads(self.specialties)
-        except:
-            return []
+        """获取擅长方向列表
+
+        解析结果缓存在实例上（以原始JSON文本为键），模板循环中多次调用只解析一次
+        """
+        raw = self.specialties
+        cached = self.__dict__.get('_specialties_cache')
+        if cached is not None and cached[0] is raw:
+            return list(cached[1])
+
+        parsed = _parse_specialties(raw)
+        self.__dict__['_specialties_cache'] = (raw, parsed)
+        return list(parsed)
 
     def set_specialties_list(self, specialties_list):
-        """设置擅长方向列表"""
+        """设置擅长方向列表（同时更新关联表）"""
         import json
         self.specialties = json.dumps(specialties_list)
+        self.__dict__.pop('_specialties_cache', None)
+        if specialties_list:
+            self.specialty_items = Specialty.query.filter(Specialty.name.in_(specialties_list)).all()
+        else:
+            self.specialty_items = []
+
+    @classmethod
+    def filter_by_specialty(cls, query, specialty_name):
+        """筛选具有指定擅长方向的医生（关联表索引连接，不解析JSON）
+
+        Args:
+            query: 医生查询对象
+            specialty_name: 擅长方向名称
+
+        Returns:
+            Query: 添加筛选条件后的查询
+        """
+        return query.join(doctor_specialties, doctor_specialties.c.doctor_id == cls.id).join(
+            Specialty, Specialty.id == doctor_specialties.c.specialty_id
+        ).filter(Specialty.name == specialty_name)
 
     def get_specialties_display(self):
         """获取擅长方向的显示文本"""
@@ -180,7 +277,35 @@ class Doctor(db.Model):
 
     def has_specialty(self, specialty_name):
         """检查是否有某个擅长方向"""
-        return specialty_name in self.get_specialties_list()
+        self.get_specialties_list()
+        return specialty_name in self.__dict__['_specialties_cache'][1]
+
+    def is_on_leave(self, day):
+        """检查指定日期是否请假（EXISTS查询，不加载请假记录）"""
+        return db.session.query(
+            LeavePeriod.overlapping(day).filter(LeavePeriod.doctor_id == self.id).exists()
+        ).scalar()
+
+    def has_leave_records(self, year=None):
+        """指定年份是否有公休记录（有记录时已休天数由记录计算，不再手工维护）"""
+        if year is None:
+            year = date.today().year
+        return db.session.query(
+            LeavePeriod.overlapping(date(year, 1, 1), date(year, 12, 31)).filter(
+                LeavePeriod.doctor_id == self.id,
+                LeavePeriod.leave_type == LeavePeriod.ANNUAL_LEAVE_TYPE
+            ).exists()
+        ).scalar()
+
+    def recompute_used_leave_days(self, year=None):
+        """按手工录入基数加公休记录落在指定年份的天数重新计算已休天数（由调用方提交事务）
+
+        请假记录增删、年度重置后调用；不做增量加减，跨年请假和重置后都能得到正确结果。
+        """
+        if year is None:
+            year = date.today().year
+        ledger_days = LeavePeriod.annual_days_by_doctor(year, [self.id]).get(self.id, 0)
+        self.used_leave_days = (self.leave_days_baseline or 0) + ledger_days
 
     def get_monthly_schedules_count(self, year=None, month=None):
         """获取指定月份的排班天数"""
@@ -292,6 +417,21 @@ class Doctor(db.Model):
     def __repr__(self):
         return f'<Doctor {self.name}>'
 
+def _parse_specialties(raw):
+    """解析擅长方向JSON文本，格式错误时返回空元组"""
+    import json
+    if not raw:
+        return ()
+    try:
+        return tuple(json.loads(raw))
+    except:
+        return ()
+
+@sa.event.listens_for(Doctor.specialties, 'set')
+def _clear_specialties_cache(target, value, oldvalue, initiator):
+    """直接给specialties字段赋值时清理解析缓存"""
+    target.__dict__.pop('_specialties_cache', None)
+
 class Specialty(db.Model):
     """擅长方向表"""
     __tablename__ = 'specialties'
@@ -321,6 +461,54 @@ class ShiftType(db.Model):
     def __repr__(self):
         return f'<ShiftType {self.name}>'
 
+class SlotTemplate(db.Model):
+    """排班班次模板表：各科室在哪类日期安排哪个班次、需要几人"""
+    __tablename__ = 'slot_templates'
+
+    # 适用的日期类型（与 app.holiday_utils.holidays 中的 DAY_TYPE_* 一致）
+    DAY_TYPE_LABELS = {
+        'weekday': '工作日',
+        'workday': '调休工作日',
+        'weekend': '周末',
+        'holiday': '法定节假日',
+    }
+    MAX_HEADCOUNT = 20  # 每个模板每天最多的人数，避免一次生成过多排班
+    TIME_RANGE_PATTERN = re.compile(r'^([01]\d|2[0-3]):[0-5]\d-(([01]\d|2[0-3]):[0-5]\d|24:00)$')  # HH:MM-HH:MM
+
+    id = db.Column(db.Integer, primary_key=True)
+    department = db.Column(db.String(50), nullable=False)
+    shift_type_id = db.Column(db.Integer, db.ForeignKey('shift_types.id'), nullable=False)
+    headcount = db.Column(db.Integer, nullable=False, default=1)  # 每天需要的人数
+    day_types = db.Column(db.String(50), nullable=False, default='weekday,workday')  # 逗号分隔
+    time_range = db.Column(db.String(20))  # 为空时使用班次类型的起止时间
+    sequence = db.Column(db.Integer, default=999)  # 同一天内班次的排列顺序
+    is_active = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    shift_type = db.relationship('ShiftType', lazy='joined')
+
+    def get_day_types(self):
+        """获取适用的日期类型列表"""
+        return [day_type for day_type in (self.day_types or '').split(',') if day_type in self.DAY_TYPE_LABELS]
+
+    def get_day_types_display(self):
+        """获取适用日期类型的中文显示"""
+        return '、'.join(self.DAY_TYPE_LABELS[day_type] for day_type in self.get_day_types())
+
+    @classmethod
+    def is_valid_time_range(cls, time_range):
+        """检查时间段格式是否为 HH:MM-HH:MM（结束时间可以是24:00）"""
+        return bool(cls.TIME_RANGE_PATTERN.match(time_range))
+
+    def get_time_range(self):
+        """获取时间段，未单独设置（或格式不正确）时使用班次类型的起止时间"""
+        if self.time_range and self.is_valid_time_range(self.time_range):
+            return self.time_range
+        return f"{self.shift_type.start_time.strftime('%H:%M')}-{self.shift_type.end_time.strftime('%H:%M')}"
+
+    def __repr__(self):
+        return f'<SlotTemplate {self.department} {self.shift_type_id} x{self.headcount}>'
+
 class Schedule(db.Model):
     """排班表"""
     __tablename__ = 'schedules'
@@ -381,6 +569,113 @@ class WorkScore(db.Model):
     def __repr__(self):
         return f'<WorkScore {self.doctor.name} - {self.date} - {self.score}分>'
 
+class LeavePeriod(db.Model):
+    """请假记录表（按日期区间记录，包含起止日期）"""
+    __tablename__ = 'leave_periods'
+    __table_args__ = (
+        db.Index('ix_leave_periods_doctor_range', 'doctor_id', 'start_date', 'end_date'),  # 单个医生的区间查询
+        db.Index('ix_leave_periods_range', 'start_date', 'end_date'),  # 按日期查询所有请假医生
+    )
+
+    ANNUAL_LEAVE_TYPE = '公休'  # 计入年假的请假类型（与班次类型“公休”一致）
+    LEAVE_TYPES = ['公休', '探亲假', '病假', '事假']
+
+    id = db.Column(db.Integer, primary_key=True)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctors.id'), nullable=False)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=False)
+    leave_type = db.Column(db.String(20), nullable=False, default=ANNUAL_LEAVE_TYPE)
+    notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    doctor = db.relationship('Doctor', backref=db.backref('leave_periods', lazy=True, cascade='all, delete-orphan',
+                                                          order_by='LeavePeriod.start_date'))
+
+    @property
+    def days(self):
+        """请假天数（包含起止日期）"""
+        return (self.end_date - self.start_date).days + 1
+
+    def days_in_year(self, year):
+        """落在指定年份内的请假天数"""
+        start = max(self.start_date, date(year, 1, 1))
+        end = min(self.end_date, date(year, 12, 31))
+        return max((end - start).days + 1, 0)
+
+    @classmethod
+    def overlapping(cls, start, end=None):
+        """查询与日期区间 [start, end] 有重叠的请假记录
+
+        Args:
+            start: 开始日期
+            end: 结束日期，默认与开始日期相同（即查询某一天）
+
+        Returns:
+            Query: 请假记录查询
+        """
+        end = end or start
+        return cls.query.filter(cls.start_date <= end, cls.end_date >= start)
+
+    @classmethod
+    def annual_days_by_doctor(cls, year, doctor_ids=None):
+        """汇总每名医生公休记录落在指定年份内的天数（一次查询）
+
+        Args:
+            year: 年份
+            doctor_ids: 只统计这些医生，默认全部
+
+        Returns:
+            Dict[int, int]: 医生ID -> 天数
+        """
+        first_day, last_day = date(year, 1, 1), date(year, 12, 31)
+        rows = db.session.query(cls.doctor_id, cls.start_date, cls.end_date).filter(
+            cls.leave_type == cls.ANNUAL_LEAVE_TYPE, cls.start_date <= last_day, cls.end_date >= first_day
+        )
+        if doctor_ids is not None:
+            rows = rows.filter(cls.doctor_id.in_(doctor_ids))
+        result = {}
+        for doctor_id, start_date, end_date in rows:
+            days = (min(end_date, last_day) - max(start_date, first_day)).days + 1
+            result[doctor_id] = result.get(doctor_id, 0) + days
+        return result
+
+    @classmethod
+    def leave_days(cls, start, end):
+        """获取日期区间内每名医生的请假日期（一次查询）
+
+        Returns:
+            Set[Tuple[int, date]]: (医生ID, 日期)
+        """
+        result = set()
+        rows = db.session.query(cls.doctor_id, cls.start_date, cls.end_date).filter(
+            cls.start_date <= end, cls.end_date >= start
+        )
+        for doctor_id, start_date, end_date in rows:
+            day = max(start_date, start)
+            while day <= min(end_date, end):
+                result.add((doctor_id, day))
+                day += timedelta(days=1)
+        return result
+
+    def __repr__(self):
+        return f'<LeavePeriod {self.doctor_id} {self.start_date}~{self.end_date} {self.leave_type}>'
+
+class LeaveResetLog(db.Model):
+    """年假重置审计表（每年每名医生一条，记录重置前的已休天数）"""
+    __tablename__ = 'leave_reset_logs'
+    __table_args__ = (
+        db.UniqueConstraint('year', 'doctor_id', name='uq_leave_reset_logs_year_doctor'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    year = db.Column(db.Integer, nullable=False, index=True)
+    doctor_id = db.Column(db.Integer, nullable=False)
+    previous_used_days = db.Column(db.Integer, nullable=False)
+    reset_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<LeaveResetLog {self.year} - {self.doctor_id} - {self.previous_used_days}>'
+
 class Holiday(db.Model):
     """节假日表"""
     __tablename__ = 'holidays'
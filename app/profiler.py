@@ -0,0 +1,157 @@
+"""
+按需请求性能分析
+超级管理员在URL中加 ?_profile=1（或请求头 X-Profile: 1）时，用cProfile记录该请求的函数耗时，
+结果保存到 instance/profiles（pstats格式，可用 snakeviz、flameprof 等工具生成火焰图），只保留最近的若干个
+"""
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import time
+from typing import Dict, List, Optional
+
+from flask import g, request
+from flask_login import current_user
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_PROFILES = 50   # 最多保留的分析结果数
+SUMMARY_LINES = 40          # 文本摘要中保留的函数数
+PROFILE_ID_PATTERN = re.compile(r'^[0-9]{8}-[0-9]{9}-[0-9]+-[\w.]+$')
+
+
+class RequestProfiler:
+    def __init__(self):
+        self.enabled = False
+        self.directory = None
+        self.max_profiles = DEFAULT_MAX_PROFILES
+
+    def init_app(self, app):
+        """绑定应用：ENABLE_PROFILER 和 ENABLE_DIAGNOSTICS 都开启时超级管理员可以对单个请求做性能分析"""
+        # 结果只能在诊断页面查看，诊断功能关闭时不记录
+        self.enabled = app.config.get('ENABLE_PROFILER', False) and app.config.get('ENABLE_DIAGNOSTICS', False)
+        if not self.enabled:
+            return
+
+        self.directory = app.config.get('PROFILES_DIR') or os.path.join(app.instance_path, 'profiles')
+        self.max_profiles = app.config.get('PROFILER_MAX_FILES', DEFAULT_MAX_PROFILES)
+
+        @app.before_request
+        def start_profiler():
+            if not self._requested():
+                return
+            # 先判断参数再读取当前用户，普通请求不增加额外开销
+            if not current_user.is_authenticated or not current_user.is_super_admin:
+                return
+            g.profiler = cProfile.Profile()
+            g.profiler_started = time.perf_counter()
+            g.profiler.enable()
+
+        @app.after_request
+        def stop_profiler(response):
+            profiler = g.pop('profiler', None)
+            if profiler is None:
+                return response
+            profiler.disable()
+            elapsed = time.perf_counter() - g.pop('profiler_started')
+            try:
+                profile_id = self._save(profiler, elapsed, response.status_code)
+                response.headers['X-Profile-Id'] = profile_id
+            except OSError as e:
+                logger.error(f"保存性能分析结果失败: {e}")
+            return response
+
+    @staticmethod
+    def _requested() -> bool:
+        return request.args.get('_profile') == '1' or request.headers.get('X-Profile') == '1'
+
+    def _save(self, profiler: cProfile.Profile, elapsed: float, status: int) -> str:
+        """保存pstats文件、文本摘要和请求信息，返回分析结果ID"""
+        os.makedirs(self.directory, exist_ok=True)
+        endpoint = re.sub(r'[^\w.]', '_', request.endpoint or 'unknown')
+        now = time.time()
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}{int(now * 1000) % 1000:03d}-{os.getpid()}-{endpoint}"
+        base = os.path.join(self.directory, profile_id)
+
+        profiler.dump_stats(f'{base}.prof')
+
+        output = io.StringIO()
+        stats = pstats.Stats(profiler, stream=output)
+        stats.sort_stats('cumulative').print_stats(SUMMARY_LINES)
+        with open(f'{base}.txt', 'w', encoding='utf-8') as f:
+            f.write(output.getvalue())
+
+        meta = {
+            'id': profile_id,
+            'time': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now)),
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': request.endpoint,
+            'status': status,
+            'user': current_user.username,
+            'total_ms': elapsed * 1000,
+            'calls': stats.total_calls,
+        }
+        with open(f'{base}.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        self._rotate()
+        return profile_id
+
+    def _profile_ids(self) -> List[str]:
+        """按时间倒序返回已保存的分析结果ID"""
+        if not self.directory or not os.path.isdir(self.directory):
+            return []
+        ids = {name[:-5] for name in os.listdir(self.directory) if name.endswith('.json')}
+        return sorted((profile_id for profile_id in ids if PROFILE_ID_PATTERN.match(profile_id)), reverse=True)
+
+    def _rotate(self):
+        """只保留最近 max_profiles 个分析结果"""
+        for profile_id in self._profile_ids()[self.max_profiles:]:
+            self.delete(profile_id)
+
+    def recent(self) -> List[Dict]:
+        """最近的分析结果（最新的在前）"""
+        items = []
+        for profile_id in self._profile_ids():
+            try:
+                with open(os.path.join(self.directory, f'{profile_id}.json'), encoding='utf-8') as f:
+                    items.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return items
+
+    def get(self, profile_id: str) -> Optional[Dict]:
+        """读取单个分析结果的请求信息和文本摘要，不存在时返回None"""
+        if not PROFILE_ID_PATTERN.match(profile_id) or not self.directory:
+            return None
+        base = os.path.join(self.directory, profile_id)
+        try:
+            with open(f'{base}.json', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(f'{base}.txt', encoding='utf-8') as f:
+                meta['summary'] = f.read()
+        except (OSError, ValueError):
+            return None
+        return meta
+
+    def delete(self, profile_id: str):
+        """删除单个分析结果"""
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return
+        for extension in ('.prof', '.txt', '.json'):
+            try:
+                os.remove(os.path.join(self.directory, f'{profile_id}{extension}'))
+            except OSError:
+                pass
+
+    def clear(self):
+        """删除全部分析结果"""
+        for profile_id in self._profile_ids():
+            self.delete(profile_id)
+
+# 创建全局实例
+profiler = RequestProfiler()
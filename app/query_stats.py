@@ -0,0 +1,163 @@
+"""
+SQL查询统计
+记录每个请求执行的SQL语句数量、数据库总耗时和最慢的语句，
+通过 Server-Timing 响应头输出（浏览器开发者工具的“网络 > 时间”中可见），并保留最近的请求供超级管理员查看
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from flask import g, has_request_context, request
+
+DEFAULT_HISTORY_SIZE = 100   # 保留最近多少个请求的统计
+DEFAULT_SLOWEST_COUNT = 5    # 每个请求保留最慢的几条语句
+STATEMENT_MAX_LENGTH = 500   # 保存的SQL语句最大长度
+
+
+class RequestQueryStats:
+    """单个请求（或代码块）的查询统计"""
+
+    def __init__(self, slowest_count: int = DEFAULT_SLOWEST_COUNT):
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest: List[tuple] = []  # [(耗时秒, SQL语句)]，按耗时降序
+        self.slowest_count = slowest_count
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.total_time += elapsed
+        if len(self.slowest) < self.slowest_count or elapsed > self.slowest[-1][0]:
+            self.slowest.append((elapsed, statement[:STATEMENT_MAX_LENGTH]))
+            self.slowest.sort(key=lambda item: item[0], reverse=True)
+            del self.slowest[self.slowest_count:]
+
+
+class QueryStats:
+    def __init__(self):
+        self.enabled = False
+        self.history = deque(maxlen=DEFAULT_HISTORY_SIZE)
+        self.slowest_count = DEFAULT_SLOWEST_COUNT
+        self._collectors: List[RequestQueryStats] = []  # count_queries() 注册的收集器
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def init_app(self, app):
+        """绑定应用：ENABLE_QUERY_STATS 开启时记录每个请求的查询并添加 Server-Timing 响应头"""
+        self.enabled = app.config.get('ENABLE_QUERY_STATS', False)
+        self.history = deque(maxlen=app.config.get('QUERY_STATS_HISTORY', DEFAULT_HISTORY_SIZE))
+        self.slowest_count = app.config.get('QUERY_STATS_SLOWEST', DEFAULT_SLOWEST_COUNT)
+        if not self.enabled:
+            return
+
+        self._listen()
+
+        @app.before_request
+        def start_query_stats():
+            g.query_stats = RequestQueryStats(self.slowest_count)
+            g.query_stats_started = time.perf_counter()
+
+        @app.after_request
+        def add_server_timing(response):
+            stats = g.pop('query_stats', None)
+            if stats is None:
+                return response
+            total = time.perf_counter() - g.pop('query_stats_started')
+
+            response.headers.add('Server-Timing', f'db;dur={stats.total_time * 1000:.1f};desc="{stats.count} queries"')
+            response.headers.add('Server-Timing', f'app;dur={total * 1000:.1f}')
+
+            # 统计页面本身不记入历史
+            if request.endpoint != 'main.debug_queries':
+                self.history.appendleft({
+                    'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+                    'method': request.method,
+                    'path': request.full_path.rstrip('?'),
+                    'endpoint': request.endpoint,
+                    'status': response.status_code,
+                    'count': stats.count,
+                    'db_ms': stats.total_time * 1000,
+                    'total_ms': total * 1000,
+                    'slowest': [(elapsed * 1000, statement) for elapsed, statement in stats.slowest],
+                })
+            return response
+
+    def _listen(self):
+        """注册SQLAlchemy游标事件（所有引擎，只注册一次）"""
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+
+        if self._listening:
+            return
+        self._listening = True
+
+        @event.listens_for(Engine, 'before_cursor_execute')
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault('query_stats_start', []).append(time.perf_counter())
+
+        @event.listens_for(Engine, 'after_cursor_execute')
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            starts = conn.info.get('query_stats_start')
+            if not starts:
+                return
+            elapsed = time.perf_counter() - starts.pop()
+            self._record(statement, elapsed)
+
+    def _record(self, statement: str, elapsed: float):
+        if has_request_context():
+            stats = g.get('query_stats')
+            if stats is not None:
+                stats.record(statement, elapsed)
+        with self._lock:
+            collectors = list(self._collectors)
+        for collector in collectors:
+            collector.record(statement, elapsed)
+
+    def recent(self, endpoint: Optional[str] = None) -> List[Dict]:
+        """最近的请求统计（最新的在前）"""
+        items = list(self.history)
+        if endpoint:
+            items = [item for item in items if item['endpoint'] == endpoint]
+        return items
+
+    def clear(self):
+        """清空历史记录"""
+        self.history.clear()
+
+    @contextmanager
+    def count_queries(self):
+        """
+        统计代码块内执行的SQL语句（不依赖 ENABLE_QUERY_STATS 配置）
+
+        用法:
+            with query_stats.count_queries() as stats:
+                client.get('/schedules')
+            print(stats.count, stats.total_time)
+        """
+        self._listen()
+        collector = RequestQueryStats(self.slowest_count)
+        with self._lock:
+            self._collectors.append(collector)
+        try:
+            yield collector
+        finally:
+            with self._lock:
+                self._collectors.remove(collector)
+
+    @contextmanager
+    def assert_max_queries(self, budget: int, label: str = ''):
+        """
+        断言代码块内执行的SQL语句不超过预算，用于发现N+1查询
+
+        Raises:
+            AssertionError: 超出预算，错误信息中包含最慢的语句
+        """
+        with self.count_queries() as collector:
+            yield collector
+        if collector.count > budget:
+            slowest = '\n'.join(f'  {elapsed * 1000:.2f}ms  {statement}' for elapsed, statement in collector.slowest)
+            raise AssertionError(f'{label or "查询"}执行了 {collector.count} 条SQL，超出预算 {budget} 条\n{slowest}')
+
+# 创建全局实例
+query_stats = QueryStats()
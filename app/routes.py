@@ -1,11 +1,23 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app, send_from_directory
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta
-from app.models import Doctor, Specialty, User, Schedule
+from app.models import Doctor, Specialty, User, Schedule, LeavePeriod, ShiftType, SlotTemplate
 from app.extensions import db
-from app.utils import save_avatar, delete_avatar, admin_required, editor_required, super_admin_required
+from app.utils import (save_avatar, save_avatar_stream, delete_avatar, queue_avatar_processing, get_content_addressed_name,
+                       is_avatar_final, is_uploaded_avatar, schedule_orphan_avatar_sweep,
+                       admin_required, editor_required, super_admin_required, diagnostics_required, log_sampled, id_in,
+                       keyset_paginate, cached_total, AVATAR_CACHE_MAX_AGE)
+from app.user_cache import user_cache
+from app.search_index import search_index
+from app.query_stats import query_stats
+from app.metrics import metrics
+from app.profiler import profiler
+import hmac
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 main = Blueprint('main', __name__)
 
 @main.route('/')
@@ -113,6 +125,81 @@ def schedules():
                          weekdays=weekdays,
                          holiday_helper=type('HolidayHelper', (), {'is_holiday': lambda x, y=None: False})())
 
+@main.route('/slot_templates')
+@admin_required
+def slot_templates_page():
+    """排班班次模板管理页面"""
+    templates = SlotTemplate.query.order_by(SlotTemplate.sequence, SlotTemplate.id).all()
+    shift_types = ShiftType.query.filter(ShiftType.duration_hours > 0).order_by(ShiftType.start_time).all()
+    return render_template('schedules/slot_templates.html',
+                         templates=templates,
+                         shift_types=shift_types,
+                         day_type_labels=SlotTemplate.DAY_TYPE_LABELS,
+                         max_headcount=SlotTemplate.MAX_HEADCOUNT)
+
+@main.route('/slot_templates/add', methods=['POST'])
+@admin_required
+def add_slot_template():
+    """添加排班班次模板"""
+    department = request.form.get('department', '').strip()
+    shift_type_id = request.form.get('shift_type_id', type=int)
+    headcount = request.form.get('headcount', 1, type=int)
+    day_types = [day_type for day_type in request.form.getlist('day_types') if day_type in SlotTemplate.DAY_TYPE_LABELS]
+    time_range = request.form.get('time_range', '').strip()
+
+    error = None
+    if not department:
+        error = '请输入科室'
+    elif not shift_type_id or not ShiftType.query.get(shift_type_id):
+        error = '请选择班次类型'
+    elif headcount is None or headcount < 1:
+        error = '人数至少为1'
+    elif headcount > SlotTemplate.MAX_HEADCOUNT:
+        error = f'人数不能超过{SlotTemplate.MAX_HEADCOUNT}'
+    elif not day_types:
+        error = '请至少选择一种适用日期'
+    elif time_range and not SlotTemplate.is_valid_time_range(time_range):
+        error = '时间段格式应为 HH:MM-HH:MM，例如 08:00-16:00'
+    if error:
+        flash(error, 'error')
+        return redirect(url_for('main.slot_templates_page'))
+
+    try:
+        db.session.add(SlotTemplate(
+            department=department,
+            shift_type_id=shift_type_id,
+            headcount=headcount,
+            day_types=','.join(day_types),
+            time_range=time_range or None,
+            sequence=request.form.get('sequence', 999, type=int)
+        ))
+        db.session.commit()
+        flash(f'已添加{department}的班次模板', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'添加失败：{str(e)}', 'error')
+    return redirect(url_for('main.slot_templates_page'))
+
+@main.route('/slot_templates/<int:template_id>/toggle', methods=['POST'])
+@admin_required
+def toggle_slot_template(template_id):
+    """启用或停用排班班次模板"""
+    template = SlotTemplate.query.get_or_404(template_id)
+    template.is_active = not template.is_active
+    db.session.commit()
+    flash(f'已{"启用" if template.is_active else "停用"}{template.department}的{template.shift_type.name}模板', 'success')
+    return redirect(url_for('main.slot_templates_page'))
+
+@main.route('/slot_templates/<int:template_id>/delete', methods=['POST'])
+@admin_required
+def delete_slot_template(template_id):
+    """删除排班班次模板（已生成的排班不受影响）"""
+    template = SlotTemplate.query.get_or_404(template_id)
+    db.session.delete(template)
+    db.session.commit()
+    flash(f'已删除{template.department}的{template.shift_type.name}模板', 'success')
+    return redirect(url_for('main.slot_templates_page'))
+
 # ========== 医生管理相关路由 ==========
 
 @main.route('/doctors')
@@ -120,18 +207,67 @@ def doctors():
     """医生列表页面"""
     page = request.args.get('page', 1, type=int)
     search = request.args.get('search', '')
+    specialty = request.args.get('specialty', '')
 
     query = Doctor.query
     if search:
-        query = query.filter(Doctor.name.like(f'%{search}%'))
+        # 支持姓名、拼音和首字母搜索
+        query = query.filter(id_in(Doctor.id, search_index.search('doctor', search)))
+    if specialty:
+        query = Doctor.filter_by_specialty(query, specialty)
 
+    # 总数使用缓存，翻页时不再每页执行COUNT(*)
     doctors = query.order_by(Doctor.sequence.asc(), Doctor.created_at.desc()).paginate(
-        page=page, per_page=10, error_out=False
+        page=page, per_page=10, error_out=False, count=False
     )
+    doctors.total = cached_total('doctor', (search, specialty), query)
 
     return render_template('doctors/index.html',
                          doctors=doctors,
-                         search=search)
+                         search=search,
+                         specialty=specialty,
+                         specialties=Specialty.query.order_by(Specialty.id).all())
+
+# 医生列表排序（游标分页使用，id保证唯一）
+DOCTOR_KEYSET_ORDER = [(Doctor.sequence, False), (Doctor.created_at, True), (Doctor.id, True)]
+
+@main.route('/api/doctors')
+def api_doctors():
+    """医生列表JSON接口（游标分页，供无限滚动使用）"""
+    cursor = request.args.get('cursor')
+    per_page = max(1, min(request.args.get('per_page', 20, type=int), 100))
+    search = request.args.get('search', '')
+    specialty = request.args.get('specialty', '')
+    with_total = request.args.get('total') == '1'
+
+    query = Doctor.query
+    if search:
+        query = query.filter(id_in(Doctor.id, search_index.search('doctor', search)))
+    if specialty:
+        query = Doctor.filter_by_specialty(query, specialty)
+
+    try:
+        items, next_cursor = keyset_paginate(query, DOCTOR_KEYSET_ORDER, cursor, per_page)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    result = {
+        'success': True,
+        'items': [{
+            'id': doctor.id,
+            'name': doctor.name,
+            'gender': doctor.gender,
+            'title': doctor.title,
+            'status': doctor.status,
+            'specialties': doctor.get_specialties_list(),
+            'sequence': doctor.sequence,
+            'avatar_url': doctor.get_avatar_url(50)
+        } for doctor in items],
+        'next_cursor': next_cursor
+    }
+    if with_total:
+        result['total'] = cached_total('doctor', (search, specialty), query)
+    return jsonify(result)
 
 @main.route('/doctors/add', methods=['GET', 'POST'])
 @admin_required
@@ -174,16 +310,24 @@ def add_doctor():
 
         # 处理头像上传
         avatar = None
+        uploaded_avatar = request.form.get('avatarFilename', '').strip()
         cropped_avatar_data = request.form.get('croppedAvatar')
 
-        # 优先处理裁剪后的图片（base64数据）
-        if cropped_avatar_data:
+        # 优先使用已通过 /avatars/upload 上传的裁剪图片
+        if uploaded_avatar:
+            if is_uploaded_avatar(uploaded_avatar, current_app.config['UPLOAD_FOLDER']):
+                avatar = uploaded_avatar
+            else:
+                flash('头像文件不存在，请重新上传', 'warning')
+
+        # 兼容旧版页面提交的裁剪图片（base64数据）
+        elif cropped_avatar_data:
             try:
                 import base64
                 from io import BytesIO
                 from PIL import Image
                 import os
-                import uuid
+                import hashlib
 
                 # 解析base64数据
                 if 'base64,' in cropped_avatar_data:
@@ -197,8 +341,8 @@ def add_doctor():
                 # 使用PIL处理图片
                 img = Image.open(BytesIO(image_data))
 
-                # 生成唯一的文件名
-                filename = f"avatar_temp_{uuid.uuid4().hex[:8]}.jpg"
+                # 按图片内容哈希命名，相同图片只保存一份
+                filename = get_content_addressed_name(hashlib.sha256(image_data).hexdigest(), 'jpg')
 
                 # 确保上传目录存在
                 upload_folder = current_app.config['UPLOAD_FOLDER']
@@ -207,7 +351,9 @@ def add_doctor():
 
                 # 保存图片
                 filepath = os.path.join(upload_folder, filename)
-                img.save(filepath, 'JPEG', quality=90, optimize=True)
+                if not os.path.exists(filepath):
+                    img.save(filepath, 'JPEG', quality=90, optimize=True)
+                    queue_avatar_processing(filepath)
 
                 avatar = filename
 
@@ -312,16 +458,24 @@ def edit_doctor(doctor_id):
 
         # 处理头像更新
         new_avatar = None
+        uploaded_avatar = request.form.get('avatarFilename', '').strip()
         cropped_avatar_data = request.form.get('croppedAvatar')
 
-        # 优先处理裁剪后的图片（base64数据）
-        if cropped_avatar_data:
+        # 优先使用已通过 /avatars/upload 上传的裁剪图片
+        if uploaded_avatar:
+            if is_uploaded_avatar(uploaded_avatar, current_app.config['UPLOAD_FOLDER']):
+                new_avatar = uploaded_avatar
+            else:
+                flash('头像文件不存在，请重新上传', 'warning')
+
+        # 兼容旧版页面提交的裁剪图片（base64数据）
+        elif cropped_avatar_data:
             try:
                 import base64
                 from io import BytesIO
                 from PIL import Image
                 import os
-                import uuid
+                import hashlib
 
                 # 解析base64数据
                 if 'base64,' in cropped_avatar_data:
@@ -335,8 +489,8 @@ def edit_doctor(doctor_id):
                 # 使用PIL处理图片
                 img = Image.open(BytesIO(image_data))
 
-                # 生成唯一的文件名
-                filename = f"avatar_{doctor.id}_{uuid.uuid4().hex[:8]}.jpg"
+                # 按图片内容哈希命名，相同图片只保存一份
+                filename = get_content_addressed_name(hashlib.sha256(image_data).hexdigest(), 'jpg')
 
                 # 确保上传目录存在
                 upload_folder = current_app.config['UPLOAD_FOLDER']
@@ -345,7 +499,9 @@ def edit_doctor(doctor_id):
 
                 # 保存图片
                 filepath = os.path.join(upload_folder, filename)
-                img.save(filepath, 'JPEG', quality=90, optimize=True)
+                if not os.path.exists(filepath):
+                    img.save(filepath, 'JPEG', quality=90, optimize=True)
+                    queue_avatar_processing(filepath)
 
                 new_avatar = filename
 
@@ -368,7 +524,10 @@ def edit_doctor(doctor_id):
             doctor.title = title
             doctor.status = status
             doctor.annual_leave_days = annual_leave_days
-            doctor.used_leave_days = used_leave_days
+            # 本年有公休记录时已休天数由记录计算，不接受手工修改
+            if not doctor.has_leave_records():
+                doctor.leave_days_baseline = used_leave_days
+                doctor.recompute_used_leave_days()
             # 更新擅长方向
             doctor.set_specialties_list(specialties_list)
 
@@ -412,13 +571,14 @@ def delete_doctor(doctor_id):
     doctor = Doctor.query.get_or_404(doctor_id)
 
     try:
-        # 删除头像文件
-        if doctor.avatar:
-            delete_avatar(doctor.avatar, current_app.config['UPLOAD_FOLDER'])
-
+        avatar = doctor.avatar
         db.session.delete(doctor)
         db.session.commit()
 
+        # 删除头像文件（其他医生仍在使用相同头像时保留）
+        if avatar:
+            delete_avatar(avatar, current_app.config['UPLOAD_FOLDER'])
+
         flash(f'医生 {doctor.name} 删除成功！', 'success')
         return redirect(url_for('main.doctors'))
     except Exception as e:
@@ -446,7 +606,128 @@ def view_doctor(doctor_id):
         'current_month': current_month
     }
 
-    return render_template('doctors/view.html', doctor=doctor, stats=stats)
+    # 本年度请假记录
+    leave_periods = LeavePeriod.overlapping(date(current_year, 1, 1), date(current_year, 12, 31)).filter(
+        LeavePeriod.doctor_id == doctor.id
+    ).order_by(LeavePeriod.start_date).all()
+
+    return render_template('doctors/view.html', doctor=doctor, stats=stats,
+                         leave_periods=leave_periods,
+                         leave_types=LeavePeriod.LEAVE_TYPES)
+
+@main.route('/doctors/<int:doctor_id>/leaves', methods=['POST'])
+@admin_required
+def add_leave(doctor_id):
+    """添加请假记录"""
+    doctor = Doctor.query.get_or_404(doctor_id)
+
+    start_str = request.form.get('start_date', '')
+    end_str = request.form.get('end_date', '') or start_str
+    leave_type = request.form.get('leave_type', LeavePeriod.ANNUAL_LEAVE_TYPE)
+    notes = request.form.get('notes', '').strip()
+
+    # 表单验证
+    error = None
+    try:
+        start_date = datetime.strptime(start_str, '%Y-%m-%d').date()
+        end_date = datetime.strptime(end_str, '%Y-%m-%d').date()
+    except ValueError:
+        start_date = end_date = None
+        error = '日期格式错误，请使用YYYY-MM-DD格式'
+
+    if not error and end_date < start_date:
+        error = '结束日期不能早于开始日期'
+    elif not error and leave_type not in LeavePeriod.LEAVE_TYPES:
+        error = '请选择请假类型'
+
+    if not error:
+        conflict = LeavePeriod.overlapping(start_date, end_date).filter(LeavePeriod.doctor_id == doctor.id).first()
+        if conflict:
+            error = f'与已有请假记录重叠：{conflict.start_date} 至 {conflict.end_date}（{conflict.leave_type}）'
+
+    if error:
+        flash(error, 'error')
+        return redirect(url_for('main.view_doctor', doctor_id=doctor.id))
+
+    try:
+        leave = LeavePeriod(
+            doctor_id=doctor.id,
+            start_date=start_date,
+            end_date=end_date,
+            leave_type=leave_type,
+            notes=notes or None
+        )
+        db.session.add(leave)
+        doctor.recompute_used_leave_days()
+        db.session.commit()
+        flash(f'已添加 {doctor.name} 的请假记录：{start_date} 至 {end_date}', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'添加失败：{str(e)}', 'error')
+
+    return redirect(url_for('main.view_doctor', doctor_id=doctor.id))
+
+@main.route('/doctors/<int:doctor_id>/leaves/<int:leave_id>/delete', methods=['POST'])
+@admin_required
+def delete_leave(doctor_id, leave_id):
+    """删除请假记录"""
+    doctor = Doctor.query.get_or_404(doctor_id)
+    leave = LeavePeriod.query.filter_by(id=leave_id, doctor_id=doctor.id).first_or_404()
+
+    try:
+        db.session.delete(leave)
+        doctor.recompute_used_leave_days()
+        db.session.commit()
+        flash('请假记录已删除', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'删除失败：{str(e)}', 'error')
+
+    return redirect(url_for('main.view_doctor', doctor_id=doctor.id))
+
+@main.route('/avatars/upload', methods=['POST'])
+@editor_required
+def upload_avatar():
+    """上传头像（二进制流）
+
+    支持 application/octet-stream 请求体或 multipart 表单的 avatar 字段，
+    流式写入临时文件后按内容哈希保存，返回文件名供医生表单的 avatarFilename 字段提交。
+    """
+    if not (current_user.is_admin or current_user.is_super_admin or current_user.associated_doctor_id):
+        return jsonify({'success': False, 'message': '没有上传头像的权限'}), 403
+
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    if request.mimetype == 'application/octet-stream':
+        filename = save_avatar_stream(request.stream, upload_folder)
+    elif 'avatar' in request.files:
+        filename = save_avatar_stream(request.files['avatar'].stream, upload_folder)
+    else:
+        return jsonify({'success': False, 'message': '没有选择文件'}), 400
+
+    if not filename:
+        return jsonify({'success': False, 'message': '头像上传失败，请检查文件格式、大小和尺寸'}), 400
+
+    # 顺带清理放弃裁剪或未提交表单留下的头像
+    schedule_orphan_avatar_sweep(current_app._get_current_object())
+
+    return jsonify({'success': True, 'filename': filename, 'url': f'/avatars/{filename}'})
+
+@main.route('/avatars/<filename>')
+def doctor_avatar(filename):
+    """医生头像
+
+    按内容哈希命名且已处理完成的头像内容不会再变化，返回一年的immutable缓存头；
+    其余头像每次用ETag协商缓存。
+    """
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    if is_avatar_final(filename, upload_folder):
+        response = send_from_directory(upload_folder, filename, max_age=AVATAR_CACHE_MAX_AGE)
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+    else:
+        response = send_from_directory(upload_folder, filename, max_age=0)
+        response.cache_control.no_cache = True
+    return response
 
 
 # ========== 用户-医生关联功能 ==========
@@ -472,15 +753,21 @@ def associate_doctor(user_id):
             if action == 'associate' and doctor_id:
                 # 关联用户与医生
                 user.associate_with_doctor(int(doctor_id))
+                db.session.commit()
                 flash(f'已将用户 {user.username} 与医生关联', 'success')
             elif action == 'dissociate':
                 # 取消关联
                 user.dissociate_doctor()
+                db.session.commit()
                 flash(f'已取消用户 {user.username} 的医生关联', 'success')
             else:
                 flash('操作无效', 'error')
 
+            # 关联医生影响头像、年假等权限判断
+            user_cache.invalidate(user.id)
+
         except Exception as e:
+            db.session.rollback()
             flash(f'操作失败：{str(e)}', 'error')
 
         return redirect(url_for('main.users'))
@@ -492,16 +779,18 @@ def associate_doctor(user_id):
 # ========== 调试路由 ==========
 
 @main.route('/debug_simple')
+@diagnostics_required
 def debug_simple():
     """简单的调试路由"""
     return "调试路由正常工作！"
 
 @main.route('/debug_db_status')
+@diagnostics_required
 def debug_db_status():
-    """数据库状态调试"""
+    """数据库状态调试（最多显示 DIAGNOSTICS_MAX_ROWS 个用户）"""
     try:
         from app.models import User
-        users = User.query.all()
+        users = User.query.order_by(User.id).limit(current_app.config.get('DIAGNOSTICS_MAX_ROWS', 200)).all()
         user_info = []
         for user in users:
             user_info.append(f"{user.username}: is_admin={user.is_admin}, is_super_admin={user.is_super_admin}")
@@ -510,43 +799,143 @@ def debug_db_status():
     except Exception as e:
         return f"错误: {str(e)}"
 
+@main.route('/metrics')
+def metrics_endpoint():
+    """Prometheus指标（汇总所有worker）
+
+    仅允许 METRICS_ALLOWED_IPS 中的地址访问。经nginx转发的请求来源地址都是本机，
+    因此设置了 METRICS_TOKEN 时必须带令牌，未设置时拒绝带转发头的请求。
+    """
+    if not metrics.enabled:
+        return '', 404
+    if request.remote_addr not in current_app.config.get('METRICS_ALLOWED_IPS', []):
+        return '', 403
+    token = current_app.config.get('METRICS_TOKEN')
+    if token:
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return '', 401
+    elif 'X-Forwarded-For' in request.headers or 'X-Real-IP' in request.headers:
+        return '', 403
+    return current_app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@main.route('/debug/queries')
+@diagnostics_required
+def debug_queries():
+    """SQL查询统计面板：最近请求的SQL语句数、数据库耗时和最慢的语句"""
+    endpoint = request.args.get('endpoint', '')
+    return render_template('debug/queries.html',
+                         enabled=query_stats.enabled,
+                         requests=query_stats.recent(endpoint or None),
+                         endpoints=sorted({item['endpoint'] for item in query_stats.recent() if item['endpoint']}),
+                         endpoint=endpoint,
+                         query_warning=current_app.config.get('QUERY_STATS_WARNING', 20))
+
+@main.route('/debug/queries/clear', methods=['POST'])
+@diagnostics_required
+def clear_debug_queries():
+    """清空SQL查询统计记录"""
+    query_stats.clear()
+    flash('查询统计记录已清空', 'success')
+    return redirect(url_for('main.debug_queries'))
+
+@main.route('/debug/profiles')
+@diagnostics_required
+def debug_profiles():
+    """性能分析结果列表（在任意页面URL后加 ?_profile=1 记录）"""
+    return render_template('debug/profiles.html',
+                         enabled=profiler.enabled,
+                         profiles=profiler.recent(),
+                         max_profiles=profiler.max_profiles)
+
+@main.route('/debug/profiles/<profile_id>')
+@diagnostics_required
+def view_debug_profile(profile_id):
+    """查看单个性能分析结果的函数耗时摘要"""
+    profile = profiler.get(profile_id)
+    if profile is None:
+        flash('性能分析结果不存在或已被清理', 'error')
+        return redirect(url_for('main.debug_profiles'))
+    return render_template('debug/profile_detail.html', profile=profile)
+
+@main.route('/debug/profiles/<profile_id>/download')
+@diagnostics_required
+def download_debug_profile(profile_id):
+    """下载pstats文件（可用 snakeviz、flameprof 等工具查看火焰图）"""
+    if profiler.get(profile_id) is None:
+        flash('性能分析结果不存在或已被清理', 'error')
+        return redirect(url_for('main.debug_profiles'))
+    return send_from_directory(profiler.directory, f'{profile_id}.prof', as_attachment=True)
+
+@main.route('/debug/profiles/clear', methods=['POST'])
+@diagnostics_required
+def clear_debug_profiles():
+    """删除全部性能分析结果"""
+    profiler.clear()
+    flash('性能分析结果已清空', 'success')
+    return redirect(url_for('main.debug_profiles'))
+
 # ========== 用户管理相关路由 ==========
 
 @main.route('/users')
 @admin_required
 def users():
     """用户管理页面"""
-    print("DEBUG: Accessing user management page")
-    print(f"   Current user: {current_user.username}")
-
     page = request.args.get('page', 1, type=int)
     search = request.args.get('search', '')
 
-    query = User.query
+    log_sampled('users_page', user=current_user.username, page=page, search=search)
 
-    # 打印所有用户的权限状态（仅第一页）
-    if page == 1:
-        all_users = query.all()
-        print("   Current user permissions in database:")
-        for user in all_users[:10]:  # 只显示前10个
-            role = "Regular User"
-            if user.is_super_admin:
-                role = "Super Administrator"
-            elif user.is_admin:
-                role = "Administrator"
-            print(f"     {user.username:<15} - {role} (is_admin={user.is_admin}, is_super_admin={user.is_super_admin})")
+    query = User.query
     if search:
-        query = query.filter(
-            User.username.like(f'%{search}%') |
-            User.full_name.like(f'%{search}%')
-        )
+        # 支持用户名、姓名、拼音和首字母搜索
+        query = query.filter(id_in(User.id, search_index.search('user', search)))
 
+    # 总数使用缓存，翻页时不再每页执行COUNT(*)
     users = query.order_by(User.created_at.desc()).paginate(
-        page=page, per_page=10, error_out=False
+        page=page, per_page=10, error_out=False, count=False
     )
+    users.total = cached_total('user', search, query)
 
     return render_template('users/index.html', users=users, search=search)
 
+# 用户列表排序（游标分页使用，id保证唯一）
+USER_KEYSET_ORDER = [(User.created_at, True), (User.id, True)]
+
+@main.route('/api/users')
+@admin_required
+def api_users():
+    """用户列表JSON接口（游标分页，供无限滚动使用）"""
+    cursor = request.args.get('cursor')
+    per_page = max(1, min(request.args.get('per_page', 20, type=int), 100))
+    search = request.args.get('search', '')
+    with_total = request.args.get('total') == '1'
+
+    query = User.query
+    if search:
+        query = query.filter(id_in(User.id, search_index.search('user', search)))
+
+    try:
+        items, next_cursor = keyset_paginate(query, USER_KEYSET_ORDER, cursor, per_page)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    result = {
+        'success': True,
+        'items': [{
+            'id': user.id,
+            'username': user.username,
+            'full_name': user.full_name,
+            'role': user.get_role_name(),
+            'is_active': user.is_active,
+            'associated_doctor_id': user.associated_doctor_id,
+            'last_login': user.last_login.isoformat() if user.last_login else None
+        } for user in items],
+        'next_cursor': next_cursor
+    }
+    if with_total:
+        result['total'] = cached_total('user', search, query)
+    return jsonify(result)
+
 @main.route('/users/add', methods=['GET', 'POST'])
 @login_required
 @admin_required
@@ -714,6 +1103,7 @@ def edit_user(user_id):
             user.is_active = is_active
 
             db.session.commit()
+            user_cache.invalidate(user.id)
 
             # 如果没有修改密码，显示普通成功信息
             if not (can_modify_password and new_password):
@@ -742,12 +1132,8 @@ def edit_user(user_id):
 @admin_required
 def toggle_admin(user_id):
     """切换用户管理员状态"""
-    print(f"DEBUG: toggle_admin called")
-    print(f"   user_id: {user_id}")
-    print(f"   current_user: {current_user.username} (is_admin={current_user.is_admin}, is_super_admin={current_user.is_super_admin})")
-
     user = User.query.get_or_404(user_id)
-    print(f"   target_user: {user.username} (is_admin={user.is_admin}, is_super_admin={user.is_super_admin})")
+    log_fields = {'operator': current_user.username, 'username': user.username, 'was_admin': user.is_admin}
 
     # 防止用户修改自己的管理员状态
     if user.id == current_user.id:
@@ -756,35 +1142,29 @@ def toggle_admin(user_id):
 
     # 权限检查逻辑
     if user.is_admin:
-        print("   User is already admin, executing cancel admin logic")
         # 取消管理员权限的情况
         if not current_user.is_super_admin:
-            print("   Regular admin cannot cancel other admin's permissions")
             # 普通管理员不能取消其他管理员的权限
+            logger.debug('普通管理员不能取消其他管理员的权限', extra={'fields': log_fields})
             flash('普通管理员不能修改其他管理员的权限', 'error')
             return redirect(url_for('main.users'))
 
         # 超级管理员取消管理员权限时检查是否是最后一个管理员
         admin_count = User.query.filter_by(is_admin=True).count()
-        print(f"   Current admin count: {admin_count}")
         if admin_count <= 1:
-            print("   Cannot cancel the last admin")
+            logger.debug('不能取消最后一个管理员', extra={'fields': {**log_fields, 'admin_count': admin_count}})
             flash('不能取消最后一个管理员的管理员权限', 'error')
             return redirect(url_for('main.users'))
 
-    else:
-        print("   User is regular user, executing set admin logic")
-
     # 对于普通用户，管理员和超级管理员都可以设为管理员（继续执行）
 
     try:
-        print(f"   Starting permission toggle: {user.username} is_admin={user.is_admin}")
         user.is_admin = not user.is_admin
-        print(f"   Permission toggle completed: {user.username} is_admin={user.is_admin}")
 
         # 提交数据库更改
         db.session.commit()
-        print(f"   Database commit successful")
+        user_cache.invalidate(user.id)
+        logger.info('切换管理员权限', extra={'fields': {**log_fields, 'is_admin': user.is_admin}})
 
         status = "管理员" if user.is_admin else "普通用户"
         flash(f'已将 {user.username} 设置为{status}', 'success')
@@ -792,7 +1172,7 @@ def toggle_admin(user_id):
     except Exception as e:
         db.session.rollback()
         flash(f'操作失败：{str(e)}', 'error')
-        print(f"   Database commit failed: {e}")
+        logger.error(f'切换管理员权限失败: {e}', extra={'fields': log_fields})
 
     return redirect(url_for('main.users'))
 
@@ -830,6 +1210,7 @@ def toggle_super_admin(user_id):
             action = "超级管理员权限"
 
         db.session.commit()
+        user_cache.invalidate(user.id)
 
         if not user.is_super_admin:
             if user.is_admin:
@@ -866,6 +1247,7 @@ def toggle_user_status(user_id):
     try:
         user.is_active = not user.is_active
         db.session.commit()
+        user_cache.invalidate(user.id)
 
         status = "启用" if user.is_active else "禁用"
         flash(f'已{status}用户 {user.username}', 'success')
@@ -1,21 +1,98 @@
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash, current_app, Response
+from flask import Blueprint, request, jsonify, redirect, url_for, flash, current_app, Response
 from flask_login import login_required, current_user
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta
 from werkzeug.utils import secure_filename
 import os
 import json
+import time
 import csv
+import calendar
 from io import StringIO, BytesIO
 import openpyxl
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from app.models import Doctor, Schedule, User
+from app.models import Doctor, Schedule, User, LeavePeriod
 from app.extensions import db
-from app.holiday_utils.holidays import holiday_helper
+from app.holiday_utils.holidays import holiday_helper, DAY_TYPE_WEEKEND, DAY_TYPE_HOLIDAY
+from app.slot_templates import slot_templates
+from app.metrics import metrics
 from functools import wraps
 
 # 创建排班管理蓝图
 schedule_bp = Blueprint('schedules', __name__)
 
+# 沿用上月规则时的轮转周期（周），新月份每天沿用 N 周前同一星期的分配，只能取1-4（保证来源日期在上个月内）
+DEFAULT_ROTATION_WEEKS = 4
+
+def apply_previous_month_rules(rows, year, month, rotation_weeks=DEFAULT_ROTATION_WEEKS):
+    """
+    按上个月的排班预先分配医生（一次查询上月排班，一次查询请假，其余在内存中完成）
+
+    新月份的每一天对应上个月同一星期的某一天：先往前推 rotation_weeks 周，仍在本月内时再逐周往前推，
+    因此按周轮转的排班会接着上个月继续轮转。同一日期、科室、班次、时间段的多个名额按上月的顺序依次对应；
+    已离职、当天请假或同一时间段已有排班的医生不分配。
+
+    Args:
+        rows: 待插入的排班行（原地补充 doctor_id 和 status）
+        year: 目标年份
+        month: 目标月份
+        rotation_weeks: 轮转周期（周）
+
+    Returns:
+        int: 预先分配的班次数
+    """
+    first_day = date(year, month, 1)
+    prev_last = first_day - timedelta(days=1)
+    prev_first = prev_last.replace(day=1)
+    last_day = date(year, month, calendar.monthrange(year, month)[1])
+
+    # 上个月在职医生的排班：(日期, 科室, 班次, 时间段) -> [医生ID]
+    previous = {}
+    query = db.session.query(
+        Schedule.date, Schedule.department, Schedule.shift, Schedule.time_range, Schedule.doctor_id
+    ).join(Doctor, Doctor.id == Schedule.doctor_id).filter(
+        Schedule.date >= prev_first,
+        Schedule.date <= prev_last,
+        Doctor.status == '在职'
+    ).order_by(Schedule.date, Schedule.id)
+    for day, department, shift, time_range, doctor_id in query:
+        previous.setdefault((day, department, shift, time_range), []).append(doctor_id)
+
+    # 目标月份的请假：(医生ID, 日期)
+    on_leave = LeavePeriod.leave_days(first_day, last_day)
+
+    offset = timedelta(weeks=max(1, min(rotation_weeks, 4)))
+    source_days = {}
+    used = {}  # 来源键 -> 已对应的名额数
+    busy = set()  # (医生ID, 日期, 时间段)
+    assigned = 0
+    for row in rows:
+        row['doctor_id'] = None
+        day = row['date']
+        source_day = source_days.get(day)
+        if source_day is None:
+            source_day = day - offset
+            while source_day >= first_day:
+                source_day -= timedelta(weeks=1)
+            source_days[day] = source_day
+
+        source_key = (source_day, row['department'], row['shift'], row['time_range'])
+        candidates = previous.get(source_key)
+        if not candidates:
+            continue
+        index = used.get((day, source_key), 0)
+        used[(day, source_key)] = index + 1
+        if index >= len(candidates):
+            continue
+
+        doctor_id = candidates[index]
+        if (doctor_id, day) in on_leave or (doctor_id, day, row['time_range']) in busy:
+            continue
+        busy.add((doctor_id, day, row['time_range']))
+        row['doctor_id'] = doctor_id
+        row['status'] = 'assigned'
+        assigned += 1
+    return assigned
+
 # 管理员权限装饰器
 def admin_required(f):
     @wraps(f)
@@ -28,90 +105,11 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-@schedule_bp.route('/', strict_slashes=False)
-def index():
-    """排班管理主页 - 显示当月排班表"""
-    # 获取选择的月份，默认为当前月 - 限制最小年份为2025
-    current_year = datetime.now().year
-    month_str = request.args.get('month')
-    if month_str:
-        year, month = map(int, month_str.split('-'))
-        # 确保年份不早于2025
-        if year < 2025:
-            year = 2025
-    else:
-        year, month = max(2025, current_year), datetime.now().month
-
-    # 获取该月的第一天和最后一天
-    first_day = datetime(year, month, 1)
-    if month == 12:
-        last_day = datetime(year + 1, 1, 1) - timedelta(days=1)
-    else:
-        last_day = datetime(year, month + 1, 1) - timedelta(days=1)
-
-    # 查询该月的所有排班
-    schedules = Schedule.query.filter(
-        Schedule.date >= first_day.date(),
-        Schedule.date <= last_day.date()
-    ).order_by(Schedule.date, Schedule.time_range).all()
-
-    # 获取可用医生列表
-    available_doctors = Doctor.query.filter_by(status='在职').all()
-
-    # 月份信息
-    month_info = {
-        'year': year,
-        'month': month,
-        'days': (last_day - first_day).days + 1
-    }
-
-    # 获取当前月份字符串
-    current_month = f"{datetime.now().year}-{datetime.now().month:02d}"
-
-    # 获取该月所有日期和星期信息（用于模板显示）
-    dates = []
-    weekdays = []
-    for day in range(1, (last_day - first_day).days + 2):
-        current_date = first_day + timedelta(days=day - 1)
-        dates.append(current_date.strftime('%Y-%m-%d'))
-        weekdays.append(['星期一', '星期二', '星期三', '星期四', '星期五', '星期六', '星期日'][current_date.weekday()])
-
-    # 获取年份和月份列表供选择
-    years = list(range(2025, 2031))  # 2025-2030年
-    months = [
-        {'name': '1月', 'value': 1},
-        {'name': '2月', 'value': 2},
-        {'name': '3月', 'value': 3},
-        {'name': '4月', 'value': 4},
-        {'name': '5月', 'value': 5},
-        {'name': '6月', 'value': 6},
-        {'name': '7月', 'value': 7},
-        {'name': '8月', 'value': 8},
-        {'name': '9月', 'value': 9},
-        {'name': '10月', 'value': 10},
-        {'name': '11月', 'value': 11},
-        {'name': '12月', 'value': 12}
-    ]
-
-    # 获取所有医生列表（用于模板显示）
-    doctors = Doctor.query.all()
-
-    return render_template('schedules/template.html',
-                         schedules=schedules,
-                         current_month_str=current_month,
-                         years=years,
-                         months=months,
-                         selected_year=year,
-                         selected_month=month,
-                         dates=dates,
-                         weekdays=weekdays,
-                         doctors=doctors,
-                         holiday_helper=holiday_helper)
-
 @schedule_bp.route('/generate', methods=['POST'])
 @admin_required
 def generate_schedule():
     """生成下个月排班表"""
+    started = time.perf_counter()
     try:
         target_month = request.form.get('targetMonth')
         use_previous_rules = request.form.get('usePreviousRules') == 'on'
@@ -130,59 +128,31 @@ def generate_schedule():
         else:
             last_day = datetime(year, month + 1, 1) - timedelta(days=1)
 
-        # 获取该月需要排班的日期（只考虑工作日）
-        work_days = []
-        current_day = first_day
-        while current_day <= last_day:
-            # 跳过周末（周六、周日）
-            if current_day.weekday() < 5:  # 0-4 表示周一到周五
-                work_days.append(current_day)
-            current_day += timedelta(days=1)
+        # 按节假日日历和各科室的班次模板生成（工作日、调休工作日、周末、节假日分别适用不同模板）
+        rows, scheduled_days = slot_templates.build_month(year, month)
+
+        # 沿用上月规则：按星期和轮转周期预先分配医生，管理员只需调整例外情况
+        assigned = 0
+        if use_previous_rules and rows:
+            rotation_weeks = current_app.config.get('SCHEDULE_ROTATION_WEEKS', DEFAULT_ROTATION_WEEKS)
+            assigned = apply_previous_month_rules(rows, year, month, rotation_weeks)
 
         # 清理该月现有的排班（避免重复）
-        existing_schedules = Schedule.query.filter(
+        Schedule.query.filter(
             Schedule.date >= first_day.date(),
             Schedule.date <= last_day.date()
-        ).all()
-        for schedule in existing_schedules:
-            db.session.delete(schedule)
-
-        # 生成排班（这里先使用简单的模板）
-        for day in work_days:
-            # 每天生成班次（示例：上午班、下午班）
-            shifts = [
-                {
-                    'date': day.date(),
-                    'weekday': day.strftime('%A'),
-                    'shift': '白班',
-                    'time_range': '08:00-16:00',
-                    'department': '门诊',
-                    'status': 'unassigned'
-                },
-                {
-                    'date': day.date(),
-                    'weekday': day.strftime('%A'),
-                    'shift': '夜班',
-                    'time_range': '16:00-24:00',
-                    'department': '急诊',
-                    'status': 'unassigned'
-                }
-            ]
-
-            for shift_data in shifts:
-                schedule = Schedule(
-                    date=shift_data['date'],
-                    weekday=shift_data['weekday'],
-                    shift=shift_data['shift'],
-                    time_range=shift_data['time_range'],
-                    department=shift_data['department'],
-                    status=shift_data['status']
-                )
-                db.session.add(schedule)
+        ).delete(synchronize_session=False)
+
+        if rows:
+            db.session.execute(Schedule.__table__.insert(), rows)
 
         db.session.commit()
+        metrics.observe('fuyou_schedule_generation_seconds', time.perf_counter() - started)
 
-        return jsonify({'success': True, 'message': f'成功生成{year}年{month}月排班表，共{len(work_days)}天{len(work_days)*2}个班次'})
+        message = f'成功生成{year}年{month}月排班表，共{scheduled_days}天{len(rows)}个班次'
+        if use_previous_rules:
+            message += f'，按上月规则预先分配{assigned}个'
+        return jsonify({'success': True, 'message': message})
 
     except Exception as e:
         db.session.rollback()
@@ -217,6 +187,10 @@ def assign_doctor():
         if conflict_schedule:
             return jsonify({'success': False, 'message': f'{doctor.name}在该时间段已有排班'})
 
+        # 检查医生当天是否请假
+        if doctor.is_on_leave(schedule.date):
+            return jsonify({'success': False, 'message': f'{doctor.name}在{schedule.date}请假，不能排班'})
+
         # 分配医生
         schedule.doctor_id = doctor_id
         schedule.status = 'assigned'
@@ -228,12 +202,6 @@ def assign_doctor():
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)})
 
-@schedule_bp.route('/<int:schedule_id>')
-def view_schedule(schedule_id):
-    """查看排班详情"""
-    schedule = Schedule.query.get_or_404(schedule_id)
-    return render_template('schedules/view.html', schedule=schedule)
-
 def allowed_file(filename):
     """检查文件扩展名是否允许"""
     ALLOWED_EXTENSIONS = {'xlsx', 'xls', 'csv'}
@@ -335,6 +303,7 @@ def upload_schedule():
             # 获取医生列表用于匹配
             doctors = Doctor.query.filter_by(status='在职').all()
             doctor_dict = {doctor.name: doctor for doctor in doctors}
+            on_leave = LeavePeriod.leave_days(target_first_day, target_last_day)
 
             # 处理每条记录
             for i, record in enumerate(records, 1):
@@ -354,6 +323,10 @@ def upload_schedule():
                             failed_count += 1
                             errors.append(f"第{i}行：找不到医生'{record['doctor_name']}'")
                             continue
+                        if (doctor.id, record_date) in on_leave:
+                            failed_count += 1
+                            errors.append(f"第{i}行：{doctor.name}在{record_date}请假，不能排班")
+                            continue
 
                     # 创建排班记录
                     schedule = Schedule(
@@ -401,6 +374,7 @@ def upload_schedule():
 
 
 @schedule_bp.route('/download_template')
+@login_required
 def download_template():
     """下载排班表模板CSV文件"""
     try:
@@ -484,9 +458,10 @@ def download_template():
     except Exception as e:
         current_app.logger.error(f"下载模板失败: {str(e)}")
         flash('下载模板失败', 'error')
-        return redirect(url_for('schedules.template'))
+        return redirect(url_for('main.schedules'))
 
 @schedule_bp.route('/download_template_excel')
+@login_required
 def download_template_excel():
     """下载排班表模板Excel文件"""
     try:
@@ -568,30 +543,13 @@ def download_template_excel():
             cell.border = border
             cell.alignment = center_alignment
 
-        # 为周末和节假日列设置特殊背景色
-        for day in range(1, days_in_month + 1):
-            col_idx = day + 1  # +1 因为第一列是姓名
-            weekday_idx = datetime(year, month, day).weekday()
-
-            # 检查是否是节假日
-            try:
-                from app.models import Holiday
-                from datetime import date
-
-                holiday = Holiday.query.filter_by(date=date(year, month, day)).first()
-                is_holiday = holiday and holiday.type == 'holiday'
-            except Exception:
-                # 如果查询失败，默认不是节假日
-                is_holiday = False
-
-            # 周末或节假日设置背景色
-            if weekday_idx >= 5 or is_holiday:
-                for row_idx in [1, 2]:  # 表头两行
-                    cell = ws.cell(row=row_idx, column=col_idx)
-                    if is_holiday:
-                        cell.fill = holiday_fill
-                    else:
-                        cell.fill = weekend_fill
+        # 为周末和节假日列设置特殊背景色（调休工作日按工作日处理）
+        for col_idx, (day, day_type) in enumerate(holiday_helper.month_calendar(year, month), 2):
+            if day_type not in (DAY_TYPE_WEEKEND, DAY_TYPE_HOLIDAY):
+                continue
+            for row_idx in [1, 2]:  # 表头两行
+                cell = ws.cell(row=row_idx, column=col_idx)
+                cell.fill = holiday_fill if day_type == DAY_TYPE_HOLIDAY else weekend_fill
 
         # 获取医生数据
         doctors = Doctor.query.filter_by(status='在职').order_by(Doctor.sequence.asc(), Doctor.id.asc()).all()
@@ -643,5 +601,5 @@ def download_template_excel():
     except Exception as e:
         current_app.logger.error(f"下载Excel模板失败: {str(e)}")
         flash('下载Excel模板失败', 'error')
-        return redirect(url_for('schedules.template'))
+        return redirect(url_for('main.schedules'))
 
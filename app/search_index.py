@@ -0,0 +1,194 @@
+"""
+医生/用户搜索索引
+进程内有序索引，支持姓名子串、全拼和首字母前缀搜索（例如 "zs" 或 "zhangs" 匹配 张三）
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import Dict, List, Set, Tuple
+
+try:
+    from pypinyin import lazy_pinyin, Style
+except ImportError:  # 未安装pypinyin时只支持姓名子串搜索
+    lazy_pinyin = None
+
+REBUILD_INTERVAL = 60  # 秒，定期重建以同步其他工作进程的修改
+
+
+def build_search_keys(*texts: str) -> Set[str]:
+    """
+    生成索引键
+
+    - 原文（小写）的所有后缀，前缀查询即可实现子串匹配，与 LIKE '%关键词%' 结果一致
+    - 中文的全拼和首字母，从每个音节开始的后缀，例如 张三丰 -> zhangsanfeng, sanfeng, feng, zsf, sf, f
+    """
+    keys = set()
+    for text in texts:
+        if not text:
+            continue
+        text = text.strip().lower()
+        keys.update(text[i:] for i in range(len(text)))
+
+        if lazy_pinyin is not None:
+            syllables = [s.lower() for s in lazy_pinyin(text)]
+            initials = [s.lower() for s in lazy_pinyin(text, style=Style.FIRST_LETTER)]
+            for i in range(len(syllables)):
+                keys.add(''.join(syllables[i:]))
+            for i in range(len(initials)):
+                keys.add(''.join(initials[i:]))
+    keys.discard('')
+    return keys
+
+
+class SearchIndex:
+    def __init__(self):
+        self.entries: Dict[str, Dict[int, Set[str]]] = {}  # 类型 -> {ID: 索引键}
+        self.sorted_keys: Dict[str, List[Tuple[str, int]]] = {}  # 类型 -> [(索引键, ID)]
+        self.built_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, kind: str) -> Dict[int, Set[str]]:
+        """从数据库读取需要索引的字段"""
+        from app.models import Doctor, User
+        from app.extensions import db
+
+        if kind == 'doctor':
+            rows = db.session.query(Doctor.id, Doctor.name).all()
+        else:
+            rows = db.session.query(User.id, User.username, User.full_name).all()
+        return {row[0]: build_search_keys(*row[1:]) for row in rows}
+
+    def _rebuild_sorted(self, kind: str):
+        self.sorted_keys[kind] = sorted(
+            (key, entry_id) for entry_id, keys in self.entries[kind].items() for key in keys
+        )
+
+    def _remove_keys(self, kind: str, entry_id: int, keys: Set[str]):
+        sorted_keys = self.sorted_keys[kind]
+        for key in keys:
+            index = bisect_left(sorted_keys, (key, entry_id))
+            if index < len(sorted_keys) and sorted_keys[index] == (key, entry_id):
+                del sorted_keys[index]
+
+    def _ensure_built(self, kind: str):
+        if kind in self.entries and time.monotonic() - self.built_at[kind] < REBUILD_INTERVAL:
+            return
+        entries = self._load(kind)
+        with self._lock:
+            self.entries[kind] = entries
+            self._rebuild_sorted(kind)
+            self.built_at[kind] = time.monotonic()
+
+    def search(self, kind: str, term: str) -> Set[int]:
+        """
+        前缀搜索
+
+        Args:
+            kind: 'doctor' 或 'user'
+            term: 搜索关键词
+
+        Returns:
+            Set[int]: 匹配的ID集合
+        """
+        term = term.strip().lower()
+        self._ensure_built(kind)
+        result = set()
+        # update/remove 会原地增删有序列表，扫描期间需持有锁
+        with self._lock:
+            sorted_keys = self.sorted_keys.get(kind, [])
+            index = bisect_left(sorted_keys, (term, -1))
+            while index < len(sorted_keys) and sorted_keys[index][0].startswith(term):
+                result.add(sorted_keys[index][1])
+                index += 1
+        return result
+
+    def warm(self):
+        """预先构建医生和用户索引（需要在应用上下文中调用）"""
+        for kind in ('doctor', 'user'):
+            self._ensure_built(kind)
+
+    def update(self, kind: str, entry_id: int, *texts: str):
+        """新增或更新一条记录"""
+        keys = build_search_keys(*texts)
+        with self._lock:
+            if kind not in self.entries:
+                return  # 尚未构建，首次搜索时会完整加载
+            old_keys = self.entries[kind].get(entry_id, set())
+            if keys == old_keys:
+                return  # 姓名未变化（例如只修改了权限）
+            self.entries[kind][entry_id] = keys
+            # 只增删变化的键，保持有序列表，不重新排序
+            self._remove_keys(kind, entry_id, old_keys - keys)
+            for key in keys - old_keys:
+                insort(self.sorted_keys[kind], (key, entry_id))
+
+    def remove(self, kind: str, entry_id: int):
+        """删除一条记录"""
+        with self._lock:
+            if kind not in self.entries:
+                return
+            keys = self.entries[kind].pop(entry_id, None)
+            if keys:
+                self._remove_keys(kind, entry_id, keys)
+
+    def clear(self, kind: str = None):
+        """清理索引，下次搜索时重新构建"""
+        with self._lock:
+            if kind:
+                self.entries.pop(kind, None)
+                self.sorted_keys.pop(kind, None)
+                self.built_at.pop(kind, None)
+            else:
+                self.entries.clear()
+                self.sorted_keys.clear()
+                self.built_at.clear()
+
+
+def register_search_index_events(db):
+    """在会话提交后把医生/用户的增删改同步到搜索索引，回滚时丢弃"""
+    from sqlalchemy import event
+    from app.models import Doctor, User
+
+    if event.contains(db.session, 'after_commit', _apply_pending):
+        return
+
+    def _pending(session):
+        return session.info.setdefault('search_index_pending', {})
+
+    @event.listens_for(db.session, 'after_flush')
+    def collect_changes(session, flush_context):
+        pending = _pending(session)
+        for obj in list(session.new) + list(session.dirty):
+            if isinstance(obj, Doctor):
+                pending[('doctor', obj.id)] = (obj.name,)
+            elif isinstance(obj, User):
+                pending[('user', obj.id)] = (obj.username, obj.full_name)
+        for obj in session.deleted:
+            if isinstance(obj, Doctor):
+                pending[('doctor', obj.id)] = None
+            elif isinstance(obj, User):
+                pending[('user', obj.id)] = None
+
+    event.listen(db.session, 'after_commit', _apply_pending)
+
+    @event.listens_for(db.session, 'after_soft_rollback')
+    def discard_changes(session, previous_transaction):
+        session.info.pop('search_index_pending', None)
+
+def _apply_pending(session):
+    """提交成功后应用收集到的修改"""
+    from app.utils import clear_count_cache
+
+    pending = session.info.pop('search_index_pending', {})
+    for (kind, entry_id), texts in pending.items():
+        if texts is None:
+            search_index.remove(kind, entry_id)
+        else:
+            search_index.update(kind, entry_id, *texts)
+
+    # 列表总数缓存同样依赖医生/用户的增删
+    for kind in {kind for kind, _ in pending}:
+        clear_count_cache(kind)
+
+# 创建全局实例
+search_index = SearchIndex()
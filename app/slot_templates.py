@@ -0,0 +1,100 @@
+"""
+排班班次模板缓存
+把 slot_templates 表编译为“日期类型 -> 排班行原型”的映射并缓存在进程内，
+生成整月排班时只需把节假日日历与原型逐一展开，不再按天或按模板查询数据库
+"""
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from app.holiday_utils.holidays import (holiday_helper, DAY_TYPE_WEEKDAY, DAY_TYPE_WEEKEND,
+                                        DAY_TYPE_HOLIDAY, DAY_TYPE_WORKDAY)
+
+DAY_TYPES = (DAY_TYPE_WEEKDAY, DAY_TYPE_WORKDAY, DAY_TYPE_WEEKEND, DAY_TYPE_HOLIDAY)
+DEFAULT_TTL = 60  # 秒，多进程部署时其他进程修改模板后最长的生效延迟
+
+SlotPlan = Dict[str, Tuple[dict, ...]]
+
+
+class SlotTemplateCache:
+    def __init__(self, ttl: int = DEFAULT_TTL):
+        self.ttl = ttl
+        self._plan = None
+        self._compiled_at = 0.0
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def init_app(self, app):
+        """绑定应用：读取缓存时间，模板或班次类型变化时清理缓存"""
+        self.ttl = app.config.get('SLOT_TEMPLATE_CACHE_TTL', self.ttl)
+        self._listen()
+
+    def _listen(self):
+        from sqlalchemy import event
+        from app.models import SlotTemplate, ShiftType
+
+        if self._listening:
+            return
+        self._listening = True
+
+        def invalidate(mapper, connection, target):
+            self.clear()
+
+        for model in (SlotTemplate, ShiftType):
+            for name in ('after_insert', 'after_update', 'after_delete'):
+                event.listen(model, name, invalidate)
+
+    @staticmethod
+    def compile() -> SlotPlan:
+        """读取启用的模板（一次查询），按日期类型展开为排班行原型，人数为几就重复几份"""
+        from app.models import SlotTemplate
+
+        templates = SlotTemplate.query.filter_by(is_active=True).order_by(
+            SlotTemplate.sequence, SlotTemplate.id
+        ).all()
+
+        plan = {day_type: [] for day_type in DAY_TYPES}
+        for template in templates:
+            prototype = {
+                'shift': template.shift_type.name,
+                'time_range': template.get_time_range(),
+                'department': template.department,
+                'status': 'unassigned',
+            }
+            for day_type in template.get_day_types():
+                plan[day_type].extend([prototype] * max(template.headcount, 0))
+        return {day_type: tuple(prototypes) for day_type, prototypes in plan.items()}
+
+    def get_plan(self) -> SlotPlan:
+        """获取编译后的模板（需要在应用上下文中调用）"""
+        with self._lock:
+            plan = self._plan
+            if plan is not None and time.monotonic() - self._compiled_at < self.ttl:
+                return plan
+        plan = self.compile()
+        with self._lock:
+            self._plan = plan
+            self._compiled_at = time.monotonic()
+        return plan
+
+    def clear(self):
+        """清理缓存，下次使用时重新编译"""
+        with self._lock:
+            self._plan = None
+
+    def build_month(self, year: int, month: int) -> Tuple[List[dict], int]:
+        """
+        按节假日日历和班次模板生成整月的排班行
+
+        Returns:
+            tuple: (排班行列表, 有班次的天数)
+        """
+        plan = self.get_plan()
+        days = [(day, plan[day_type]) for day, day_type in holiday_helper.month_calendar(year, month)
+                if plan[day_type]]
+        rows = [dict(prototype, date=day, weekday=day.strftime('%A'))
+                for day, prototypes in days for prototype in prototypes]
+        return rows, len(days)
+
+# 创建全局实例
+slot_templates = SlotTemplateCache()
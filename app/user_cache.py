@@ -0,0 +1,100 @@
+"""
+用户缓存工具
+进程内短时缓存已登录用户及其权限信息，减少每个请求的数据库查询
+"""
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from flask import current_app
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.metrics import metrics
+
+DEFAULT_TTL = 60  # 默认缓存秒数
+
+
+class UserCache:
+    def __init__(self):
+        self.user_cache = {}        # 用户ID -> (过期时间, 字段快照)
+        self.permission_cache = {}  # 用户ID -> (过期时间, 权限字典)
+        self._lock = threading.Lock()
+
+    def _ttl(self) -> int:
+        """读取缓存有效期（秒），配置为0时关闭缓存"""
+        try:
+            return current_app.config.get('USER_CACHE_TTL', DEFAULT_TTL)
+        except RuntimeError:
+            return DEFAULT_TTL
+
+    def _get(self, cache: dict, user_id: int):
+        with self._lock:
+            entry = cache.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del cache[user_id]
+                return None
+            return entry[1]
+
+    def _set(self, cache: dict, user_id: int, value):
+        ttl = self._ttl()
+        if ttl <= 0:
+            return
+        with self._lock:
+            cache[user_id] = (time.monotonic() + ttl, value)
+
+    def load_user(self, user_id: int):
+        """
+        按ID加载用户，命中缓存时不访问数据库
+
+        缓存中保存的是字段快照，命中后重建为detached实例并合并到当前会话，
+        因此关联关系（如associated_doctor）仍可在本次请求中正常懒加载。
+        """
+        from app.models import User
+        from app.extensions import db
+
+        snapshot = self._get(self.user_cache, user_id)
+        metrics.cache_access('user', snapshot is not None)
+        if snapshot is None:
+            user = User.query.get(user_id)
+            if user is not None:
+                self._set(self.user_cache, user_id, self._snapshot(user))
+            return user
+
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    def get_permissions(self, user_id: int, builder: Callable[[], Dict[str, bool]]) -> Dict[str, bool]:
+        """获取用户权限字典，未命中时调用builder生成并缓存"""
+        permissions = self._get(self.permission_cache, user_id)
+        metrics.cache_access('permission', permissions is not None)
+        if permissions is None:
+            permissions = builder()
+            self._set(self.permission_cache, user_id, permissions)
+        return dict(permissions)
+
+    def invalidate(self, user_id: Optional[int] = None):
+        """
+        清理指定用户的缓存，如果不指定用户则清理所有缓存
+
+        Args:
+            user_id (int, optional): 要清理的用户ID
+        """
+        with self._lock:
+            if user_id is None:
+                self.user_cache.clear()
+                self.permission_cache.clear()
+            else:
+                self.user_cache.pop(user_id, None)
+                self.permission_cache.pop(user_id, None)
+
+    @staticmethod
+    def _snapshot(user) -> dict:
+        """提取用户表的全部字段值"""
+        return {attr.key: getattr(user, attr.key) for attr in inspect(user).mapper.column_attrs}
+
+# 创建全局实例
+user_cache = UserCache()
@@ -1,15 +1,49 @@
 import os
-import uuid
-from werkzeug.utils import secure_filename
+import re
+import hashlib
+import shutil
+import tempfile
+import threading
 from PIL import Image
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
+import sqlalchemy as sa
+import base64
+import json
 import time
-from flask import abort, flash, redirect, url_for, request
+import random
+import logging
+from datetime import datetime, date
+from flask import abort, flash, redirect, url_for, request, current_app
 from flask_login import current_user
+from app.user_cache import user_cache
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp'}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
 AVATAR_SIZE = (150, 150)  # 头像尺寸
+AVATAR_VARIANT_SIZES = (30, 60, 150)  # 多尺寸头像：排班表30px，医生列表60px，详情页150px
+PROCESSED_EXTENSIONS = {'jpg', 'jpeg', 'png', 'bmp'}  # 需要压缩处理的图片格式
+AVATAR_CACHE_MAX_AGE = 365 * 24 * 3600  # 内容哈希命名的头像缓存一年
+MAX_AVATAR_DIMENSION = 4096  # 上传头像的最大宽高（像素）
+SPOOL_MAX_MEMORY = 1024 * 1024  # 上传流超过1MB时写入临时文件
+IMAGE_FORMAT_EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'BMP': 'bmp'}
+CONTENT_ADDRESSED_PATTERN = re.compile(r'^[0-9a-f]{32}(_\d+)?\.[a-z]+$')
+
+# 头像后台处理线程（单线程，避免多张图片同时占用CPU）
+_avatar_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='avatar')
+_existing_variants = set()  # 已确认存在的头像版本文件名
+AVATAR_MISS_TTL = 60  # 头像版本不存在的结果缓存秒数（其他进程生成版本后最长的生效延迟）
+_missing_variants = {}  # (头像文件名, 尺寸, 扩展名) -> 过期时间，旧版头像没有各尺寸版本
+_missing_variants_lock = threading.Lock()  # 请求线程与头像后台线程共同读写
+AVATAR_ORPHAN_MAX_AGE = 24  # 小时，上传后超过该时间仍未被医生使用的头像视为遗弃
+AVATAR_SWEEP_INTERVAL = 3600  # 秒，每个进程清理遗弃头像的最短间隔
+_last_avatar_sweep = None
+
+_diagnostics_logger = logging.getLogger('app.diagnostics')
+logger = logging.getLogger(__name__)
+
+COUNT_CACHE_TTL = 60  # 列表总数缓存秒数
+_count_cache = {}  # (类型, 关键词) -> (过期时间, 总数)
 
 def allowed_file(filename):
     """检查文件扩展名是否允许"""
@@ -18,6 +52,9 @@ def allowed_file(filename):
 def save_avatar(file, upload_folder):
     """保存头像文件，返回文件名
 
+    请求内只保存原始文件，压缩和多尺寸缩略图由后台线程生成，
+    处理完成前页面显示原始文件。
+
     Args:
         file: 上传的文件对象
         upload_folder: 上传目录路径
@@ -26,67 +63,248 @@ def save_avatar(file, upload_folder):
         str: 保存的文件名，如果失败返回None
     """
     if file and file.filename and allowed_file(file.filename):
-        # 检查文件大小
-        file.seek(0, os.SEEK_END)
-        file_size = file.tell()
-        file.seek(0)
+        return save_avatar_stream(file.stream, upload_folder)
+
+    return None
+
+def save_avatar_stream(stream, upload_folder, max_size=MAX_FILE_SIZE):
+    """从二进制流保存头像，返回文件名
 
-        if file_size > MAX_FILE_SIZE:
+    边读边计算内容哈希并写入临时文件（小文件留在内存，大文件落盘），
+    只读取图片头部校验格式和尺寸，不解码像素，校验通过后按内容哈希命名保存。
+
+    Args:
+        stream: 可读的二进制流（request.stream 或上传文件的stream）
+        upload_folder: 上传目录路径
+        max_size: 最大字节数
+
+    Returns:
+        str: 保存的文件名，如果失败返回None
+    """
+    hasher = hashlib.sha256()
+    size = 0
+
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as spool:
+        for chunk in iter(lambda: stream.read(64 * 1024), b''):
+            size += len(chunk)
+            if size > max_size:
+                return None
+            hasher.update(chunk)
+            spool.write(chunk)
+
+        if size == 0:
             return None
 
-        # 生成安全的文件名
-        original_filename = secure_filename(file.filename)
-        file_extension = original_filename.rsplit('.', 1)[1].lower()
+        # 只解析图片头部，检查格式和尺寸
+        spool.seek(0)
+        try:
+            with Image.open(spool) as img:
+                image_format = img.format
+                width, height = img.size
+        except Exception as e:
+            logger.warning(f"头像格式无法识别: {e}")
+            return None
+
+        file_extension = IMAGE_FORMAT_EXTENSIONS.get(image_format)
+        if not file_extension:
+            return None
+        if width > MAX_AVATAR_DIMENSION or height > MAX_AVATAR_DIMENSION:
+            return None
 
-        # 使用时间戳和UUID生成唯一文件名
-        timestamp = str(int(time.time()))
-        unique_id = str(uuid.uuid4())[:8]
-        filename = f"{timestamp}_{unique_id}.{file_extension}"
+        filename = get_content_addressed_name(hasher.hexdigest(), file_extension)
 
         # 确保上传目录存在
         os.makedirs(upload_folder, exist_ok=True)
 
         file_path = os.path.join(upload_folder, filename)
+        if os.path.exists(file_path):
+            # 重新上传已有的头像时更新修改时间，避免在表单提交前被当作遗弃头像清理
+            try:
+                os.utime(file_path)
+            except OSError:
+                pass
+            return filename
 
         try:
             # 保存原始文件
-            file.save(file_path)
-
-            # 如果是图片，压缩并调整尺寸
-            if file_extension.lower() in ['jpg', 'jpeg', 'png', 'bmp']:
-                try:
-                    with Image.open(file_path) as img:
-                        # 转换为RGB模式（处理RGBA等模式）
-                        if img.mode in ('RGBA', 'LA', 'P'):
-                            background = Image.new('RGB', img.size, (255, 255, 255))
-                            if img.mode == 'P':
-                                img = img.convert('RGBA')
-                            background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                            img = background
-
-                        # 调整尺寸并保持宽高比
-                        img.thumbnail(AVATAR_SIZE, Image.Resampling.LANCZOS)
-
-                        # 保存压缩后的图片
-                        if file_extension.lower() == 'png':
-                            img.save(file_path, 'PNG', optimize=True)
-                        else:
-                            img.save(file_path, 'JPEG', quality=85, optimize=True)
-
-                except Exception as e:
-                    print(f"图片处理失败: {e}")
-                    # 如果图片处理失败，保留原始文件
+            spool.seek(0)
+            tmp_path = f"{file_path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                shutil.copyfileobj(spool, f)
+            os.replace(tmp_path, file_path)
+
+            # 交给后台线程压缩并生成多尺寸头像
+            queue_avatar_processing(file_path)
 
             return filename
 
         except Exception as e:
-            print(f"文件保存失败: {e}")
+            logger.error(f"文件保存失败: {e}")
             return None
 
+def is_uploaded_avatar(filename, upload_folder):
+    """检查表单提交的头像文件名是否为已上传的头像（防止引用任意路径）"""
+    return (bool(filename) and is_content_addressed(filename) and '_' not in filename
+            and os.path.isfile(os.path.join(upload_folder, filename)))
+
+def get_content_addressed_name(digest, extension):
+    """根据内容哈希生成头像文件名
+
+    Args:
+        digest: 文件内容的sha256十六进制摘要
+        extension: 扩展名
+
+    Returns:
+        str: 例如 3f2a...（32位）.jpg
+    """
+    return f"{digest[:32]}.{extension}"
+
+def is_content_addressed(filename):
+    """检查头像是否按内容哈希命名（旧版头像使用时间戳命名）"""
+    return bool(CONTENT_ADDRESSED_PATTERN.match(filename))
+
+def is_avatar_final(filename, upload_folder):
+    """检查头像文件内容是否不会再变化，可以长期缓存
+
+    按内容哈希命名的主文件写入后不再改写，各尺寸版本由主文件内容确定，
+    因此按内容哈希命名的文件都是最终内容，与后台处理是否成功无关。
+    """
+    return is_content_addressed(filename)
+
+def get_avatar_queue_depth():
+    """等待后台处理的头像数"""
+    return _avatar_executor._work_queue.qsize()
+
+def queue_avatar_processing(file_path):
+    """提交头像处理任务到后台线程
+
+    Args:
+        file_path: 已保存的头像文件路径
+
+    Returns:
+        Future: 处理任务
+    """
+    return _avatar_executor.submit(process_avatar, file_path)
+
+def process_avatar(file_path):
+    """压缩头像并生成各尺寸的JPEG/PNG和WebP版本
+
+    主文件按上传内容的哈希命名，保持原样不再改写；各尺寸版本命名为
+    {文件名}_{尺寸}.{扩展名}，见 get_avatar_variant_name。
+
+    Args:
+        file_path: 头像文件路径
+
+    Returns:
+        bool: 处理是否成功
+    """
+    filename = os.path.basename(file_path)
+    upload_folder = os.path.dirname(file_path)
+    file_extension = filename.rsplit('.', 1)[1].lower()
+
+    # GIF等格式保留原始文件
+    if file_extension not in PROCESSED_EXTENSIONS:
+        return False
+
+    try:
+        with Image.open(file_path) as img:
+            img.load()
+
+        # 转换为RGB模式（处理RGBA等模式）
+        if img.mode in ('RGBA', 'LA', 'P'):
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            if img.mode == 'P':
+                img = img.convert('RGBA')
+            background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
+            img = background
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        save_format = 'PNG' if file_extension == 'png' else 'JPEG'
+
+        # 从大到小依次缩放，每次都基于上一个尺寸，减少重采样开销
+        current = img
+        for size in sorted(AVATAR_VARIANT_SIZES, reverse=True):
+            current = current.copy()
+            current.thumbnail((size, size), Image.Resampling.LANCZOS)
+            _save_avatar_image(current, os.path.join(upload_folder, get_avatar_variant_name(filename, size)), save_format)
+            _save_avatar_image(current, os.path.join(upload_folder, get_avatar_variant_name(filename, size, 'webp')), 'WEBP')
+        forget_missing_variants(filename)
+        return True
+
+    except Exception as e:
+        logger.error(f"图片处理失败: {e}")
+        # 如果图片处理失败，保留原始文件
+        return False
+
+def _save_avatar_image(img, path, save_format):
+    """按格式保存压缩后的头像
+
+    先写临时文件再替换，浏览器不会读到（并长期缓存）写了一半的文件
+    """
+    tmp_path = f"{path}.tmp"
+    if save_format == 'PNG':
+        img.save(tmp_path, 'PNG', optimize=True)
+    elif save_format == 'WEBP':
+        img.save(tmp_path, 'WEBP', quality=80, method=4)
+    else:
+        img.save(tmp_path, 'JPEG', quality=85, optimize=True)
+    os.replace(tmp_path, path)
+
+def get_avatar_variant_name(filename, size, extension=None):
+    """获取头像指定尺寸版本的文件名
+
+    Args:
+        filename: 头像主文件名
+        size: 尺寸（像素）
+        extension: 扩展名，默认与主文件相同
+
+    Returns:
+        str: 例如 1700000000_ab12cd34_30.jpg
+    """
+    stem, file_extension = filename.rsplit('.', 1)
+    return f"{stem}_{size}.{extension or file_extension}"
+
+def find_avatar_variant(filename, size, upload_folder, extension=None):
+    """查找不小于指定尺寸的最小头像版本
+
+    已存在的版本会记入缓存，避免模板循环中反复访问文件系统；
+    没有合适版本的结果（旧版头像、后台尚未处理完）缓存 AVATAR_MISS_TTL 秒。
+
+    Returns:
+        str: 版本文件名，如果尚未生成返回None
+    """
+    miss_key = (filename, size, extension)
+    with _missing_variants_lock:
+        expires = _missing_variants.get(miss_key)
+        if expires is not None:
+            if expires > time.monotonic():
+                return None
+            _missing_variants.pop(miss_key, None)
+
+    for variant_size in sorted(AVATAR_VARIANT_SIZES):
+        if variant_size < size:
+            continue
+        variant = get_avatar_variant_name(filename, variant_size, extension)
+        if variant in _existing_variants:
+            return variant
+        if os.path.isfile(os.path.join(upload_folder, variant)):
+            _existing_variants.add(variant)
+            return variant
+    with _missing_variants_lock:
+        _missing_variants[miss_key] = time.monotonic() + AVATAR_MISS_TTL
     return None
 
+def forget_missing_variants(filename):
+    """清除头像版本不存在的缓存（本进程生成或删除版本后调用）"""
+    with _missing_variants_lock:
+        for key in [key for key in _missing_variants if key[0] == filename]:
+            del _missing_variants[key]
+
 def delete_avatar(filename, upload_folder):
-    """删除头像文件
+    """删除头像文件（包括各尺寸版本）
+
+    相同内容的头像只保存一份，仍有医生使用时不删除文件
 
     Args:
         filename: 要删除的文件名
@@ -96,15 +314,216 @@ def delete_avatar(filename, upload_folder):
         bool: 删除是否成功
     """
     if filename:
+        from app.models import Doctor
+        if Doctor.query.filter_by(avatar=filename).first():
+            return False
+
         file_path = os.path.join(upload_folder, filename)
         try:
+            for size in AVATAR_VARIANT_SIZES:
+                for extension in (None, 'webp'):
+                    variant = get_avatar_variant_name(filename, size, extension)
+                    _existing_variants.discard(variant)
+                    variant_path = os.path.join(upload_folder, variant)
+                    if os.path.exists(variant_path):
+                        os.remove(variant_path)
+            forget_missing_variants(filename)
+
             if os.path.exists(file_path):
                 os.remove(file_path)
                 return True
         except Exception as e:
-            print(f"删除文件失败: {e}")
+            logger.error(f"删除文件失败: {e}")
     return False
 
+def schedule_orphan_avatar_sweep(app):
+    """在后台线程中清理遗弃的头像（每个进程每 AVATAR_SWEEP_INTERVAL 秒最多一次）
+
+    裁剪后头像会立即上传，放弃裁剪或未提交表单时文件不会被任何医生引用。
+    """
+    global _last_avatar_sweep
+    now = time.monotonic()
+    if _last_avatar_sweep is not None and now - _last_avatar_sweep < AVATAR_SWEEP_INTERVAL:
+        return None
+    _last_avatar_sweep = now
+    max_age = app.config.get('AVATAR_ORPHAN_MAX_AGE', AVATAR_ORPHAN_MAX_AGE) * 3600
+    return _avatar_executor.submit(_sweep_orphan_avatars_in_context, app, max_age)
+
+def _sweep_orphan_avatars_in_context(app, max_age):
+    with app.app_context():
+        try:
+            return sweep_orphan_avatars(app.config['UPLOAD_FOLDER'], max_age)
+        except Exception as e:
+            logger.error(f"清理遗弃头像失败: {e}")
+            return 0
+
+def sweep_orphan_avatars(upload_folder, max_age):
+    """删除超过 max_age 秒仍未被任何医生使用的头像（包括各尺寸版本）
+
+    只处理按内容哈希命名的头像主文件，旧版头像和各尺寸版本文件随主文件一起删除。
+
+    Returns:
+        int: 删除的头像数
+    """
+    from app.models import Doctor
+
+    if not os.path.isdir(upload_folder):
+        return 0
+    cutoff = time.time() - max_age
+    candidates = []
+    for filename in os.listdir(upload_folder):
+        if '_' in filename or not is_content_addressed(filename):
+            continue
+        try:
+            if os.path.getmtime(os.path.join(upload_folder, filename)) < cutoff:
+                candidates.append(filename)
+        except OSError:
+            continue
+    if not candidates:
+        return 0
+
+    referenced = {avatar for (avatar,) in Doctor.query.with_entities(Doctor.avatar).filter(
+        Doctor.avatar.isnot(None)).distinct()}
+    removed = sum(1 for filename in candidates
+                  if filename not in referenced and delete_avatar(filename, upload_folder))
+    if removed:
+        logger.info(f"已清理 {removed} 个遗弃头像")
+    return removed
+
+def id_in(column, ids):
+    """生成 column IN (...) 条件
+
+    ID直接写入SQL而不是作为绑定参数，避免搜索结果较多时超出SQLite的参数个数限制
+    """
+    return column.in_(sa.bindparam(f'{column.key}_ids', value=sorted(ids), expanding=True, literal_execute=True))
+
+# =================== 批量写入 ===================
+
+def insert_ignore(table, rows, conflict_columns, connection=None):
+    """批量插入，已存在的记录（按唯一列冲突）直接跳过
+
+    生成 INSERT ... VALUES (...), (...) ON CONFLICT (...) DO NOTHING，支持SQLite和PostgreSQL。
+    每批按列数控制绑定参数个数，兼容旧版SQLite的999个参数限制。
+    使用Core语句写入，不触发ORM事件，调用方负责提交事务。
+
+    Args:
+        table: 模型类或Table
+        rows: 字典列表，键为列名
+        conflict_columns: 唯一约束列名列表
+        connection: 数据库连接，默认使用当前会话
+
+    Returns:
+        int: 实际插入的行数
+    """
+    from app.extensions import db
+
+    table = getattr(table, '__table__', table)
+    rows = list(rows)
+    if not rows:
+        return 0
+
+    executor = connection if connection is not None else db.session
+    dialect = executor.get_bind().dialect.name if connection is None else connection.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise ValueError(f'不支持的数据库类型: {dialect}')
+
+    batch_size = max(1, 900 // len(table.columns))
+    inserted = 0
+    for start in range(0, len(rows), batch_size):
+        statement = insert(table).values(rows[start:start + batch_size])
+        statement = statement.on_conflict_do_nothing(index_elements=conflict_columns)
+        inserted += executor.execute(statement).rowcount
+    return inserted
+
+# =================== 分页 ===================
+
+def keyset_paginate(query, order_by, cursor=None, per_page=20):
+    """游标（keyset）分页，按上一页最后一条记录的排序值继续查询，不使用OFFSET
+
+    Args:
+        query: 查询对象
+        order_by: 排序列表 [(列, 是否降序)]，最后一列必须唯一（通常为id）
+        cursor: 上一页返回的游标，为空时从第一页开始
+        per_page: 每页数量
+
+    Returns:
+        tuple: (记录列表, 下一页游标，没有更多数据时为None)
+
+    Raises:
+        ValueError: 游标格式错误
+    """
+    if cursor:
+        values = decode_cursor(cursor, order_by)
+        conditions = []
+        for i, (column, descending) in enumerate(order_by):
+            # 前面的排序列相等，且当前列越过游标值
+            equals = [prev_column == prev_value for (prev_column, _), prev_value in zip(order_by[:i], values[:i])]
+            beyond = column < values[i] if descending else column > values[i]
+            conditions.append(sa.and_(*equals, beyond))
+        query = query.filter(sa.or_(*conditions))
+
+    query = query.order_by(*[column.desc() if descending else column.asc() for column, descending in order_by])
+    items = query.limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        next_cursor = encode_cursor([getattr(items[-1], column.key) for column, _ in order_by])
+    return items, next_cursor
+
+def encode_cursor(values):
+    """将排序值编码为URL安全的游标字符串"""
+    values = [value.isoformat() if isinstance(value, (datetime, date)) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, order_by):
+    """解码游标，按列类型还原日期时间值"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError('无效的分页游标')
+
+    if not isinstance(values, list) or len(values) != len(order_by):
+        raise ValueError('无效的分页游标')
+
+    decoded = []
+    for value, (column, _) in zip(values, order_by):
+        python_type = column.type.python_type
+        if value is not None and python_type in (datetime, date):
+            value = python_type.fromisoformat(value)
+        decoded.append(value)
+    return decoded
+
+def cached_total(kind, key, query):
+    """获取列表总数，按(类型, 关键词)缓存，避免每次翻页都执行COUNT(*)
+
+    缓存在COUNT_CACHE_TTL秒后过期，对应类型的数据提交修改时由搜索索引同步清理
+    """
+    from app.metrics import metrics
+
+    cache_key = (kind, key)
+    entry = _count_cache.get(cache_key)
+    hit = bool(entry and entry[0] > time.monotonic())
+    metrics.cache_access('list_total', hit)
+    if hit:
+        return entry[1]
+    total = query.order_by(None).count()
+    _count_cache[cache_key] = (time.monotonic() + COUNT_CACHE_TTL, total)
+    return total
+
+def clear_count_cache(kind=None):
+    """清理列表总数缓存"""
+    if kind is None:
+        _count_cache.clear()
+    else:
+        for cache_key in [k for k in _count_cache if k[0] == kind]:
+            _count_cache.pop(cache_key, None)
+
 # =================== 权限控制装饰器 ===================
 
 def super_admin_required(f):
@@ -162,9 +581,35 @@ def editor_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def diagnostics_required(f):
+    """诊断功能装饰器
+
+    只有配置 ENABLE_DIAGNOSTICS 开启时才可访问（否则返回404），且需要超级管理员权限
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not current_app.config.get('ENABLE_DIAGNOSTICS'):
+            abort(404)
+        return super_admin_required(f)(*args, **kwargs)
+    return decorated_function
+
+def log_sampled(event, **fields):
+    """按 DIAGNOSTICS_LOG_SAMPLE_RATE 采样记录一条结构化诊断日志
+
+    Args:
+        event: 事件名称
+        **fields: 日志字段
+    """
+    rate = current_app.config.get('DIAGNOSTICS_LOG_SAMPLE_RATE', 0)
+    if rate <= 0 or random.random() >= rate:
+        return
+    _diagnostics_logger.info(event, extra={'fields': fields})
+
 def get_user_permissions():
     """获取当前用户的权限信息
 
+    已登录用户的结果按用户ID缓存，角色变更时由相关路由清理缓存
+
     Returns:
         dict: 用户权限信息
     """
@@ -179,7 +624,11 @@ def get_user_permissions():
             'is_super_admin': False
         }
 
-    if current_user.is_super_admin:
+    return user_cache.get_permissions(current_user.id, lambda: _build_permissions(current_user))
+
+def _build_permissions(user):
+    """根据用户角色生成权限信息"""
+    if user.is_super_admin:
         return {
             'can_view': True,
             'can_add': True,
@@ -191,7 +640,7 @@ def get_user_permissions():
             'is_super_admin': True
         }
 
-    if current_user.is_admin:
+    if user.is_admin:
         return {
             'can_view': True,
             'can_add': True,
@@ -0,0 +1,58 @@
+"""
+gunicorn配置（生产环境）
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+可用环境变量调整:
+    FUYOU_BIND      监听地址，默认 127.0.0.1:8000
+    FUYOU_WORKERS   worker进程数，默认 CPU核数 x 2 + 1（最多8个）
+    FUYOU_THREADS   每个worker的线程数，默认 4
+"""
+import gc
+import glob
+import multiprocessing
+import os
+
+project_root = os.path.dirname(os.path.abspath(__file__))
+
+bind = os.environ.get('FUYOU_BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('FUYOU_WORKERS', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+threads = int(os.environ.get('FUYOU_THREADS', 4))
+worker_class = 'gthread'
+
+# 主进程加载一次应用并预热缓存（见 wsgi.py），worker通过fork写时复制共享
+preload_app = True
+
+timeout = 60          # 生成排班、导入Excel等较慢的请求
+graceful_timeout = 30
+keepalive = 5
+max_requests = 2000   # 定期重启worker，避免内存缓慢增长
+max_requests_jitter = 200
+
+accesslog = '-'
+errorlog = '-'
+loglevel = 'info'
+
+
+def _metrics_dir():
+    return os.environ.get('FUYOU_METRICS_DIR') or os.path.join(project_root, 'instance', 'metrics')
+
+
+def on_starting(server):
+    """启动时清理上次运行留下的指标文件（按进程号区分，旧进程的计数不应混入）"""
+    for path in glob.glob(os.path.join(_metrics_dir(), 'metrics-*.json')):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def child_exit(server, worker):
+    """worker退出（包括max_requests定期重启）后把它的计数并入汇总文件，并删除它的指标文件"""
+    from app.metrics import merge_exited_process
+    merge_exited_process(_metrics_dir(), worker.pid)
+
+
+def when_ready(server):
+    """fork worker之前冻结主进程已有的对象，垃圾回收不再扫描它们，避免触发写时复制导致内存页被逐个复制"""
+    gc.collect()
+    gc.freeze()
@@ -3,4 +3,5 @@ from app import create_app
 app = create_app()
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    # 开发服务器（调试模式），生产环境使用 gunicorn -c gunicorn.conf.py wsgi:app
+    app.run(debug=True, host='0.0.0.0', port=5000)
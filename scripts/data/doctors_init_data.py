@@ -18,8 +18,9 @@ project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(_
 sys.path.insert(0, project_root)
 
 from app import create_app
-from app.models import Doctor
+from app.models import Doctor, Specialty, doctor_specialties
 from app.extensions import db
+from app.utils import insert_ignore
 
 def init_doctors():
     """初始化医生数据"""
@@ -105,25 +106,36 @@ def init_doctors():
         },  # 当前状态: ✗离职
     ]
 
-    # 检查现有医生
-    existing_doctors = [doc.name for doc in Doctor.query.all()]
-    new_count = 0
+    # 按姓名去重：一次查询已有姓名，新医生批量插入
+    existing_names = {name for (name,) in db.session.query(Doctor.name)}
+    new_doctors = [d for d in doctors_data if d["name"] not in existing_names]
+    new_count = len(new_doctors)
 
-    for doctor_data in doctors_data:
-        if doctor_data["name"] not in existing_doctors:
-            doctor = Doctor(
-                name=doctor_data["name"],
-                gender=doctor_data["gender"],
-                title=doctor_data["title"],
-                status=doctor_data["status"],
-                specialties=doctor_data["specialties"],
-                annual_leave_days=doctor_data["annual_leave_days"],
-                used_leave_days=doctor_data["used_leave_days"],
-                avatar=doctor_data["avatar"],
-                sequence=doctor_data["sequence"]
-            )
-            db.session.add(doctor)
-            new_count += 1
+    if new_doctors:
+        db.session.execute(Doctor.__table__.insert(), [
+            {
+                "name": d["name"],
+                "gender": d["gender"],
+                "title": d["title"],
+                "status": d["status"],
+                "specialties": json.dumps(d["specialties"], ensure_ascii=False),
+                "annual_leave_days": d["annual_leave_days"],
+                "used_leave_days": d["used_leave_days"],
+                "avatar": d["avatar"],
+                "sequence": d["sequence"]
+            }
+            for d in new_doctors
+        ])
+
+        # 同步写入擅长方向关联表
+        specialty_ids = dict(db.session.query(Specialty.name, Specialty.id))
+        doctor_ids = dict(db.session.query(Doctor.name, Doctor.id).filter(
+            Doctor.name.in_([d["name"] for d in new_doctors])
+        ))
+        insert_ignore(doctor_specialties, [
+            {"doctor_id": doctor_ids[d["name"]], "specialty_id": specialty_ids[name]}
+            for d in new_doctors for name in set(d["specialties"]) if name in specialty_ids
+        ], ["doctor_id", "specialty_id"])
 
     db.session.commit()
     print(f"医生数据初始化完成，新增 {new_count} 名医生")
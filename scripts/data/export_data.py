@@ -184,6 +184,7 @@ def generate_holidays_init_file(holidays, years):
     init_code.append('from app import create_app')
     init_code.append('from app.extensions import db')
     init_code.append('from app.models import Holiday')
+    init_code.append('from app.utils import insert_ignore')
     init_code.append('')
 
     # 按年份生成函数
@@ -223,18 +224,14 @@ def generate_holidays_init_file(holidays, years):
         init_code.append(f'        print("{year}年节假日数据已存在，跳过初始化")')
         init_code.append('        return')
         init_code.append('')
-        init_code.append('    # 插入数据')
-        init_code.append('    for holiday_date, name, holiday_type, is_system in holidays:')
-        init_code.append('        holiday = Holiday(')
-        init_code.append('            date=holiday_date,')
-        init_code.append('            name=name,')
-        init_code.append('            type=holiday_type,')
-        init_code.append('            is_system=is_system')
-        init_code.append('        )')
-        init_code.append('        db.session.add(holiday)')
-        init_code.append('    ')
+        init_code.append('    # 批量插入数据（按日期去重）')
+        init_code.append('    new_count = insert_ignore(Holiday, [')
+        init_code.append('        {"date": holiday_date, "name": name, "type": holiday_type, "is_system": is_system}')
+        init_code.append('        for holiday_date, name, holiday_type, is_system in holidays')
+        init_code.append('    ], ["date"])')
+        init_code.append('')
         init_code.append('    db.session.commit()')
-        init_code.append(f'    print("{year}年节假日数据初始化完成，共{len(year_holidays)}条记录")')
+        init_code.append(f'    print(f"{year}年节假日数据初始化完成，新增{{new_count}}条记录")')
         init_code.append('')
 
     # 生成检查函数
@@ -247,7 +244,7 @@ def generate_holidays_init_file(holidays, years):
     for year in sorted(years.keys()):
         function_name = f'init_{year}_holidays'
         init_code.append(f'        {function_name}()')
-        init_code.append('        return True')
+    init_code.append('        return True')
     init_code.append('    else:')
     init_code.append(f'        print(f"数据库中已有 {{total_count}} 条节假日数据")')
     init_code.append('        # 检查是否有新年份数据需要初始化')
@@ -296,8 +293,9 @@ def generate_doctors_init_file(doctors):
     init_code.append('sys.path.insert(0, project_root)')
     init_code.append('')
     init_code.append('from app import create_app')
-    init_code.append('from app.models import Doctor')
+    init_code.append('from app.models import Doctor, Specialty, doctor_specialties')
     init_code.append('from app.extensions import db')
+    init_code.append('from app.utils import insert_ignore')
     init_code.append('')
 
     # 生成初始化函数
@@ -331,25 +329,36 @@ def generate_doctors_init_file(doctors):
 
     init_code.append('    ]')
     init_code.append('')
-    init_code.append('    # 检查现有医生')
-    init_code.append('    existing_doctors = [doc.name for doc in Doctor.query.all()]')
-    init_code.append('    new_count = 0')
+    init_code.append('    # 按姓名去重：一次查询已有姓名，新医生批量插入')
+    init_code.append('    existing_names = {name for (name,) in db.session.query(Doctor.name)}')
+    init_code.append('    new_doctors = [d for d in doctors_data if d["name"] not in existing_names]')
+    init_code.append('    new_count = len(new_doctors)')
+    init_code.append('')
+    init_code.append('    if new_doctors:')
+    init_code.append('        db.session.execute(Doctor.__table__.insert(), [')
+    init_code.append('            {')
+    init_code.append('                "name": d["name"],')
+    init_code.append('                "gender": d["gender"],')
+    init_code.append('                "title": d["title"],')
+    init_code.append('                "status": d["status"],')
+    init_code.append('                "specialties": json.dumps(d["specialties"], ensure_ascii=False),')
+    init_code.append('                "annual_leave_days": d["annual_leave_days"],')
+    init_code.append('                "used_leave_days": d["used_leave_days"],')
+    init_code.append('                "avatar": d["avatar"],')
+    init_code.append('                "sequence": d["sequence"]')
+    init_code.append('            }')
+    init_code.append('            for d in new_doctors')
+    init_code.append('        ])')
     init_code.append('')
-    init_code.append('    for doctor_data in doctors_data:')
-    init_code.append('        if doctor_data["name"] not in existing_doctors:')
-    init_code.append('            doctor = Doctor(')
-    init_code.append('                name=doctor_data["name"],')
-    init_code.append('                gender=doctor_data["gender"],')
-    init_code.append('                title=doctor_data["title"],')
-    init_code.append('                status=doctor_data["status"],')
-    init_code.append('                specialties=doctor_data["specialties"],')
-    init_code.append('                annual_leave_days=doctor_data["annual_leave_days"],')
-    init_code.append('                used_leave_days=doctor_data["used_leave_days"],')
-    init_code.append('                avatar=doctor_data["avatar"],')
-    init_code.append('                sequence=doctor_data["sequence"]')
-    init_code.append('            )')
-    init_code.append('            db.session.add(doctor)')
-    init_code.append('            new_count += 1')
+    init_code.append('        # 同步写入擅长方向关联表')
+    init_code.append('        specialty_ids = dict(db.session.query(Specialty.name, Specialty.id))')
+    init_code.append('        doctor_ids = dict(db.session.query(Doctor.name, Doctor.id).filter(')
+    init_code.append('            Doctor.name.in_([d["name"] for d in new_doctors])')
+    init_code.append('        ))')
+    init_code.append('        insert_ignore(doctor_specialties, [')
+    init_code.append('            {"doctor_id": doctor_ids[d["name"]], "specialty_id": specialty_ids[name]}')
+    init_code.append('            for d in new_doctors for name in set(d["specialties"]) if name in specialty_ids')
+    init_code.append('        ], ["doctor_id", "specialty_id"])')
     init_code.append('')
     init_code.append('    db.session.commit()')
     init_code.append(f'    print(f"医生数据初始化完成，新增 {{new_count}} 名医生")')
@@ -393,6 +402,7 @@ def generate_users_init_file(users):
     init_code.append('from app import create_app')
     init_code.append('from app.models import User, Doctor')
     init_code.append('from app.extensions import db')
+    init_code.append('from app.utils import insert_ignore')
     init_code.append('')
 
     # 生成初始化函数
@@ -415,40 +425,32 @@ def generate_users_init_file(users):
             "username": "{user.username}",
             "password_hash": "{user.password_hash}",
             "full_name": "{user.full_name}",
-            "is_admin": {str(user.is_admin).lower()},
-            "is_super_admin": {str(user.is_super_admin).lower()},
+            "is_admin": {user.is_admin},
+            "is_super_admin": {user.is_super_admin},
             "associated_doctor_id": {user.associated_doctor_id if user.associated_doctor_id else 'None'},
-            "is_active": {str(user.is_active).lower()}
+            "is_active": {user.is_active}
         }}{associated_doctor_name}'''
 
         init_code.append(user_data)
 
     init_code.append('    ]')
     init_code.append('')
-    init_code.append('    # 检查现有用户')
-    init_code.append('    existing_users = [user.username for user in User.query.all()]')
-    init_code.append('    new_count = 0')
+    init_code.append('    # 关联的医生必须是在职状态')
+    init_code.append('    active_doctor_ids = {doctor_id for (doctor_id,) in db.session.query(Doctor.id).filter_by(status="在职")}')
     init_code.append('')
-    init_code.append('    for user_data in users_data:')
-    init_code.append('        if user_data["username"] not in existing_users:')
-    init_code.append('            user = User(')
-    init_code.append('                username=user_data["username"],')
-    init_code.append('                password_hash=user_data["password_hash"],')
-    init_code.append('                full_name=user_data["full_name"],')
-    init_code.append('                is_admin=user_data["is_admin"],')
-    init_code.append('                is_super_admin=user_data["is_super_admin"],')
-    init_code.append('                associated_doctor_id=user_data["associated_doctor_id"],')
-    init_code.append('                is_active=user_data["is_active"]')
-    init_code.append('            )')
-    init_code.append('            ')
-    init_code.append('            # 查找关联的医生（必须是在职状态）')
-    init_code.append('            if user_data.get("associated_doctor_id"):')
-    init_code.append('                doctor = Doctor.query.get(user_data["associated_doctor_id"])')
-    init_code.append('                if not doctor or doctor.status != "在职":')
-    init_code.append('                    user.associated_doctor_id = None')
-    init_code.append('            ')
-    init_code.append('            db.session.add(user)')
-    init_code.append('            new_count += 1')
+    init_code.append('    # 按用户名去重批量插入，已存在的用户保持不变')
+    init_code.append('    new_count = insert_ignore(User, [')
+    init_code.append('        {')
+    init_code.append('            "username": user_data["username"],')
+    init_code.append('            "password_hash": user_data["password_hash"],')
+    init_code.append('            "full_name": user_data["full_name"],')
+    init_code.append('            "is_admin": user_data["is_admin"],')
+    init_code.append('            "is_super_admin": user_data["is_super_admin"],')
+    init_code.append('            "associated_doctor_id": user_data["associated_doctor_id"] if user_data["associated_doctor_id"] in active_doctor_ids else None,')
+    init_code.append('            "is_active": user_data["is_active"]')
+    init_code.append('        }')
+    init_code.append('        for user_data in users_data')
+    init_code.append('    ], ["username"])')
     init_code.append('')
     init_code.append('    db.session.commit()')
     init_code.append(f'    print(f"用户数据初始化完成，新增 {{new_count}} 个用户")')
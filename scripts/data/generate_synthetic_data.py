@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+合成测试数据生成脚本
+按固定随机种子生成 N 名医生和 M 年的排班、工时、工作量和节假日数据，
+同样的参数总是生成同样的数据，便于性能测试结果横向对比
+
+注意：会写入 FUYOU_DATABASE_URI 指定的数据库（默认为 instance/fuyou.db），
+请在测试库中使用，例如:
+    FUYOU_DATABASE_URI=sqlite:////tmp/fuyou-bench.db python scripts/data/generate_synthetic_data.py
+"""
+
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from app.extensions import db
+from app.models import Doctor, Schedule, WorkHours, WorkScore, Holiday, Specialty, doctor_specialties
+from app.utils import insert_ignore
+
+BATCH_SIZE = 1000
+WEEKDAY_NAMES = ['星期一', '星期二', '星期三', '星期四', '星期五', '星期六', '星期日']
+
+SURNAMES = '王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾肖田董袁潘于蒋蔡余杜叶程苏魏吕丁任沈姚卢姜崔钟谭陆汪范金石廖贾夏韦付方白邹孟熊秦邱江尹薛闫段雷侯龙史陶黎贺顾毛郝龚邵万钱严覃武戴莫孔向汤'
+GIVEN_NAME_CHARS = '佩文娟世珍慧金美丽华秀英敏静燕芳玲红霞艳萍雪琳婷晶颖倩欣怡雅琴梅兰凤洁蓉薇月莉丹宁瑶佳思雨嘉'
+TITLES = ['主任医师', '副主任医师', '主治医师', '医师', '住院医师']
+SPECIALTY_NAMES = ['妇科', '产科', '儿科', '筛查']
+
+# 每天的班次：(班次, 时间段, 科室, 工时, 工作量分值)
+DAILY_SHIFTS = [
+    ('白班', '08:00-17:30', '门诊', 7.5, 1.0),
+    ('白班', '08:00-17:30', '病房', 7.5, 1.0),
+    ('中班', '08:00-14:30', '门诊', 6.0, 0.8),
+    ('夜班', '16:00-23:59', '急诊', 8.0, 1.2),
+    ('下夜', '00:00-08:00', '急诊', 8.0, 1.2),
+]
+
+# 固定日期的节假日（春节等农历节日按年份偏移模拟）
+FIXED_HOLIDAYS = [
+    ((1, 1), '元旦'),
+    ((5, 1), '劳动节'), ((5, 2), '劳动节'), ((5, 3), '劳动节'),
+    ((10, 1), '国庆节'), ((10, 2), '国庆节'), ((10, 3), '国庆节'), ((10, 4), '国庆节'),
+    ((10, 5), '国庆节'), ((10, 6), '国庆节'), ((10, 7), '国庆节'),
+]
+
+def generate_doctor_rows(rng, count):
+    """生成医生数据（姓名唯一）"""
+    rows, names = [], set()
+    for i in range(count):
+        name = rng.choice(SURNAMES) + ''.join(rng.choice(GIVEN_NAME_CHARS) for _ in range(rng.choice((1, 2))))
+        while name in names:
+            name += rng.choice(GIVEN_NAME_CHARS)
+        names.add(name)
+
+        specialties = rng.sample(SPECIALTY_NAMES, rng.randint(1, len(SPECIALTY_NAMES)))
+        annual_leave_days = rng.choice((5, 10, 15))
+        rows.append({
+            'name': name,
+            'gender': '女' if rng.random() < 0.8 else '男',
+            'title': rng.choice(TITLES),
+            'status': '在职' if rng.random() < 0.9 else '离职',
+            'specialties': json.dumps(specialties, ensure_ascii=False),
+            'annual_leave_days': annual_leave_days,
+            'used_leave_days': rng.randint(0, annual_leave_days),
+            'sequence': (i + 1) * 10,
+        })
+    return rows
+
+def generate_holiday_rows(rng, start_year, years):
+    """生成节假日和调休数据"""
+    rows = []
+    for year in range(start_year, start_year + years):
+        for (month, day), name in FIXED_HOLIDAYS:
+            rows.append({'date': date(year, month, day), 'name': name, 'type': 'holiday', 'is_system': True})
+
+        # 春节：1月21日至2月10日之间随机开始，连休8天，前后各一个调休工作日
+        spring_festival = date(year, 1, 21) + timedelta(days=rng.randint(0, 20))
+        for offset in range(8):
+            rows.append({'date': spring_festival + timedelta(days=offset), 'name': '春节',
+                         'type': 'holiday', 'is_system': True})
+        for workday in (spring_festival - timedelta(days=2), spring_festival + timedelta(days=10)):
+            rows.append({'date': workday, 'name': '春节调休', 'type': 'workday', 'is_system': False})
+
+    # 同一天只保留第一条
+    unique = {}
+    for row in rows:
+        unique.setdefault(row['date'], row)
+    return list(unique.values())
+
+def generate_schedule_rows(rng, doctor_ids, start_year, years):
+    """生成排班及对应的工时、工作量数据（按医生按天汇总）"""
+    schedules, hours, scores = [], {}, {}
+    day = date(start_year, 1, 1)
+    end = date(start_year + years, 1, 1)
+    while day < end:
+        on_duty = rng.sample(doctor_ids, min(len(doctor_ids), len(DAILY_SHIFTS)))
+        for (shift, time_range, department, shift_hours, shift_score), doctor_id in zip(DAILY_SHIFTS, on_duty):
+            assigned = rng.random() < 0.95
+            schedules.append({
+                'doctor_id': doctor_id if assigned else None,
+                'date': day,
+                'weekday': WEEKDAY_NAMES[day.weekday()],
+                'shift': shift,
+                'time_range': time_range,
+                'department': department,
+                'status': 'assigned' if assigned else 'unassigned',
+            })
+            if assigned:
+                key = (doctor_id, day)
+                hours[key] = hours.get(key, 0) + shift_hours
+                scores[key] = scores.get(key, 0) + shift_score
+        day += timedelta(days=1)
+
+    work_hours = [{'doctor_id': doctor_id, 'date': day, 'total_hours': round(value, 2),
+                   'month': day.month, 'year': day.year} for (doctor_id, day), value in hours.items()]
+    work_scores = [{'doctor_id': doctor_id, 'date': day, 'score': round(value, 1),
+                    'month': day.month, 'year': day.year} for (doctor_id, day), value in scores.items()]
+    return schedules, work_hours, work_scores
+
+def bulk_insert(model, rows):
+    """按批executemany插入"""
+    table = model.__table__
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(table.insert(), rows[start:start + BATCH_SIZE])
+
+def generate_dataset(doctors=50, years=1, start_year=2025, seed=42):
+    """
+    生成合成数据集（需要在应用上下文中调用）
+
+    医生姓名和节假日日期已存在时跳过，排班等统计数据全部追加。
+
+    Args:
+        doctors: 医生数量
+        years: 排班数据的年数
+        start_year: 起始年份
+        seed: 随机种子
+
+    Returns:
+        dict: 表名 -> 插入行数
+    """
+    rng = random.Random(seed)
+    counts = {}
+
+    # 医生：按姓名去重
+    doctor_rows = generate_doctor_rows(rng, doctors)
+    existing_names = {name for (name,) in db.session.query(Doctor.name)}
+    new_doctors = [row for row in doctor_rows if row['name'] not in existing_names]
+    bulk_insert(Doctor, new_doctors)
+    counts['doctors'] = len(new_doctors)
+
+    doctor_ids = dict(db.session.query(Doctor.name, Doctor.id).filter(
+        Doctor.name.in_([row['name'] for row in doctor_rows])
+    ))
+    specialty_ids = dict(db.session.query(Specialty.name, Specialty.id))
+    counts['doctor_specialties'] = insert_ignore(doctor_specialties, [
+        {'doctor_id': doctor_ids[row['name']], 'specialty_id': specialty_ids[name]}
+        for row in new_doctors for name in json.loads(row['specialties']) if name in specialty_ids
+    ], ['doctor_id', 'specialty_id'])
+
+    # 节假日：按日期去重
+    counts['holidays'] = insert_ignore(Holiday, generate_holiday_rows(rng, start_year, years), ['date'])
+
+    # 排班和统计：只安排在职医生
+    active_ids = sorted(doctor_id for (doctor_id,) in db.session.query(Doctor.id).filter(
+        Doctor.status == '在职', Doctor.name.in_([row['name'] for row in doctor_rows])
+    ))
+    schedules, work_hours, work_scores = generate_schedule_rows(rng, active_ids, start_year, years)
+    bulk_insert(Schedule, schedules)
+    bulk_insert(WorkHours, work_hours)
+    bulk_insert(WorkScore, work_scores)
+    counts['schedules'] = len(schedules)
+    counts['work_hours'] = len(work_hours)
+    counts['work_scores'] = len(work_scores)
+
+    db.session.commit()
+    return counts
+
+def print_usage():
+    """显示用法"""
+    print("用法:")
+    print("  python generate_synthetic_data.py [--doctors N] [--years M] [--start-year YYYY] [--seed S]")
+    print("默认: 50 名医生，2025 年起 1 年数据，随机种子 42")
+
+def parse_args(args):
+    """解析命令行参数"""
+    options = {'doctors': 50, 'years': 1, 'start_year': 2025, 'seed': 42}
+    names = {'--doctors': 'doctors', '--years': 'years', '--start-year': 'start_year', '--seed': 'seed'}
+    i = 0
+    while i < len(args):
+        if args[i] not in names or i + 1 >= len(args):
+            raise ValueError(args[i])
+        options[names[args[i]]] = int(args[i + 1])
+        i += 2
+    return options
+
+def main():
+    """主函数"""
+    try:
+        options = parse_args(sys.argv[1:])
+    except ValueError:
+        print_usage()
+        sys.exit(1)
+
+    from app import create_app
+    app = create_app()
+    with app.app_context():
+        print(f" 生成合成数据: {options['doctors']} 名医生，{options['start_year']} 年起 {options['years']} 年，"
+              f"随机种子 {options['seed']}")
+        print(f" 数据库: {app.config['SQLALCHEMY_DATABASE_URI']}")
+        start = time.perf_counter()
+        counts = generate_dataset(**options)
+        print("-" * 40)
+        for name, count in counts.items():
+            print(f"   {name:<20} {count:>8} 行")
+        print("-" * 40)
+        print(f" 完成，耗时 {time.perf_counter() - start:.2f} 秒")
+        print("💡 进程内缓存（节假日、搜索索引）需要重启应用后刷新")
+
+if __name__ == '__main__':
+    main()
@@ -24,6 +24,7 @@ sys.path.insert(0, project_root)
 from app import create_app
 from app.extensions import db
 from app.models import Holiday
+from app.utils import insert_ignore
 
 def init_2025_holidays():
     """初始化2025年节假日数据"""
@@ -73,18 +74,14 @@ def init_2025_holidays():
         print("2025年节假日数据已存在，跳过初始化")
         return
 
-    # 插入数据
-    for holiday_date, name, holiday_type, is_system in holidays:
-        holiday = Holiday(
-            date=holiday_date,
-            name=name,
-            type=holiday_type,
-            is_system=is_system
-        )
-        db.session.add(holiday)
-    
+    # 批量插入数据（按日期去重）
+    new_count = insert_ignore(Holiday, [
+        {"date": holiday_date, "name": name, "type": holiday_type, "is_system": is_system}
+        for holiday_date, name, holiday_type, is_system in holidays
+    ], ["date"])
+
     db.session.commit()
-    print("2025年节假日数据初始化完成，共33条记录")
+    print(f"2025年节假日数据初始化完成，新增{new_count}条记录")
 
 def init_2026_holidays():
     """初始化2026年节假日数据"""
@@ -140,18 +137,14 @@ def init_2026_holidays():
         print("2026年节假日数据已存在，跳过初始化")
         return
 
-    # 插入数据
-    for holiday_date, name, holiday_type, is_system in holidays:
-        holiday = Holiday(
-            date=holiday_date,
-            name=name,
-            type=holiday_type,
-            is_system=is_system
-        )
-        db.session.add(holiday)
-    
+    # 批量插入数据（按日期去重）
+    new_count = insert_ignore(Holiday, [
+        {"date": holiday_date, "name": name, "type": holiday_type, "is_system": is_system}
+        for holiday_date, name, holiday_type, is_system in holidays
+    ], ["date"])
+
     db.session.commit()
-    print("2026年节假日数据初始化完成，共39条记录")
+    print(f"2026年节假日数据初始化完成，新增{new_count}条记录")
 
 def check_holidays_data():
     """检查并初始化所有年份数据"""
@@ -159,7 +152,6 @@ def check_holidays_data():
     if total_count == 0:
         print("数据库中没有节假日数据，正在初始化...")
         init_2025_holidays()
-        return True
         init_2026_holidays()
         return True
     else:
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+数据库快照导出/导入
+将整个数据库（包括排班和统计表）导出为gzip压缩的NDJSON文件，或从快照文件批量导入
+
+与 export_data.py 生成的初始化脚本不同，快照不需要执行生成的Python代码：
+导出时按批流式读取，导入时按批executemany写入，适合在测试环境快速灌入一整年的数据。
+
+快照格式（每行一个JSON对象）:
+    {"format": "fuyou-snapshot", "version": 1, "created_at": "...", "tables": [...]}
+    {"table": "doctors", "columns": ["id", "name", ...]}
+    ["1", "张三", ...]                 # 数据行，按列顺序
+    ...
+"""
+
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, time as dt_time
+from decimal import Decimal
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+import sqlalchemy as sa
+
+from app import create_app
+from app.extensions import db
+
+SNAPSHOT_FORMAT = 'fuyou-snapshot'
+SNAPSHOT_VERSION = 1
+BATCH_SIZE = 1000
+DEFAULT_SNAPSHOT = os.path.join(project_root, 'instance', 'snapshot.ndjson.gz')
+
+def _encode_value(value):
+    """JSON不支持的类型转为字符串"""
+    if isinstance(value, (datetime, date, dt_time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f'无法序列化的类型: {type(value).__name__}')
+
+def _column_decoder(column):
+    """根据列类型返回反序列化函数"""
+    column_type = column.type
+    if isinstance(column_type, sa.DateTime):
+        return datetime.fromisoformat
+    if isinstance(column_type, sa.Date):
+        return date.fromisoformat
+    if isinstance(column_type, sa.Time):
+        return dt_time.fromisoformat
+    if isinstance(column_type, sa.Numeric) and column_type.asdecimal:
+        return Decimal
+    return None
+
+def get_snapshot_tables():
+    """按外键依赖顺序返回所有表（被引用的表在前）"""
+    return list(db.metadata.sorted_tables)
+
+def export_snapshot(path=DEFAULT_SNAPSHOT):
+    """
+    导出快照
+
+    每张表使用一次流式查询（yield_per），内存占用与表大小无关。
+
+    Returns:
+        dict: 表名 -> 导出行数
+    """
+    tables = get_snapshot_tables()
+    counts = {}
+
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        header = {
+            'format': SNAPSHOT_FORMAT,
+            'version': SNAPSHOT_VERSION,
+            'created_at': datetime.now().isoformat(),
+            'tables': [table.name for table in tables],
+        }
+        f.write(json.dumps(header, ensure_ascii=False) + '\n')
+
+        with db.engine.connect() as conn:
+            for table in tables:
+                columns = [column.name for column in table.columns]
+                f.write(json.dumps({'table': table.name, 'columns': columns}, ensure_ascii=False) + '\n')
+
+                result = conn.execution_options(yield_per=BATCH_SIZE).execute(
+                    sa.select(table).order_by(*table.primary_key.columns)
+                )
+                count = 0
+                for partition in result.partitions():
+                    f.writelines(
+                        json.dumps(list(row), ensure_ascii=False, default=_encode_value) + '\n'
+                        for row in partition
+                    )
+                    count += len(partition)
+                counts[table.name] = count
+
+    return counts
+
+def _read_snapshot(path):
+    """逐行读取快照，生成 (表, 列名, 数据行) """
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        if header.get('format') != SNAPSHOT_FORMAT:
+            raise ValueError(f'{path} 不是有效的快照文件')
+        if header.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f'不支持的快照版本: {header.get("version")}')
+
+        table, columns = None, None
+        for line in f:
+            item = json.loads(line)
+            if isinstance(item, dict):
+                table, columns = item['table'], item['columns']
+            else:
+                yield table, columns, item
+
+def import_snapshot(path=DEFAULT_SNAPSHOT, replace=False):
+    """
+    导入快照
+
+    所有写入在一个事务中完成，每张表按 BATCH_SIZE 分批executemany插入，失败时整体回滚。
+
+    Args:
+        path: 快照文件路径
+        replace: 导入前清空快照中包含的表；否则要求这些表为空
+
+    Returns:
+        dict: 表名 -> 导入行数
+    """
+    tables = {table.name: table for table in get_snapshot_tables()}
+    counts = {}
+
+    with db.engine.begin() as conn:
+        # 检查目标表
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            snapshot_tables = [name for name in json.loads(f.readline()).get('tables', []) if name in tables]
+
+        if replace:
+            for name in reversed([table.name for table in get_snapshot_tables()]):
+                if name in snapshot_tables:
+                    conn.execute(tables[name].delete())
+        else:
+            for name in snapshot_tables:
+                if conn.execute(sa.select(sa.func.count()).select_from(tables[name])).scalar():
+                    raise ValueError(f'表 {name} 已有数据，请使用 --replace 覆盖')
+
+        current, decoders, batch = None, None, []
+
+        def flush():
+            if batch:
+                conn.execute(tables[current].insert(), batch)
+                counts[current] = counts.get(current, 0) + len(batch)
+                batch.clear()
+
+        for name, columns, values in _read_snapshot(path):
+            if name != current:
+                flush()
+                current = name
+                if name in tables:
+                    table_columns = tables[name].columns
+                    # 快照中存在、当前表结构中已删除的列直接忽略
+                    decoders = [
+                        (column, _column_decoder(table_columns[column])) if column in table_columns else (column, False)
+                        for column in columns
+                    ]
+            if name not in tables:
+                continue
+
+            row = {}
+            for (column, decoder), value in zip(decoders, values):
+                if decoder is False:
+                    continue
+                row[column] = decoder(value) if decoder and value is not None else value
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                flush()
+        flush()
+
+        # PostgreSQL 需要同步自增序列
+        if conn.dialect.name == 'postgresql':
+            for name in counts:
+                table = tables[name]
+                if 'id' in table.columns:
+                    conn.execute(sa.text(
+                        f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), "
+                        f"COALESCE((SELECT MAX(id) FROM {name}), 1))"
+                    ))
+
+    return counts
+
+def print_counts(counts, elapsed):
+    """显示各表行数统计"""
+    print("-" * 40)
+    for name, count in counts.items():
+        print(f"   {name:<24} {count:>8} 行")
+    print("-" * 40)
+    print(f"   共 {sum(counts.values())} 行，耗时 {elapsed:.2f} 秒")
+
+def print_usage():
+    """显示用法"""
+    print("用法:")
+    print("  python snapshot.py export [文件]             # 导出快照（默认 instance/snapshot.ndjson.gz）")
+    print("  python snapshot.py import [文件]             # 导入快照（目标表必须为空）")
+    print("  python snapshot.py import [文件] --replace   # 清空对应表后导入")
+
+def main():
+    """主函数"""
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if not args or args[0] not in ('export', 'import'):
+        print_usage()
+        sys.exit(1)
+
+    command = args[0]
+    path = args[1] if len(args) > 1 else DEFAULT_SNAPSHOT
+
+    app = create_app()
+    with app.app_context():
+        start = time.perf_counter()
+        try:
+            if command == 'export':
+                print(f" 导出数据库快照到: {path}")
+                counts = export_snapshot(path)
+            else:
+                print(f" 从快照导入数据库: {path}")
+                counts = import_snapshot(path, replace='--replace' in sys.argv)
+        except Exception as e:
+            print(f" 快照{'导出' if command == 'export' else '导入'}失败: {e}")
+            sys.exit(1)
+
+        print_counts(counts, time.perf_counter() - start)
+
+        if command == 'import':
+            print("💡 请重启应用以刷新进程内缓存（节假日、搜索索引等）")
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
 """
 年度重置脚本
-每年1月1号将所有医生的已休天数重置为0
+每年1月1号将所有医生手工录入的已休天数清零，已休天数按新年度的公休记录重新计算
+（例如上一年12月提前登记的1月公休）
+
+重置通过UPDATE语句完成，同时把每名医生重置前的已休天数写入 leave_reset_logs 审计表。
+同一年份已有审计记录时不会重复重置，可以放心由cron重复执行。
 """
 
 import os
@@ -9,89 +13,119 @@ import sys
 from datetime import datetime
 
 # 添加项目根目录到Python路径
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
 
 from app import create_app
-from app.models import Doctor
+from app.models import Doctor, LeavePeriod, LeaveResetLog
 from app.extensions import db
 
-def reset_annual_leave():
-    """重置所有医生的已休天数为0"""
+def show_reset_diff(year):
+    """显示将被重置的医生（只读，不修改数据）
+
+    Returns:
+        int: 将被重置的医生数
+    """
+    ledger_days = LeavePeriod.annual_days_by_doctor(year)
+    rows = db.session.query(Doctor.id, Doctor.name, Doctor.used_leave_days).filter(
+        db.or_(Doctor.used_leave_days > 0, Doctor.id.in_(ledger_days))
+    ).order_by(Doctor.sequence, Doctor.id).all()
+
+    print(f" {year} 年度重置预览（dry-run，不修改数据）:")
+    print("-" * 40)
+    for doctor_id, name, used_leave_days in rows:
+        print(f" - {name} (ID {doctor_id}): 已休天数 {used_leave_days} → {ledger_days.get(doctor_id, 0)}")
+    print("-" * 40)
+    print(f" 将重置 {len(rows)} 名医生")
+    return len(rows)
+
+def is_year_reset(year):
+    """检查指定年份是否已经重置过"""
+    return db.session.query(LeaveResetLog.id).filter_by(year=year).first() is not None
+
+def apply_reset(year):
+    """在一个事务中写入审计记录并重置已休天数
+
+    手工录入基数清零，已休天数重新计算为该年份公休记录的天数。
+
+    Returns:
+        int: 被重置的医生数
+    """
+    now = datetime.utcnow()
+    doctors = Doctor.__table__
+    logs = LeaveResetLog.__table__
+
+    # 审计记录：INSERT ... SELECT 一次写入所有医生重置前的已休天数
+    db.session.execute(
+        logs.insert().from_select(
+            ['year', 'doctor_id', 'previous_used_days', 'reset_at'],
+            db.select(
+                db.literal(year),
+                doctors.c.id,
+                db.func.coalesce(doctors.c.used_leave_days, 0),
+                db.literal(now)
+            )
+        )
+    )
+
+    # 重置：一条UPDATE语句清零，再写回已登记在该年份的公休天数
+    result = db.session.execute(
+        doctors.update().where(
+            db.or_(doctors.c.used_leave_days > 0, doctors.c.leave_days_baseline > 0)
+        ).values(used_leave_days=0, leave_days_baseline=0)
+    )
+    for doctor_id, days in LeavePeriod.annual_days_by_doctor(year).items():
+        db.session.execute(doctors.update().where(doctors.c.id == doctor_id).values(used_leave_days=days))
+    db.session.commit()
+    return result.rowcount
+
+def reset_annual_leave(force=False, dry_run=False, year=None):
+    """重置所有医生的已休天数
+
+    Args:
+        force: 不检查当前日期是否为1月1号
+        dry_run: 只显示将被重置的医生，不修改数据
+        year: 重置的年份（用于防重复），默认为当前年份
+    """
     app = create_app()
     with app.app_context():
+        today = datetime.now()
+        year = year or today.year
+
+        if dry_run:
+            show_reset_diff(year)
+            if is_year_reset(year):
+                print(f"⚠️  {year} 年已经重置过，实际执行时将跳过")
+            return
+
         try:
-            print(" 开始年度重置...")
+            print(" 强制年度重置..." if force else " 开始年度重置...")
 
             # 检查当前日期是否为1月1号
-            today = datetime.now()
-            if today.month != 1 or today.day != 1:
+            if not force and (today.month != 1 or today.day != 1):
                 print(f"⚠️  当前日期 {today.strftime('%Y-%m-%d')} 不是1月1号")
                 print("💡 如果确实需要重置，请使用 --force 参数")
                 return
 
-            # 获取所有医生
-            doctors = Doctor.query.all()
-            reset_count = 0
-
-            print(f" 找到 {len(doctors)} 名医生")
-
-            for doctor in doctors:
-                if doctor.used_leave_days > 0:
-                    print(f" 重置医生 {doctor.name} 的已休天数: {doctor.used_leave_days} → 0")
-                    doctor.used_leave_days = 0
-                    reset_count += 1
-                else:
-                    print(f" 医生 {doctor.name} 已休天数已为0，无需重置")
+            # 同一年份只重置一次
+            if is_year_reset(year):
+                print(f" {year} 年已经重置过，跳过（审计记录见 leave_reset_logs 表）")
+                return
 
-            # 提交更改
-            db.session.commit()
+            total_doctors = db.session.query(db.func.count(Doctor.id)).scalar()
+            reset_count = apply_reset(year)
 
             print(f"\n 年度重置完成！")
             print(f" 统计信息:")
-            print(f"   - 总医生数: {len(doctors)}")
+            print(f"   - 总医生数: {total_doctors}")
             print(f"   - 重置医生数: {reset_count}")
-            print(f"   - 无需重置: {len(doctors) - reset_count}")
+            print(f"   - 无需重置: {total_doctors - reset_count}")
 
         except Exception as e:
             print(f" 年度重置失败: {str(e)}")
             db.session.rollback()
             raise
 
-def reset_annual_leave_force():
-    """强制重置所有医生的已休天数为0（不检查日期）"""
-    app = create_app()
-    with app.app_context():
-        try:
-            print(" 强制年度重置...")
-
-            # 获取所有医生
-            doctors = Doctor.query.all()
-            reset_count = 0
-
-            print(f" 找到 {len(doctors)} 名医生")
-
-            for doctor in doctors:
-                if doctor.used_leave_days > 0:
-                    print(f" 重置医生 {doctor.name} 的已休天数: {doctor.used_leave_days} → 0")
-                    doctor.used_leave_days = 0
-                    reset_count += 1
-                else:
-                    print(f" 医生 {doctor.name} 已休天数已为0，无需重置")
-
-            # 提交更改
-            db.session.commit()
-
-            print(f"\n 强制年度重置完成！")
-            print(f" 统计信息:")
-            print(f"   - 总医生数: {len(doctors)}")
-            print(f"   - 重置医生数: {reset_count}")
-            print(f"   - 无需重置: {len(doctors) - reset_count}")
-
-        except Exception as e:
-            print(f" 强制年度重置失败: {str(e)}")
-            db.session.rollback()
-            raise
-
 def show_current_status():
     """显示当前医生的年假状态"""
     app = create_app()
@@ -122,18 +156,33 @@ def show_current_status():
         except Exception as e:
             print(f" 查询失败: {str(e)}")
 
+def print_usage():
+    """显示用法"""
+    print("用法:")
+    print("  python reset_annual_leave.py                # 仅在1月1号执行重置")
+    print("  python reset_annual_leave.py --force        # 强制执行重置（同一年份仍只重置一次）")
+    print("  python reset_annual_leave.py --dry-run      # 预览将被重置的医生，不修改数据")
+    print("  python reset_annual_leave.py --year 2026    # 指定重置年份")
+    print("  python reset_annual_leave.py --status       # 查看当前状态")
+
 if __name__ == '__main__':
-    import sys
-
-    if len(sys.argv) > 1:
-        if sys.argv[1] == '--force':
-            reset_annual_leave_force()
-        elif sys.argv[1] == '--status':
-            show_current_status()
-        else:
-            print("用法:")
-            print("  python reset_annual_leave.py           # 仅在1月1号执行重置")
-            print("  python reset_annual_leave.py --force   # 强制执行重置")
-            print("  python reset_annual_leave.py --status  # 查看当前状态")
-    else:
-        reset_annual_leave()
\ No newline at end of file
+    args = sys.argv[1:]
+
+    if '--status' in args:
+        show_current_status()
+        sys.exit(0)
+
+    year = None
+    if '--year' in args:
+        try:
+            year = int(args[args.index('--year') + 1])
+        except (IndexError, ValueError):
+            print_usage()
+            sys.exit(1)
+
+    unknown = [arg for arg in args if arg.startswith('--') and arg not in ('--force', '--dry-run', '--year')]
+    if unknown:
+        print_usage()
+        sys.exit(1)
+
+    reset_annual_leave(force='--force' in args, dry_run='--dry-run' in args, year=year)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+密码哈希性能测试脚本
+测量不同哈希策略下单核每秒可完成的登录验证次数，用于选择 PASSWORD_HASH_METHOD
+"""
+
+import os
+import sys
+import time
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from app.models import DEFAULT_PASSWORD_HASH_METHOD
+
+# 候选策略
+CANDIDATE_METHODS = [
+    DEFAULT_PASSWORD_HASH_METHOD,
+    'scrypt:16384:8:1',
+    'pbkdf2:sha256:600000',
+    'pbkdf2:sha256:260000',
+]
+
+def benchmark_method(method, rounds):
+    """测量指定策略的单次验证耗时
+
+    Returns:
+        tuple: (平均耗时毫秒, 单核每秒登录次数)
+    """
+    password_hash = generate_password_hash('benchmark-password', method=method)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        check_password_hash(password_hash, 'benchmark-password')
+    elapsed = time.perf_counter() - start
+
+    per_login = elapsed / rounds
+    return per_login * 1000, 1 / per_login
+
+def main():
+    """主函数"""
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    methods = sys.argv[2:] or CANDIDATE_METHODS
+
+    print("🏥 妇幼排班管理系统 - 密码哈希性能测试")
+    print("=" * 60)
+    print(f"每种策略验证 {rounds} 次（单线程，即单核吞吐量）")
+    print(f"CPU核数: {os.cpu_count()}")
+    print()
+    print(f"{'哈希策略':<26} {'平均耗时(ms)':>12} {'登录/秒/核':>12}")
+    print("-" * 60)
+
+    for method in methods:
+        try:
+            avg_ms, per_second = benchmark_method(method, rounds)
+            marker = " (默认)" if method == DEFAULT_PASSWORD_HASH_METHOD else ""
+            print(f"{method:<26} {avg_ms:>12.1f} {per_second:>12.1f}{marker}")
+        except Exception as e:
+            print(f"{method:<26} 测试失败: {e}")
+
+    print()
+    print("💡 在 app/__init__.py 中修改 PASSWORD_HASH_METHOD 后，用户下次登录时会自动升级哈希")
+
+if __name__ == '__main__':
+    main()
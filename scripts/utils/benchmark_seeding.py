@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+批量初始化数据性能测试脚本
+在临时SQLite数据库中对比逐条ORM插入与 insert_ignore 批量插入（ON CONFLICT DO NOTHING）的耗时
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from flask import Flask
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from app.extensions import db
+from app.models import Doctor, Holiday
+from app.utils import insert_ignore
+
+def build_rows(count):
+    """生成测试节假日和医生数据"""
+    start = date(2000, 1, 1)
+    holidays = [
+        {'date': start + timedelta(days=i), 'name': f'节假日{i}', 'type': 'holiday', 'is_system': False}
+        for i in range(count)
+    ]
+    doctors = [
+        {'name': f'医生{i}', 'gender': '女', 'title': '医师', 'status': '在职',
+         'specialties': json.dumps(['妇科'], ensure_ascii=False), 'sequence': i}
+        for i in range(count)
+    ]
+    return holidays, doctors
+
+def seed_orm(holidays, doctors):
+    """旧版实现：先读取已有记录，再逐条add"""
+    existing_dates = [h.date for h in Holiday.query.all()]
+    for row in holidays:
+        if row['date'] not in existing_dates:
+            db.session.add(Holiday(**row))
+
+    existing_names = [d.name for d in Doctor.query.all()]
+    for row in doctors:
+        if row['name'] not in existing_names:
+            db.session.add(Doctor(**row))
+    db.session.commit()
+
+def seed_bulk(holidays, doctors):
+    """新版实现：节假日按日期冲突跳过，医生按姓名一次查询去重后批量插入"""
+    insert_ignore(Holiday, holidays, ['date'])
+
+    existing_names = {name for (name,) in db.session.query(Doctor.name)}
+    new_doctors = [row for row in doctors if row['name'] not in existing_names]
+    if new_doctors:
+        db.session.execute(Doctor.__table__.insert(), new_doctors)
+    db.session.commit()
+
+def run(app, seed, holidays, doctors):
+    """在空库上执行两次（首次导入 + 重复执行），返回两次耗时（毫秒）"""
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        timings = []
+        for _ in range(2):
+            start = time.perf_counter()
+            seed(holidays, doctors)
+            timings.append((time.perf_counter() - start) * 1000)
+            db.session.remove()
+        assert Holiday.query.count() == len(holidays)
+        assert Doctor.query.count() == len(doctors)
+        return timings
+
+def main():
+    """主函数"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(tmp_dir, 'benchmark.db')
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(app)
+
+        print("🏥 妇幼排班管理系统 - 批量初始化数据性能测试")
+        print("=" * 60)
+        print(f"节假日 {count} 条 + 医生 {count} 名（临时SQLite文件数据库）")
+        print()
+
+        holidays, doctors = build_rows(count)
+        orm_first, orm_again = run(app, seed_orm, holidays, doctors)
+        bulk_first, bulk_again = run(app, seed_bulk, holidays, doctors)
+
+        print(f"{'实现':<20} {'首次导入(ms)':>14} {'重复执行(ms)':>14}")
+        print("-" * 60)
+        print(f"{'逐条ORM插入':<20} {orm_first:>14.1f} {orm_again:>14.1f}")
+        print(f"{'批量插入':<20} {bulk_first:>14.1f} {bulk_again:>14.1f}")
+        print()
+        print(f"首次导入加速: {orm_first / bulk_first:.1f}x，重复执行加速: {orm_again / bulk_again:.1f}x")
+
+if __name__ == '__main__':
+    main()
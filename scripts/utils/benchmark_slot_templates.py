@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+排班班次模板展开性能测试脚本
+在临时SQLite数据库中按科室数生成班次模板，对比逐天查询模板生成与编译后整月展开的耗时
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import time as dt_time
+
+from flask import Flask
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from app.extensions import db
+from app.models import ShiftType, SlotTemplate
+from app.holiday_utils.holidays import holiday_helper
+from app.slot_templates import SlotTemplateCache
+
+SHIFT_TYPES = [
+    ('白班', dt_time(8, 0), dt_time(17, 30)),
+    ('中班', dt_time(8, 0), dt_time(14, 30)),
+    ('夜班', dt_time(16, 0), dt_time(23, 59)),
+    ('下夜', dt_time(0, 0), dt_time(8, 0)),
+]
+DAY_TYPE_CHOICES = ['weekday,workday', 'weekday,workday,weekend', 'weekday,workday,weekend,holiday']
+
+def seed_templates(departments, seed=42):
+    """每个科室每种班次一个模板，人数1-4随机"""
+    rng = random.Random(seed)
+    for name, start, end in SHIFT_TYPES:
+        db.session.add(ShiftType(name=name, start_time=start, end_time=end, duration_hours=8, work_score=1))
+    db.session.flush()
+    shift_type_ids = [shift_type.id for shift_type in ShiftType.query.order_by(ShiftType.id)]
+    for i in range(departments):
+        for sequence, shift_type_id in enumerate(shift_type_ids):
+            db.session.add(SlotTemplate(department=f'科室{i + 1}', shift_type_id=shift_type_id,
+                                        headcount=rng.randint(1, 4), day_types=rng.choice(DAY_TYPE_CHOICES),
+                                        sequence=sequence))
+    db.session.commit()
+
+def build_per_day(year, month):
+    """对照实现：每天查询一次模板并逐个生成"""
+    rows = []
+    for day, day_type in holiday_helper.month_calendar(year, month):
+        templates = SlotTemplate.query.filter_by(is_active=True).order_by(SlotTemplate.sequence, SlotTemplate.id).all()
+        for template in templates:
+            if day_type not in template.get_day_types():
+                continue
+            for _ in range(template.headcount):
+                rows.append({'date': day, 'weekday': day.strftime('%A'), 'shift': template.shift_type.name,
+                             'time_range': template.get_time_range(), 'department': template.department,
+                             'status': 'unassigned'})
+    return rows
+
+def timed(func, rounds=5):
+    """执行多次，返回结果和最短耗时（毫秒）"""
+    best, result = None, None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+def main():
+    """主函数"""
+    departments = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    year, month = 2025, 3
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(tmp_dir, 'benchmark.db')
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(app)
+
+        with app.app_context():
+            db.create_all()
+            seed_templates(departments)
+            cache = SlotTemplateCache()
+
+            print("🏥 妇幼排班管理系统 - 班次模板展开性能测试")
+            print("=" * 60)
+            print(f"{departments} 个科室 x {len(SHIFT_TYPES)} 个班次模板，{year}年{month}月")
+            print()
+
+            per_day_rows, per_day_ms = timed(lambda: build_per_day(year, month))
+            _, compile_ms = timed(cache.compile)
+            cache.get_plan()
+            (rows, days), expand_ms = timed(lambda: cache.build_month(year, month))
+            assert len(rows) == len(per_day_rows)
+
+            print(f"生成班次: {len(rows)} 个（{days} 天）")
+            print(f"{'实现':<24} {'耗时(ms)':>10}")
+            print("-" * 60)
+            print(f"{'逐天查询模板':<24} {per_day_ms:>10.2f}")
+            print(f"{'编译模板（一次查询）':<24} {compile_ms:>10.2f}")
+            print(f"{'编译后整月展开':<24} {expand_ms:>10.2f}")
+            print()
+            print(f"展开加速: {per_day_ms / expand_ms:.1f}x")
+
+if __name__ == '__main__':
+    main()
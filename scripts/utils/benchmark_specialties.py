@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+擅长方向解析性能测试脚本
+模拟医生列表/编辑页面的模板循环，对比逐次解析JSON与实例缓存的渲染耗时
+"""
+
+import json
+import os
+import sys
+import time
+
+from jinja2 import Template
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from app.models import Doctor
+
+SPECIALTY_NAMES = ['妇科', '产科', '儿科', '筛查']
+
+# 与 doctors/index.html、doctors/edit.html 中的调用方式一致
+LIST_TEMPLATE = Template('''
+{% for doctor in doctors %}
+  <tr><td>{{ doctor.name }}</td>
+  <td>{% for specialty in doctor.get_specialties_list() %}<span>{{ specialty }}</span>{% endfor %}</td>
+  <td>{{ doctor.get_specialties_display() }}</td>
+  <td>{% for spec in specialty_names %}
+      <input type="checkbox" {% if spec in doctor.get_specialties_list() %}checked{% endif %}>
+      {% if doctor.has_specialty(spec) %}*{% endif %}
+  {% endfor %}</td></tr>
+{% endfor %}
+''')
+
+class UncachedDoctor:
+    """旧版实现：每次调用都重新解析JSON（字段仍从ORM实例读取，保证对比公平）"""
+    def __init__(self, doctor):
+        self.doctor = doctor
+
+    @property
+    def name(self):
+        return self.doctor.name
+
+    @property
+    def specialties(self):
+        return self.doctor.specialties
+
+    def get_specialties_list(self):
+        if not self.specialties:
+            return []
+        try:
+            return json.loads(self.specialties)
+        except:
+            return []
+
+    def get_specialties_display(self):
+        specialties = self.get_specialties_list()
+        return ', '.join(specialties) if specialties else '未设置'
+
+    def has_specialty(self, specialty_name):
+        return specialty_name in self.get_specialties_list()
+
+def build_doctors(count):
+    """生成测试医生数据"""
+    cached, uncached = [], []
+    for i in range(count):
+        specialties = json.dumps(SPECIALTY_NAMES[:1 + i % len(SPECIALTY_NAMES)], ensure_ascii=False)
+        cached.append(Doctor(name=f'医生{i}', gender='女', specialties=specialties))
+        uncached.append(UncachedDoctor(Doctor(name=f'医生{i}', gender='女', specialties=specialties)))
+    return cached, uncached
+
+def render_time(doctors, rounds):
+    """多次渲染取最短耗时（毫秒）"""
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        LIST_TEMPLATE.render(doctors=doctors, specialty_names=SPECIALTY_NAMES)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    """主函数"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    print("🏥 妇幼排班管理系统 - 擅长方向解析性能测试")
+    print("=" * 50)
+    cached, uncached = build_doctors(count)
+
+    uncached_ms = render_time(uncached, rounds)
+    # 缓存版本在每轮渲染前新建实例，与每个请求重新加载医生一致
+    cached_ms = None
+    for _ in range(rounds):
+        cached, _ = build_doctors(count)
+        elapsed = render_time(cached, 1)
+        cached_ms = elapsed if cached_ms is None else min(cached_ms, elapsed)
+
+    print(f"医生数量: {count}，渲染 {rounds} 次取最短耗时")
+    print(f"逐次解析: {uncached_ms:.2f} ms")
+    print(f"实例缓存: {cached_ms:.2f} ms")
+    print(f"节省:     {uncached_ms - cached_ms:.2f} ms ({(1 - cached_ms / uncached_ms) * 100:.1f}%)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+排班系统性能测试套件
+在临时SQLite数据库中生成合成数据，测量主要页面和节假日查询的耗时，
+结果以JSON保存（格式参考pytest-benchmark），可与之前的结果对比发现性能回退
+
+测试项:
+    schedules               GET  /schedules?month=...         排班月视图
+    view_doctor             GET  /doctors/<id>                医生详情
+    generate_schedule       POST /schedules/generate          生成月排班
+    download_template_excel GET  /schedules/download_template_excel
+    holiday_is_holiday      holiday_helper.is_holiday 查询全年每一天（缓存命中）
+    holiday_get_holidays    holiday_helper.get_holidays 读取一年节假日（清空缓存后）
+"""
+
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+RESULTS_DIR = os.path.join(project_root, 'instance', 'benchmarks')
+REGRESSION_THRESHOLD = 1.2  # 平均耗时超过基准的1.2倍视为回退
+
+# 每个测试项单次执行的SQL语句预算，超出通常意味着N+1查询
+QUERY_BUDGETS = {
+    'schedules': 10,
+    'view_doctor': 10,
+    'generate_schedule': 10,
+    'download_template_excel': 10,
+    'holiday_is_holiday': 1,
+    'holiday_get_holidays': 1,
+}
+
+def create_benchmark_app(database_path):
+    """创建使用临时数据库的应用"""
+    os.environ['FUYOU_DATABASE_URI'] = f'sqlite:///{database_path}'
+    from app import create_app
+
+    app = create_app()
+    app.config['TESTING'] = True
+    return app
+
+def login_client(app):
+    """返回已登录管理员的测试客户端"""
+    from app.models import User
+
+    client = app.test_client()
+    with app.app_context():
+        admin = User.query.filter_by(is_admin=True).order_by(User.id).first()
+        admin_id = admin.id
+    with client.session_transaction() as session:
+        session['_user_id'] = str(admin_id)
+        session['_fresh'] = True
+    return client
+
+def measure(func, rounds, warmup):
+    """执行并统计耗时（秒）"""
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {
+        'min': min(timings),
+        'max': max(timings),
+        'mean': statistics.mean(timings),
+        'median': statistics.median(timings),
+        'stddev': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        'rounds': rounds,
+    }
+
+def build_cases(app, client, start_year):
+    """构造测试项：名称 -> 无参函数"""
+    from app.extensions import db
+    from app.models import Doctor
+    from app.holiday_utils.holidays import holiday_helper
+
+    month = f'{start_year}-03'
+    with app.app_context():
+        doctor_id = db.session.query(Doctor.id).filter_by(status='在职').order_by(Doctor.id).first()[0]
+    year_days = [(date(start_year, 1, 1) + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(365)]
+
+    def get(url):
+        def request():
+            response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f'GET {url} 返回 {response.status_code}')
+        return request
+
+    def generate_schedule():
+        response = client.post('/schedules/generate', data={'targetMonth': f'{start_year}-04'})
+        if not response.get_json().get('success'):
+            raise RuntimeError(f"生成排班失败: {response.get_json().get('message')}")
+
+    def holiday_is_holiday():
+        with app.app_context():
+            for day in year_days:
+                holiday_helper.is_holiday(day)
+
+    def holiday_get_holidays():
+        with app.app_context():
+            holiday_helper.holiday_cache.pop(start_year, None)
+            holiday_helper.get_holidays(start_year)
+
+    return {
+        'schedules': get(f'/schedules?month={month}'),
+        'view_doctor': get(f'/doctors/{doctor_id}'),
+        'generate_schedule': generate_schedule,
+        'download_template_excel': get(f'/schedules/download_template_excel?month={month}'),
+        'holiday_is_holiday': holiday_is_holiday,
+        'holiday_get_holidays': holiday_get_holidays,
+    }
+
+def count_queries(func, budget):
+    """执行一次并统计SQL语句数
+
+    Returns:
+        tuple: (语句数, 是否超出预算)
+    """
+    from app.query_stats import query_stats
+
+    with query_stats.count_queries() as stats:
+        func()
+    return stats.count, budget is not None and stats.count > budget
+
+def compare_results(current, baseline_path):
+    """与基准结果对比
+
+    Returns:
+        bool: 是否存在性能回退
+    """
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {item['name']: item['stats'] for item in json.load(f)['benchmarks']}
+
+    print()
+    print(f"与基准对比: {baseline_path}")
+    print(f"{'测试项':<26} {'基准(ms)':>10} {'当前(ms)':>10} {'比例':>8}")
+    print("-" * 60)
+    regressed = False
+    for item in current['benchmarks']:
+        name, stats = item['name'], item['stats']
+        if name not in baseline:
+            print(f"{name:<26} {'-':>10} {stats['mean'] * 1000:>10.2f} {'新增':>8}")
+            continue
+        ratio = stats['mean'] / baseline[name]['mean']
+        marker = ' ⚠️' if ratio > REGRESSION_THRESHOLD else ''
+        regressed = regressed or ratio > REGRESSION_THRESHOLD
+        print(f"{name:<26} {baseline[name]['mean'] * 1000:>10.2f} {stats['mean'] * 1000:>10.2f} {ratio:>7.2f}x{marker}")
+    return regressed
+
+def print_usage():
+    """显示用法"""
+    print("用法:")
+    print("  python benchmark_suite.py [--doctors N] [--years M] [--rounds R] [--compare 基准.json] [--output 结果.json]")
+    print("                            [--enforce-budgets]")
+    print("默认: 50 名医生、1 年数据，每项执行 20 次；结果保存到 instance/benchmarks/")
+    print("--enforce-budgets: SQL语句数超出 QUERY_BUDGETS 时退出码为1")
+
+def parse_args(args):
+    """解析命令行参数"""
+    options = {'doctors': 50, 'years': 1, 'rounds': 20, 'seed': 42, 'compare': None, 'output': None,
+               'enforce_budgets': False}
+    int_options = {'--doctors': 'doctors', '--years': 'years', '--rounds': 'rounds', '--seed': 'seed'}
+    str_options = {'--compare': 'compare', '--output': 'output'}
+    i = 0
+    while i < len(args):
+        if args[i] == '--enforce-budgets':
+            options['enforce_budgets'] = True
+            i += 1
+            continue
+        if i + 1 >= len(args) or args[i] not in int_options and args[i] not in str_options:
+            raise ValueError(args[i])
+        if args[i] in int_options:
+            options[int_options[args[i]]] = int(args[i + 1])
+        else:
+            options[str_options[args[i]]] = args[i + 1]
+        i += 2
+    return options
+
+def main():
+    """主函数"""
+    try:
+        options = parse_args(sys.argv[1:])
+    except ValueError:
+        print_usage()
+        sys.exit(1)
+
+    start_year = 2025
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        app = create_benchmark_app(os.path.join(tmp_dir, 'benchmark.db'))
+
+        from scripts.data.generate_synthetic_data import generate_dataset
+        with app.app_context():
+            dataset = generate_dataset(doctors=options['doctors'], years=options['years'],
+                                       start_year=start_year, seed=options['seed'])
+
+        client = login_client(app)
+        cases = build_cases(app, client, start_year)
+
+        print()
+        print("🏥 妇幼排班管理系统 - 性能测试套件")
+        print("=" * 60)
+        print(f"数据集: {dataset}")
+        print(f"{'测试项':<26} {'平均(ms)':>10} {'中位数(ms)':>11} {'最小(ms)':>10} {'SQL数':>10}")
+        print("-" * 72)
+
+        benchmarks, over_budget = [], []
+        for name, func in cases.items():
+            stats = measure(func, options['rounds'], warmup=2)
+            budget = QUERY_BUDGETS.get(name)
+            queries, exceeded = count_queries(func, budget)
+            if exceeded:
+                over_budget.append(name)
+            benchmarks.append({'name': name, 'stats': stats, 'queries': queries, 'query_budget': budget})
+            queries_display = f"{queries}/{budget}" if budget is not None else str(queries)
+            print(f"{name:<26} {stats['mean'] * 1000:>10.2f} {stats['median'] * 1000:>11.2f} {stats['min'] * 1000:>10.2f} "
+                  f"{queries_display:>10}{' ⚠️' if exceeded else ''}")
+
+    result = {
+        'machine_info': {
+            'python_version': platform.python_version(),
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+        },
+        'datetime': datetime.now().isoformat(),
+        'options': {key: options[key] for key in ('doctors', 'years', 'rounds', 'seed')},
+        'dataset': dataset,
+        'benchmarks': benchmarks,
+    }
+
+    output = options['output']
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"benchmark-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print()
+    print(f"结果已保存: {output}")
+
+    failed = False
+    if over_budget:
+        print()
+        print(f"⚠️  SQL语句数超出预算: {', '.join(over_budget)}")
+        failed = options['enforce_budgets']
+
+    if options['compare'] and compare_results(result, options['compare']):
+        print()
+        print(f"⚠️  存在平均耗时超过基准 {REGRESSION_THRESHOLD}x 的测试项")
+        failed = True
+
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+并发吞吐量测试
+对运行中的服务发起并发请求，统计每秒请求数和延迟分位数，用于比较开发服务器（python run.py）
+与gunicorn（gunicorn -c gunicorn.conf.py wsgi:app）在同一份数据上的表现
+
+每个并发线程先用账号登录，再循环请求测试页面，直到达到测试时长。
+"""
+
+import http.cookiejar
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+DEFAULT_PATHS = ['/schedules?month=2025-03', '/doctors', '/users']
+
+def login(base_url, username, password):
+    """登录并返回带会话Cookie的opener"""
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    data = urllib.parse.urlencode({'username': username, 'password': password}).encode('utf-8')
+    response = opener.open(f'{base_url}/auth/login', data=data, timeout=30)
+    if '/auth/login' in response.geturl():
+        raise RuntimeError('登录失败，请检查用户名和密码')
+    return opener
+
+def worker(base_url, username, password, paths, deadline, results, lock):
+    """单个并发线程：循环请求直到截止时间"""
+    opener = login(base_url, username, password)
+    latencies, errors, index = [], 0, 0
+    while time.monotonic() < deadline:
+        url = base_url + paths[index % len(paths)]
+        index += 1
+        start = time.perf_counter()
+        try:
+            with opener.open(url, timeout=60) as response:
+                response.read()
+            latencies.append(time.perf_counter() - start)
+        except (urllib.error.URLError, OSError):
+            errors += 1
+    with lock:
+        results['latencies'].extend(latencies)
+        results['errors'] += errors
+
+def run(base_url, username, password, paths, concurrency, duration):
+    """执行一轮测试并返回统计结果"""
+    results = {'latencies': [], 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    threads = [threading.Thread(target=worker, args=(base_url, username, password, paths, deadline, results, lock))
+               for _ in range(concurrency)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies = sorted(results['latencies'])
+    if not latencies:
+        return {'requests': 0, 'errors': results['errors'], 'rps': 0.0}
+    return {
+        'requests': len(latencies),
+        'errors': results['errors'],
+        'rps': len(latencies) / elapsed,
+        'p50': statistics.median(latencies),
+        'p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        'max': latencies[-1],
+    }
+
+def print_usage():
+    """显示用法"""
+    print("用法:")
+    print("  python benchmark_throughput.py URL [--user 用户名] [--password 密码] [--concurrency N] [--duration 秒]")
+    print("                                    [--path /页面 ...]")
+    print("默认: 用户 admin/admin123，并发 1、4、16 各测 20 秒，页面为排班月视图、医生列表和用户列表")
+    print("示例: python benchmark_throughput.py http://127.0.0.1:8000 --concurrency 16")
+
+def parse_args(args):
+    """解析命令行参数"""
+    if not args or args[0].startswith('--'):
+        raise ValueError('缺少URL')
+    options = {'url': args[0].rstrip('/'), 'user': 'admin', 'password': 'admin123',
+               'concurrency': [], 'duration': 20, 'paths': []}
+    i = 1
+    while i < len(args):
+        if i + 1 >= len(args):
+            raise ValueError(args[i])
+        name, value = args[i], args[i + 1]
+        if name == '--user':
+            options['user'] = value
+        elif name == '--password':
+            options['password'] = value
+        elif name == '--concurrency':
+            options['concurrency'].append(int(value))
+        elif name == '--duration':
+            options['duration'] = int(value)
+        elif name == '--path':
+            options['paths'].append(value)
+        else:
+            raise ValueError(name)
+        i += 2
+    options['concurrency'] = options['concurrency'] or [1, 4, 16]
+    options['paths'] = options['paths'] or DEFAULT_PATHS
+    return options
+
+def main():
+    """主函数"""
+    try:
+        options = parse_args(sys.argv[1:])
+    except ValueError:
+        print_usage()
+        sys.exit(1)
+
+    print()
+    print("🏥 妇幼排班管理系统 - 并发吞吐量测试")
+    print("=" * 60)
+    print(f"服务: {options['url']}")
+    print(f"页面: {', '.join(options['paths'])}")
+    print(f"{'并发':>6} {'请求数':>8} {'错误':>6} {'请求/秒':>10} {'P50(ms)':>10} {'P95(ms)':>10} {'最大(ms)':>10}")
+    print("-" * 66)
+
+    for concurrency in options['concurrency']:
+        try:
+            stats = run(options['url'], options['user'], options['password'], options['paths'],
+                        concurrency, options['duration'])
+        except (RuntimeError, urllib.error.URLError, OSError) as e:
+            print(f"❌ 测试失败: {e}")
+            sys.exit(1)
+        if not stats['requests']:
+            print(f"{concurrency:>6} {0:>8} {stats['errors']:>6} {'-':>10}")
+            continue
+        print(f"{concurrency:>6} {stats['requests']:>8} {stats['errors']:>6} {stats['rps']:>10.1f} "
+              f"{stats['p50'] * 1000:>10.1f} {stats['p95'] * 1000:>10.1f} {stats['max'] * 1000:>10.1f}")
+
+if __name__ == '__main__':
+    main()
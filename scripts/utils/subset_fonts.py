@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+霞鹜新晰黑字体子集化脚本
+只保留模板、页面提示和数据库中（医生、节假日、班次等名称）实际用到的字符，
+按 unicode-range 拆分为多个WOFF2文件，浏览器只下载当前页面用到的分片
+
+依赖（仅构建时需要）:
+    pip install fonttools brotli
+
+输出（与 font-setup.css 同一目录，由nginx的 /static 提供）:
+    static/fonts/subset/*.woff2    # 字体分片（文件名带内容哈希，可长期缓存）
+    static/fonts/font-subset.css   # @font-face 声明和正文字体
+    static/fonts/font-subset.json  # 字符集指纹，字符未变化时跳过重新生成
+"""
+
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+try:
+    from fontTools import subset as font_subset
+except ImportError:  # 未安装fonttools时给出安装提示
+    font_subset = None
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+# 源字体（download_fonts.py 下载到 static/fonts）
+FONT_FILES = [
+    ('LXGWWenKai-Regular.ttf', 'normal'),
+    ('LXGWWenKai-Bold.ttf', 'bold'),
+]
+SOURCE_DIRS = [project_root / 'static' / 'fonts', project_root / 'app' / 'static' / 'fonts']
+
+OUTPUT_DIR = project_root / 'static' / 'fonts'  # 与 font-setup.css 同一目录
+SUBSET_DIR = OUTPUT_DIR / 'subset'
+CSS_FILE = OUTPUT_DIR / 'font-subset.css'
+MANIFEST_FILE = OUTPUT_DIR / 'font-subset.json'
+
+FONT_FAMILY = 'LXGWNeoXiHei Subset'
+CHUNK_SIZE = 400  # 每个中文分片的字符数
+CJK_START = 0x2E80  # 之前为拉丁字母、标点和符号，单独作为第一个分片
+
+# 始终保留的字符：ASCII可见字符和常用中文标点
+BASE_CHARS = ''.join(chr(cp) for cp in range(0x20, 0x7F)) + '，。、；：？！“”‘’（）《》【】—…·￥％～'
+
+# 扫描字符的源文件
+SCAN_DIRS = [
+    (project_root / 'app' / 'templates', '.html'),
+    (project_root / 'app', '.py'),  # flash提示、表单校验信息等
+]
+
+def collect_source_chars():
+    """收集模板和代码中的字符"""
+    chars = set(BASE_CHARS)
+    for directory, suffix in SCAN_DIRS:
+        for file_path in directory.rglob(f'*{suffix}'):
+            chars.update(file_path.read_text(encoding='utf-8', errors='ignore'))
+    return chars
+
+def collect_database_chars():
+    """收集数据库中会显示在页面上的名称"""
+    from app import create_app
+    from app.extensions import db
+    from app.models import Doctor, User, Holiday, Specialty, ShiftType
+
+    chars = set()
+    app = create_app()
+    with app.app_context():
+        columns = [
+            Doctor.name, Doctor.title, Doctor.status, Doctor.specialties,
+            User.full_name, User.username,
+            Holiday.name,
+            Specialty.name, Specialty.description,
+            ShiftType.name, ShiftType.description,
+        ]
+        for column in columns:
+            for (value,) in db.session.query(column).distinct():
+                if value:
+                    chars.update(str(value))
+    return chars
+
+def split_chunks(codepoints):
+    """拆分字符：拉丁字母和符号一个分片，中文按 CHUNK_SIZE 分片"""
+    latin = [cp for cp in codepoints if cp < CJK_START]
+    cjk = [cp for cp in codepoints if cp >= CJK_START]
+    chunks = [latin] if latin else []
+    chunks.extend(cjk[i:i + CHUNK_SIZE] for i in range(0, len(cjk), CHUNK_SIZE))
+    return chunks
+
+def format_unicode_range(codepoints):
+    """将连续码位合并为 unicode-range 格式，例如 U+20-7E, U+4E00"""
+    ranges = []
+    start = previous = codepoints[0]
+    for cp in codepoints[1:] + [None]:
+        if cp is not None and cp == previous + 1:
+            previous = cp
+            continue
+        ranges.append(f'U+{start:X}' if start == previous else f'U+{start:X}-{previous:X}')
+        if cp is not None:
+            start = previous = cp
+    return ', '.join(ranges)
+
+def find_source_font(filename):
+    """查找源字体文件"""
+    for directory in SOURCE_DIRS:
+        font_path = directory / filename
+        if font_path.exists():
+            return font_path
+    return None
+
+def compute_fingerprint(codepoints, sources):
+    """字符集与源字体共同决定输出内容"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(codepoints).encode('utf-8'))
+    digest.update(str(CHUNK_SIZE).encode('utf-8'))
+    for font_path in sources:
+        stat = font_path.stat()
+        digest.update(f'{font_path.name}:{stat.st_size}:{int(stat.st_mtime)}'.encode('utf-8'))
+    return digest.hexdigest()
+
+def is_up_to_date(fingerprint):
+    """检查已生成的子集是否与当前字符集一致"""
+    if not MANIFEST_FILE.exists() or not CSS_FILE.exists():
+        return False
+    try:
+        manifest = json.loads(MANIFEST_FILE.read_text(encoding='utf-8'))
+    except ValueError:
+        return False
+    if manifest.get('fingerprint') != fingerprint:
+        return False
+    return all((SUBSET_DIR / name).exists() for name in manifest.get('files', []))
+
+def subset_chunk(source, codepoints):
+    """生成一个WOFF2分片，返回字体数据"""
+    options = font_subset.Options()
+    options.flavor = 'woff2'
+    options.layout_features = ['*']
+    options.name_IDs = ['*']
+    options.notdef_outline = True
+
+    font = font_subset.load_font(str(source), options)
+    subsetter = font_subset.Subsetter(options)
+    subsetter.populate(unicodes=codepoints)
+    subsetter.subset(font)
+
+    output = SUBSET_DIR / '.tmp.woff2'
+    font_subset.save_font(font, str(output), options)
+    data = output.read_bytes()
+    output.unlink()
+    return data
+
+def build(codepoints, sources, fingerprint):
+    """生成所有分片和CSS
+
+    Returns:
+        dict: 源字体文件名 -> (原始字节数, 分片总字节数)
+    """
+    SUBSET_DIR.mkdir(parents=True, exist_ok=True)
+    for old_file in SUBSET_DIR.glob('*.woff2'):
+        old_file.unlink()
+
+    chunks = split_chunks(codepoints)
+    css = [
+        '/*',
+        ' * 霞鹜新晰黑字体子集（由 scripts/utils/subset_fonts.py 生成，请勿手动修改）',
+        f' * 字符数: {len(codepoints)}，分片数: {len(chunks)}',
+        ' * 子集外的字符回退到 font-setup.css 中的完整字体或系统字体',
+        ' */',
+        '',
+    ]
+    files, sizes = [], {}
+
+    for (filename, weight), source in zip(FONT_FILES, sources):
+        if source is None:
+            continue
+        stem = Path(filename).stem
+        total = 0
+        for index, chunk in enumerate(chunks):
+            data = subset_chunk(source, chunk)
+            name = f'{stem}.{index}.{hashlib.sha256(data).hexdigest()[:8]}.woff2'
+            (SUBSET_DIR / name).write_bytes(data)
+            files.append(name)
+            total += len(data)
+
+            css.append('@font-face {')
+            css.append(f"  font-family: '{FONT_FAMILY}';")
+            css.append('  font-style: normal;')
+            css.append(f'  font-weight: {weight};')
+            css.append('  font-display: swap;')
+            css.append(f"  src: url('subset/{name}') format('woff2');")
+            css.append(f'  unicode-range: {format_unicode_range(chunk)};')
+            css.append('}')
+            css.append('')
+        sizes[filename] = (source.stat().st_size, total)
+
+    # 子集字体优先，子集外的字符依次回退
+    css.append(':root {')
+    css.append(f"  --font-family-base: '{FONT_FAMILY}', 'LXGWNeoXiHei', 'Noto Sans SC', 'Microsoft YaHei', "
+               "'PingFang SC', 'Hiragino Sans GB', 'Source Han Sans SC', sans-serif;")
+    css.append('}')
+    css.append('')
+    # 不依赖 font-setup.css 中的正文字体规则，单独引用本文件时也能生效
+    css.append('body {')
+    css.append('  font-family: var(--font-family-base);')
+    css.append('}')
+    CSS_FILE.write_text('\n'.join(css) + '\n', encoding='utf-8')
+
+    MANIFEST_FILE.write_text(json.dumps({
+        'fingerprint': fingerprint,
+        'characters': len(codepoints),
+        'chunks': len(chunks),
+        'files': files,
+    }, ensure_ascii=False, indent=2), encoding='utf-8')
+    return sizes
+
+def format_size(size):
+    """格式化字节数"""
+    return f'{size / 1024 / 1024:.2f} MB' if size >= 1024 * 1024 else f'{size / 1024:.1f} KB'
+
+def print_usage():
+    """显示用法"""
+    print("用法:")
+    print("  python scripts/utils/subset_fonts.py            # 字符集变化时重新生成")
+    print("  python scripts/utils/subset_fonts.py --force    # 强制重新生成")
+    print("  python scripts/utils/subset_fonts.py --check    # 只检查是否需要重新生成（需要时退出码为1）")
+    print("  python scripts/utils/subset_fonts.py --no-db    # 不读取数据库，只使用模板中的字符")
+
+def main():
+    """主函数"""
+    args = sys.argv[1:]
+    if any(arg not in ('--force', '--check', '--no-db') for arg in args):
+        print_usage()
+        sys.exit(1)
+
+    print("🏥 妇幼排班管理系统 - 字体子集化工具")
+    print("=" * 50)
+
+    sources = [find_source_font(filename) for filename, _ in FONT_FILES]
+    if not any(sources):
+        print(" 未找到源字体文件，请先运行 python scripts/utils/download_fonts.py")
+        sys.exit(1)
+
+    chars = collect_source_chars()
+    print(f"模板和代码中的字符: {len(chars)}")
+    if '--no-db' not in args:
+        db_chars = collect_database_chars()
+        print(f"数据库名称中的字符: {len(db_chars)}")
+        chars |= db_chars
+
+    codepoints = sorted(ord(c) for c in chars if ord(c) >= 0x20)
+    fingerprint = compute_fingerprint(codepoints, [source for source in sources if source])
+
+    if is_up_to_date(fingerprint) and '--force' not in args:
+        print(" 字符集未变化，无需重新生成")
+        return
+    if '--check' in args:
+        print("⚠️  字符集已变化，需要重新生成字体子集")
+        sys.exit(1)
+
+    if font_subset is None:
+        print(" 未安装fonttools，请运行: pip install fonttools brotli")
+        sys.exit(1)
+
+    print(f"共 {len(codepoints)} 个字符，开始生成WOFF2分片...")
+    sizes = build(codepoints, sources, fingerprint)
+
+    print()
+    print(f"{'字体':<28} {'原始大小':>12} {'子集大小':>12} {'节省':>8}")
+    print("-" * 64)
+    total_before = total_after = 0
+    for filename, (before, after) in sizes.items():
+        total_before += before
+        total_after += after
+        print(f"{filename:<28} {format_size(before):>12} {format_size(after):>12} {(1 - after / before) * 100:>7.1f}%")
+    print("-" * 64)
+    print(f"{'合计':<28} {format_size(total_before):>12} {format_size(total_after):>12} "
+          f"{(1 - total_after / total_before) * 100:>7.1f}%")
+    print()
+    print(f"已生成: {CSS_FILE.relative_to(project_root)}")
+    print("💡 浏览器按 unicode-range 只下载页面用到的分片，实际传输量通常小于上表的子集大小")
+    print("💡 新增医生或节假日后重新运行本脚本（字符未变化时会自动跳过）")
+
+if __name__ == '__main__':
+    main()
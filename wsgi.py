@@ -0,0 +1,16 @@
+"""
+生产环境WSGI入口
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+gunicorn主进程加载一次应用（preload_app）并预热缓存，再fork出worker，
+各worker共享已导入的模块和缓存数据；开发调试仍使用 python run.py
+"""
+from app import create_app, warm_caches
+from app.extensions import db
+
+app = create_app()
+
+with app.app_context():
+    warm_caches()
+    # 主进程的数据库连接不能被fork出的worker共用，预热后关闭，worker首次查询时各自建立连接
+    db.engine.dispose()